@@ -0,0 +1,135 @@
+"""Full-call analysis shared by ``/api/analyze`` and the batch scorer.
+
+The model-scored rubrics and feedback go out as one combined evaluator call,
+and compliance is matched locally by ``score_compliance``, both concurrently.
+``stream_analysis`` runs the same two and hands out each score and feedback
+item as soon as it is ready, for ``/api/analyze/stream``. Both list the rubrics
+that got a default instead of a real score under ``fallback``.
+"""
+
+import asyncio
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from compliance import score_compliance
+from evaluators import ANALYSIS_RUBRICS, get_engine
+
+ALL_SELECTIONS = [*ANALYSIS_RUBRICS, "feedback"]
+
+
+def select_rubrics(selected: Optional[List[str]]) -> Tuple[List[str], bool, bool]:
+    """Split a selection into (model-scored rubrics, with feedback, with compliance).
+
+    Defaults to everything; raises ``ValueError`` on unknown names.
+    """
+    selected = selected or ALL_SELECTIONS
+    unknown = [name for name in selected if name not in ALL_SELECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown rubrics: {', '.join(unknown)}")
+    rubrics = [name for name in ANALYSIS_RUBRICS if name in selected and name != "compliance"]
+    return rubrics, "feedback" in selected, "compliance" in selected
+
+
+async def analyze_transcript(transcript: str, selected: Optional[List[str]] = None, strict: bool = False) -> dict:
+    rubrics, with_feedback, with_compliance = select_rubrics(selected)
+
+    tasks = []
+    if rubrics or with_feedback:
+        tasks.append(get_engine().analyze(transcript, rubrics, with_feedback, strict=strict))
+    if with_compliance:
+        tasks.append(score_compliance(transcript, strict=strict))
+
+    result = {}
+    for outcome in await asyncio.gather(*tasks):
+        if "items" in outcome:
+            result["compliance"] = outcome["score"]
+            result["compliance_items"] = outcome["items"]
+            if outcome.get("fallback"):
+                result["fallback"] = [*result.get("fallback", []), "compliance"]
+        else:
+            result.update(outcome)
+    return result
+
+
+def _compliance_event(outcome: dict) -> tuple:
+    event = {"rubric": "compliance", "score": outcome["score"], "items": outcome["items"]}
+    if outcome.get("fallback"):
+        event["fallback"] = True
+    return "score", event
+
+
+def result_events(result: dict, selected: Optional[List[str]] = None):
+    """The events ``stream_analysis`` would have produced for an analysis already done."""
+    selected = selected or ALL_SELECTIONS
+    for name in ANALYSIS_RUBRICS:
+        if name in selected and name in result:
+            event = {"rubric": name, "score": result[name]}
+            if name == "compliance" and "compliance_items" in result:
+                event["items"] = result["compliance_items"]
+            if name in result.get("fallback", []):
+                event["fallback"] = True
+            yield "score", event
+    if "feedback" in selected:
+        for item in result.get("feedback", []):
+            yield "feedback", item
+
+
+async def stream_analysis(transcript: str, selected: Optional[List[str]] = None):
+    """``analyze_transcript`` as it happens.
+
+    Yields a ``("score", ...)`` or ``("feedback", ...)`` event per result in the
+    order they are ready, then ``("summary", result)`` with the same result
+    ``analyze_transcript`` returns. A rubric whose scoring failed gets an
+    ``("error", {"rubric": ..., "error": ...})`` event instead and is left out of
+    the summary; the rest still arrive.
+    """
+    rubrics, with_feedback, with_compliance = select_rubrics(selected)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run(events, names: List[str]):
+        answered = set()
+        try:
+            async for kind, data in events:
+                answered.add("feedback" if kind == "feedback" else data["rubric"])
+                queue.put_nowait((kind, data))
+        except Exception as e:
+            logger.exception(f"Scoring {', '.join(names)} failed")
+            for name in names:
+                if name not in answered:
+                    queue.put_nowait(("error", {"rubric": name, "error": f"{type(e).__name__}: {e}"}))
+        finally:
+            queue.put_nowait(None)
+
+    async def compliance():
+        yield _compliance_event(await score_compliance(transcript))
+
+    tasks = []
+    if rubrics or with_feedback:
+        model = get_engine().analyze_stream(transcript, rubrics, with_feedback)
+        tasks.append(asyncio.create_task(run(model, [*rubrics, *(["feedback"] if with_feedback else [])])))
+    if with_compliance:
+        tasks.append(asyncio.create_task(run(compliance(), ["compliance"])))
+
+    result = {}
+    running = len(tasks)
+    try:
+        while running:
+            event = await queue.get()
+            if event is None:
+                running -= 1
+                continue
+            kind, data = event
+            if kind == "feedback":
+                result.setdefault("feedback", []).append(data)
+            elif kind == "score":
+                result[data["rubric"]] = data["score"]
+                if "items" in data:
+                    result["compliance_items"] = data["items"]
+                if data.get("fallback"):
+                    result["fallback"] = [*result.get("fallback", []), data["rubric"]]
+            yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield "summary", result
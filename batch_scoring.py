@@ -0,0 +1,349 @@
+"""Bulk re-scoring of stored or uploaded transcripts.
+
+A batch job is persisted in SQLite (WAL) with one row per transcript before any
+scoring starts. A fixed pool of ``BATCH_WORKERS`` tasks per process works through
+the pending items, each one a full ``analyze_transcript`` run in strict mode, so an
+unusable model answer is retried with exponential backoff instead of being
+stored as a fallback score. Finished items are appended to a results table the
+NDJSON stream reads from, which lets a client reattach to a job at any time.
+Jobs still running when the server stops are picked up again on start.
+
+The worker pool is deliberately small and separate from the live-call path: it
+keeps the upstream model busy without starving calls of the event loop. Its
+model requests run in the scheduler's lowest priority class, so they give way
+to live calls and post-call scoring when the rate limit runs short.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+from loguru import logger
+
+from analysis import analyze_transcript
+from evaluators import EvaluationError
+from llm_scheduler import BATCH, llm_priority
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+BATCH_DB_PATH = os.getenv("BATCH_DB_PATH", os.path.join(DATA_DIR, "batch_jobs.sqlite3"))
+# Concurrent transcript evaluations per process across all batch jobs.
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "4"))
+# First retry delay; doubled on every further attempt, with jitter.
+BATCH_BACKOFF_SECS = float(os.getenv("BATCH_BACKOFF_SECS", "2"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+# How often a results stream re-checks the database for work done by another worker process.
+BATCH_POLL_SECS = 1.0
+
+
+class BatchStore:
+    """Jobs, their items and the append-only results log."""
+
+    def __init__(self, path: str = BATCH_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, created_at REAL NOT NULL, status TEXT NOT NULL,
+                rubrics TEXT, worker TEXT, total INTEGER NOT NULL, finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                job_id TEXT NOT NULL, item_id TEXT NOT NULL, seq INTEGER NOT NULL,
+                transcript TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (job_id, item_id)
+            );
+            CREATE INDEX IF NOT EXISTS items_item ON items (item_id);
+            CREATE TABLE IF NOT EXISTS results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, item_id TEXT NOT NULL,
+                status TEXT NOT NULL, attempts INTEGER NOT NULL, result TEXT, error TEXT, finished_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_job ON results (job_id, seq);
+            """
+        )
+        self._db.commit()
+
+    def create_job(self, items: List[dict], rubrics: Optional[List[str]], worker: Optional[str]) -> str:
+        job_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, created_at, status, rubrics, worker, total) VALUES (?, ?, 'running', ?, ?, ?)",
+                (job_id, time.time(), json.dumps(rubrics), worker, len(items)),
+            )
+            self._db.executemany(
+                "INSERT INTO items (job_id, item_id, seq, transcript, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(job_id, item["id"], seq, item["transcript"]) for seq, item in enumerate(items)],
+            )
+            self._db.commit()
+        return job_id
+
+    def job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, created_at, status, rubrics, total, finished_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if not row:
+                return None
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        return {
+            "job_id": row[0], "created_at": row[1], "status": row[2], "rubrics": json.loads(row[3]),
+            "total": row[4], "finished_at": row[5],
+            "done": counts.get("done", 0), "failed": counts.get("failed", 0), "pending": counts.get("pending", 0),
+        }
+
+    def resumable_jobs(self, worker: Optional[str]) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND worker IS ? ORDER BY created_at", (worker,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def pending_items(self, job_id: str) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item_id FROM items WHERE job_id = ? AND status = 'pending' ORDER BY seq", (job_id,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def item(self, job_id: str, item_id: str) -> Optional[tuple]:
+        """(transcript, attempts) of a pending item, or None if it's settled or its job was cancelled."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT i.transcript, i.attempts FROM items i JOIN jobs j ON j.id = i.job_id "
+                "WHERE i.job_id = ? AND i.item_id = ? AND i.status = 'pending' AND j.status = 'running'",
+                (job_id, item_id),
+            ).fetchone()
+
+    def record_attempt(self, job_id: str, item_id: str, attempts: int):
+        with self._lock:
+            self._db.execute("UPDATE items SET attempts = ? WHERE job_id = ? AND item_id = ?",
+                             (attempts, job_id, item_id))
+            self._db.commit()
+
+    def finish_item(self, job_id: str, item_id: str, status: str, attempts: int,
+                    result: Optional[dict] = None, error: Optional[str] = None) -> bool:
+        """Settle an item; returns True if that was the job's last pending item."""
+        with self._lock:
+            self._db.execute("UPDATE items SET status = ?, attempts = ? WHERE job_id = ? AND item_id = ?",
+                             (status, attempts, job_id, item_id))
+            self._db.execute(
+                "INSERT INTO results (job_id, item_id, status, attempts, result, error, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, item_id, status, attempts, json.dumps(result) if result is not None else None, error,
+                 time.time()),
+            )
+            pending = self._db.execute("SELECT 1 FROM items WHERE job_id = ? AND status = 'pending' LIMIT 1",
+                                       (job_id,)).fetchone()
+            if not pending:
+                self._db.execute("UPDATE jobs SET status = 'done', finished_at = ? WHERE id = ? AND status = 'running'",
+                                 (time.time(), job_id))
+            self._db.commit()
+        return not pending
+
+    def cancel_job(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def results_since(self, job_id: str, after_seq: int) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, item_id, status, attempts, result, error FROM results "
+                "WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq),
+            ).fetchall()
+
+    def transcript(self, item_id: str) -> Optional[str]:
+        """The most recently submitted transcript with this id, from any earlier job."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT i.transcript FROM items i JOIN jobs j ON j.id = i.job_id WHERE i.item_id = ? "
+                "ORDER BY j.created_at DESC LIMIT 1",
+                (item_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def parse_jsonl(body: bytes) -> List[dict]:
+    """Items from a JSONL upload: one ``{"id"?, "transcript"}`` object per line.
+
+    Raises ``ValueError`` naming the first bad line.
+    """
+    items = []
+    for number, line in enumerate(body.decode("utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {number} is not valid JSON")
+        if not isinstance(entry, dict) or not isinstance(entry.get("transcript"), str):
+            raise ValueError(f"Line {number} has no transcript")
+        items.append({"id": str(entry.get("id") or f"line-{number}"), "transcript": entry["transcript"]})
+    return items
+
+
+class BatchRunner:
+    """Scores batch jobs on a pool of worker tasks.
+
+    Store calls made while serving run in a thread, so a large job's inserts
+    don't hold up the event loop.
+    """
+
+    def __init__(self, store: BatchStore, workers: int = BATCH_WORKERS, worker_id: Optional[str] = None):
+        self._store = store
+        self._worker_count = workers
+        self._worker_id = worker_id
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        # Set whenever a job gets a new result, to wake its streams
+        self._updates: Dict[str, asyncio.Event] = {}
+        self._rubrics: Dict[str, Optional[List[str]]] = {}
+        self._stats = {"jobs": 0, "resumed_jobs": 0, "items_done": 0, "items_failed": 0, "retries": 0}
+
+    @property
+    def store(self) -> BatchStore:
+        return self._store
+
+    async def submit(self, items: List[dict], rubrics: Optional[List[str]]) -> str:
+        job_id = await asyncio.to_thread(self._store.create_job, items, rubrics, self._worker_id)
+        self._stats["jobs"] += 1
+        self._enqueue(job_id, rubrics, [item["id"] for item in items])
+        logger.info(f"Batch job {job_id}: {len(items)} transcripts")
+        return job_id
+
+    def _enqueue(self, job_id: str, rubrics: Optional[List[str]], item_ids: List[str]):
+        self._rubrics[job_id] = rubrics
+        for item_id in item_ids:
+            self._queue.put_nowait((job_id, item_id))
+
+    def _notify(self, job_id: str):
+        event = self._updates.pop(job_id, None)
+        if event:
+            event.set()
+
+    async def _worker(self):
+        while True:
+            job_id, item_id = await self._queue.get()
+            try:
+                await self._process(job_id, item_id)
+            except Exception as e:
+                logger.error(f"Batch item {job_id}/{item_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str, item_id: str):
+        row = await asyncio.to_thread(self._store.item, job_id, item_id)
+        if row is None:
+            return
+        transcript, attempts = row
+
+        while True:
+            attempts += 1
+            try:
+                with llm_priority(BATCH):
+                    result = await analyze_transcript(transcript, self._rubrics.get(job_id), strict=True)
+            except EvaluationError as e:
+                if attempts >= BATCH_MAX_ATTEMPTS:
+                    self._stats["items_failed"] += 1
+                    await self._finish(job_id, item_id, "failed", attempts, error=str(e))
+                    return
+                self._stats["retries"] += 1
+                await asyncio.to_thread(self._store.record_attempt, job_id, item_id, attempts)
+                # Holding the worker slot while backing off slows the whole pool down when upstream struggles
+                await asyncio.sleep(BATCH_BACKOFF_SECS * 2 ** (attempts - 1) * random.uniform(0.5, 1.5))
+                continue
+            except Exception as e:
+                # Not an unusable answer but a fault, which a retry won't fix; a pending item would hang its stream
+                logger.exception(f"Batch item {job_id}/{item_id} crashed")
+                self._stats["items_failed"] += 1
+                await self._finish(job_id, item_id, "failed", attempts, error=f"{type(e).__name__}: {e}")
+                return
+            self._stats["items_done"] += 1
+            await self._finish(job_id, item_id, "done", attempts, result=result)
+            return
+
+    async def _finish(self, job_id: str, item_id: str, status: str, attempts: int, **outcome):
+        if await asyncio.to_thread(self._store.finish_item, job_id, item_id, status, attempts, **outcome):
+            self._rubrics.pop(job_id, None)
+            logger.info(f"Batch job {job_id} finished")
+        self._notify(job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        cancelled = await asyncio.to_thread(self._store.cancel_job, job_id)
+        self._notify(job_id)
+        return cancelled
+
+    async def stream(self, job_id: str) -> AsyncIterator[dict]:
+        """Every result of a job in completion order, following it until it ends, then a summary."""
+        seq = 0
+        while True:
+            event = self._updates.setdefault(job_id, asyncio.Event())
+            # The job first: items may finish while the results are read, and if it
+            # had ended already every one of its results is in
+            job = await asyncio.to_thread(self._store.job, job_id)
+            for seq, item_id, status, attempts, result, error in await asyncio.to_thread(
+                    self._store.results_since, job_id, seq):
+                line = {"type": "result", "id": item_id, "status": status, "attempts": attempts}
+                if result is not None:
+                    line["scores"] = json.loads(result)
+                if error:
+                    line["error"] = error
+                yield line
+
+            if job is None or job["status"] != "running":
+                yield {"type": "summary", **(job or {"job_id": job_id, "status": "unknown"})}
+                return
+            try:
+                await asyncio.wait_for(event.wait(), BATCH_POLL_SECS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        for job_id in self._store.resumable_jobs(self._worker_id):
+            job = self._store.job(job_id)
+            pending = self._store.pending_items(job_id)
+            self._stats["resumed_jobs"] += 1
+            self._enqueue(job_id, job["rubrics"], pending)
+            logger.info(f"Resuming batch job {job_id}: {len(pending)} of {job['total']} transcripts left")
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self._worker_count)]
+
+    async def stop(self):
+        # Items in flight stay pending in the store and are redone on the next start
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> dict:
+        return {**self._stats, "queued": self._queue.qsize(), "workers": self._worker_count}
+
+
+_runner: Optional[BatchRunner] = None
+
+
+def get_batch_runner() -> BatchRunner:
+    global _runner
+    if _runner is None:
+        from sessions import WORKER_ID
+        _runner = BatchRunner(BatchStore(), worker_id=WORKER_ID)
+    return _runner
@@ -0,0 +1,143 @@
+"""Synthetic call transcripts built from the persona scripts.
+
+Each transcript walks the usual call flow (greeting, customer info, mandatory
+questions, offer, close) with the customer's details taken from a persona and
+their questions taken from the lines quoted in its scenario. Lengths range from
+a few exchanges to a long call, and some agents skip or paraphrase required
+questions, so the compliance matcher sees hits, misses and ambiguous items.
+
+Usage::
+
+    python -m benchmarks.corpus --count 200 --out transcripts.jsonl
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+from typing import Iterator, List
+
+from personas.registry import Persona, get_persona_registry
+
+# (agent line, customer reply); the reply is formatted with the persona's details
+CALL_FLOW = [
+    ("Thank you for calling SaveOnEnergy, my name is Jordan. Who do I have the pleasure of speaking with?",
+     "Hi, this is {name}."),
+    ("Can I get your first and last name, please?", "It's {name}."),
+    ("What is the street address and zip code where you need service?", "{address}."),
+    ("And just to confirm, that's the city and state listed there?", "Yes, that's right."),
+    ("Do you rent or own the home?", "I {ownership_verb}."),
+    ("Is the electricity currently in your name at this address?", "Yes, it's in my name."),
+    ("Are the lights on at the property right now?", "Yes, they're on."),
+]
+
+# Looser wording for the same questions, which the compliance matcher can't always place
+PARAPHRASES = [
+    ("Where will we be setting up the service, and what's the postal code there?", "{address}."),
+    ("Is the account for the power already under you?", "I think so, yes."),
+    ("Is everything running over there at the moment?", "Yes, everything's working."),
+]
+
+OFFER = [
+    ("We do have a new customer coupon that takes ten dollars off your first bill.", "Oh, that's nice."),
+    ("As a SaveOnEnergy customer you also get a bill credit after your first month.", "Okay."),
+    ("Based on your usage, I'd recommend our twelve month fixed rate plan at 13.9 cents per kilowatt hour.",
+     "How does that compare to what I'm paying now?"),
+    ("It's fixed for the whole term, so your rate won't change with the season.", "That does sound better."),
+    ("There's no deposit and no monthly service fee on this plan.", "Good to know."),
+]
+
+CLOSE = [
+    ("Would you like me to go ahead and get that set up for you today?", "Yes, let's do it."),
+    ("Great, you're all set. Thank you for choosing SaveOnEnergy, have a wonderful day!", "Thanks, you too."),
+]
+
+FILLER_AGENT = [
+    "That's a great question.",
+    "I completely understand.",
+    "Let me check that for you.",
+    "Absolutely, I can walk you through that.",
+    "Sure, I'll explain how that works.",
+]
+
+FILLER_ANSWERS = [
+    "The rate I mentioned is all-in, there are no hidden fees on top of it.",
+    "The early termination fee on this plan is twenty dollars per remaining month.",
+    "For about a thousand kilowatt hours a month you'd be looking at around a hundred and forty dollars.",
+    "Yes, you can enroll online or I can do it with you right now on this call.",
+    "Your service would switch over within one to two business days, with no interruption.",
+]
+
+_QUOTED = re.compile(r'"([^"]{15,200})"')
+
+
+def customer_questions(persona: Persona) -> List[str]:
+    """The example questions a persona's scenario quotes, or generic ones if it has none."""
+    quoted = [q.strip() for q in _QUOTED.findall(persona.spec.scenario)]
+    return quoted or ["What would my monthly bill look like?", "Are there any fees I should know about?"]
+
+
+def build_transcript(persona: Persona, rng: random.Random, exchanges: int) -> str:
+    details = persona.spec.details
+    fields = {
+        "name": details.name,
+        "address": details.address,
+        "ownership_verb": "rent" if details.ownership.lower().startswith("rent") else "own",
+    }
+
+    # Every agent covers the greeting; the required questions are sometimes skipped or paraphrased
+    flow = [CALL_FLOW[0]]
+    for step in CALL_FLOW[1:]:
+        roll = rng.random()
+        if roll < 0.15:
+            continue
+        flow.append(rng.choice(PARAPHRASES) if roll < 0.3 else step)
+    flow += OFFER
+
+    # Customer questions and agent answers fill the middle of longer calls
+    questions = customer_questions(persona)
+    while len(flow) + len(CLOSE) < exchanges:
+        flow.append((f"{rng.choice(FILLER_AGENT)} {rng.choice(FILLER_ANSWERS)}", rng.choice(questions)))
+    flow += CLOSE if rng.random() < 0.8 else CLOSE[:1]
+
+    lines = []
+    for agent, customer in flow[:max(exchanges, 2)]:
+        lines.append(f"Agent: {agent}")
+        lines.append(f"Customer: {customer.format(**fields)}")
+    return "\n".join(lines)
+
+
+def generate(count: int, seed: int = 1) -> Iterator[dict]:
+    """``count`` transcripts spread over every persona, a third each short, medium and long."""
+    rng = random.Random(seed)
+    personas = sorted(get_persona_registry().personas(), key=lambda p: p.id)
+    for i in range(count):
+        persona = personas[i % len(personas)]
+        exchanges = rng.choice([rng.randint(3, 8), rng.randint(12, 24), rng.randint(30, 60)])
+        yield {
+            "id": f"synthetic-{seed}-{i}",
+            "persona": persona.id,
+            "exchanges": exchanges,
+            "transcript": build_transcript(persona, rng, exchanges),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic call transcripts")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="JSONL file to write (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        for item in generate(args.count, args.seed):
+            out.write(json.dumps(item) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
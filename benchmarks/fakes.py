@@ -0,0 +1,400 @@
+"""Deterministic local stand-ins for a call's transport and services.
+
+The replay transport plays agent utterances (recorded PCM or a synthetic voice)
+into the pipeline in real time and paces the bot's audio out like a real peer.
+The STT, LLM, TTS and evaluator fakes answer from fixed scripts after a
+configurable latency with jitter, so a pipeline built from them exercises every
+real processor of a call without touching the network.
+"""
+
+import asyncio
+import json
+import random
+import time
+import wave
+import zlib
+from typing import AsyncGenerator, List, Optional
+
+import numpy as np
+from langchain_core.messages import AIMessage
+from openai.types.chat import ChatCompletionChunk
+from openai.types.chat.chat_completion_chunk import Choice, ChoiceDelta
+from openai.types.completion_usage import CompletionUsage
+
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+from pipecat.frames.frames import (
+    BotStoppedSpeakingFrame,
+    CancelFrame,
+    EndFrame,
+    Frame,
+    InputAudioRawFrame,
+    InterimTranscriptionFrame,
+    OutputAudioRawFrame,
+    StartFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection
+from pipecat.services.stt_service import STTService
+from pipecat.services.tts_service import TTSService
+from pipecat.transports.base_input import BaseInputTransport
+from pipecat.transports.base_output import BaseOutputTransport
+from pipecat.transports.base_transport import BaseTransport, TransportParams
+from pipecat.utils.time import time_now_iso8601
+
+from benchmarks.stats import Latency
+from context_window import estimate_tokens
+from evaluators import EvaluatorEngine
+from llm_scheduler import current_priority
+from speculation import SpeculativeLLMService, normalize
+
+INPUT_SAMPLE_RATE = 16000
+CHUNK_SECS = 0.02
+
+# What the trainee says, one line per utterance, cycled
+AGENT_LINES = [
+    "Thank you for calling SaveOnEnergy, my name is Jordan, who do I have the pleasure of speaking with?",
+    "Great, and can I get the service address where you need electricity?",
+    "Before we continue, this call is recorded for quality and training purposes.",
+    "Are you currently the account holder, and do you rent or own the home?",
+    "Can I get a good email address so I can send over your plan details?",
+    "Do you know roughly how much electricity you use in a typical month?",
+    "Based on that, I have a twelve month fixed rate plan with no deposit required.",
+    "There is also a new customer discount that takes ten dollars off your first bill.",
+    "That rate is locked in, so your price per kilowatt hour will not change with the season.",
+    "Would you like me to go ahead and get that set up for you today?",
+]
+
+# What the customer answers, one line per reply, cycled
+CUSTOMER_LINES = [
+    "Hi, yes, this is Dana.",
+    "It's 1402 Elm Street in Dallas.",
+    "Okay, that's fine.",
+    "I rent, and the account would be in my name.",
+    "Sure, it's dana at email dot com.",
+    "I'm not sure, maybe around a thousand kilowatt hours? My last bill was pretty high.",
+    "Hmm, how does that compare to what I'm paying now? I really need to keep the bill down.",
+    "Okay, that helps. Is there any fee if I cancel early?",
+    "That sounds reasonable.",
+    "Let me think about it for a second. Okay, yes, let's do it.",
+]
+
+
+def synthetic_speech(secs: float, sample_rate: int, rng: random.Random) -> bytes:
+    """A loud voiced signal with syllable-rate amplitude modulation."""
+    t = np.arange(int(secs * sample_rate)) / sample_rate
+    pitch = rng.uniform(110, 220)
+    voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    syllables = 0.55 + 0.45 * np.sin(2 * np.pi * rng.uniform(3.5, 5.0) * t) ** 2
+    signal = 0.3 * voice * syllables / 2.3
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def silence(secs: float, sample_rate: int) -> bytes:
+    return bytes(2 * int(secs * sample_rate))
+
+
+def load_pcm(path: str) -> bytes:
+    """16-bit mono audio at ``INPUT_SAMPLE_RATE``, from a WAV file or raw little-endian PCM."""
+    if not path.endswith(".wav"):
+        with open(path, "rb") as f:
+            return f.read()
+    with wave.open(path, "rb") as f:
+        if f.getnchannels() != 1 or f.getsampwidth() != 2 or f.getframerate() != INPUT_SAMPLE_RATE:
+            raise ValueError(f"{path}: expected 16-bit mono {INPUT_SAMPLE_RATE} Hz audio")
+        return f.readframes(f.getnframes())
+
+
+def _rms(audio: bytes) -> float:
+    samples = np.frombuffer(audio, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class EnergyVADAnalyzer(VADAnalyzer):
+    """RMS threshold VAD, for runs that should leave the Silero model's cost out."""
+
+    def __init__(self, threshold: float = 500.0, *, sample_rate: Optional[int] = None,
+                 params: Optional[VADParams] = None):
+        super().__init__(sample_rate=sample_rate, params=params)
+        self._threshold = threshold
+
+    def num_frames_required(self) -> int:
+        # Same 32 ms window Silero uses at 16 kHz
+        return int(self.sample_rate * 0.032)
+
+    def voice_confidence(self, buffer) -> float:
+        return min(1.0, _rms(buffer) / self._threshold)
+
+
+class ReplayInputTransport(BaseInputTransport):
+    """Plays one utterance per turn in real time, then listens until the bot has answered.
+
+    Silence keeps flowing between utterances, as from a real microphone, so VAD
+    sees the end of speech. ``finished`` is set once every turn has been played.
+    """
+
+    def __init__(self, utterances: List[bytes], params: TransportParams, turns: int,
+                 gap: Latency, reply_timeout_secs: float = 15.0, seed: int = 0, **kwargs):
+        super().__init__(params, **kwargs)
+        self._utterances = utterances
+        self._turns = turns
+        self._gap = gap
+        self._reply_timeout_secs = reply_timeout_secs
+        self._rng = random.Random(seed)
+        self._replied = asyncio.Event()
+        self._replay_task: Optional[asyncio.Task] = None
+        self._next_at = 0.0
+        self.finished = asyncio.Event()
+        self.stats = {"utterances": 0, "reply_timeouts": 0}
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        await self.set_transport_ready(frame)
+        if not self._replay_task:
+            self._replay_task = self.create_task(self._replay())
+
+    async def stop(self, frame: EndFrame):
+        await self._cancel_replay()
+        await super().stop(frame)
+
+    async def cancel(self, frame: CancelFrame):
+        await self._cancel_replay()
+        await super().cancel(frame)
+
+    async def _cancel_replay(self):
+        if self._replay_task:
+            await self.cancel_task(self._replay_task)
+            self._replay_task = None
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, BotStoppedSpeakingFrame):
+            self._replied.set()
+
+    async def _play(self, audio: bytes):
+        # Paced against a fixed clock, so a slow loop delivers late bursts rather than drifting
+        chunk_bytes = 2 * int(INPUT_SAMPLE_RATE * CHUNK_SECS)
+        for offset in range(0, len(audio), chunk_bytes):
+            self._next_at += CHUNK_SECS
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.push_audio_frame(
+                InputAudioRawFrame(audio=audio[offset:offset + chunk_bytes], sample_rate=INPUT_SAMPLE_RATE,
+                                   num_channels=1)
+            )
+
+    async def _replay(self):
+        quiet = silence(CHUNK_SECS, INPUT_SAMPLE_RATE)
+        self._next_at = time.monotonic()
+        await self._play(silence(0.5, INPUT_SAMPLE_RATE))
+        for turn in range(self._turns):
+            self._replied.clear()
+            await self._play(self._utterances[turn % len(self._utterances)])
+            self.stats["utterances"] += 1
+
+            deadline = time.monotonic() + self._reply_timeout_secs
+            while not self._replied.is_set():
+                if time.monotonic() > deadline:
+                    self.stats["reply_timeouts"] += 1
+                    break
+                await self._play(quiet)
+            # The agent takes a moment before the next line
+            await self._play(silence(self._gap.sample(self._rng), INPUT_SAMPLE_RATE))
+        self.finished.set()
+
+
+class ReplayOutputTransport(BaseOutputTransport):
+    """Consumes the bot's audio at playback speed, like the browser on the other end."""
+
+    def __init__(self, params: TransportParams, **kwargs):
+        super().__init__(params, **kwargs)
+        self._play_until = 0.0
+        self.stats = {"audio_secs": 0.0, "messages": 0}
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        await self.set_transport_ready(frame)
+
+    async def send_message(self, frame):
+        self.stats["messages"] += 1
+
+    async def write_audio_frame(self, frame: OutputAudioRawFrame):
+        duration = len(frame.audio) / (2 * frame.num_channels * frame.sample_rate)
+        self.stats["audio_secs"] += duration
+        now = time.monotonic()
+        self._play_until = max(self._play_until, now) + duration
+        await asyncio.sleep(self._play_until - now)
+
+
+class ReplayTransport(BaseTransport):
+    def __init__(self, utterances: List[bytes], params: TransportParams, **replay_kwargs):
+        super().__init__()
+        self._input = ReplayInputTransport(utterances, params, name=self._input_name, **replay_kwargs)
+        self._output = ReplayOutputTransport(params, name=self._output_name)
+
+    def input(self) -> ReplayInputTransport:
+        return self._input
+
+    def output(self) -> ReplayOutputTransport:
+        return self._output
+
+
+class FakeSTTService(STTService):
+    """Finalises a scripted transcript ``latency`` after the audio goes quiet.
+
+    While the agent speaks, interim transcripts grow by a word at a time at the
+    replay voice's pace, stopping one word short of the line. End of speech is
+    found by energy, like Deepgram's endpointing, so the final transcript
+    usually lands before VAD gives up on the pause.
+    """
+
+    def __init__(self, lines: List[str], latency: Latency, seed: int = 0, endpoint_secs: float = 0.3,
+                 threshold: float = 500.0, chars_per_sec: float = 15.0, **kwargs):
+        super().__init__(**kwargs)
+        self._lines = lines
+        self._latency = latency
+        self._rng = random.Random(seed)
+        self._endpoint_secs = endpoint_secs
+        self._threshold = threshold
+        self._chars_per_sec = chars_per_sec
+        self._speaking = False
+        self._quiet_secs = 0.0
+        self._spoken_secs = 0.0
+        self._interim_words = 0
+        self._utterance = 0
+
+    async def run_stt(self, audio: bytes) -> AsyncGenerator[Frame, None]:
+        secs = len(audio) / (2 * self.sample_rate)
+        if _rms(audio) >= self._threshold:
+            self._speaking = True
+            self._quiet_secs = 0.0
+            self._spoken_secs += secs
+            words = self._lines[self._utterance % len(self._lines)].split(" ")
+            heard = 0
+            for i in range(len(words) - 1):
+                if len(" ".join(words[:i + 1])) > self._spoken_secs * self._chars_per_sec:
+                    break
+                heard = i + 1
+            if heard > self._interim_words:
+                self._interim_words = heard
+                yield InterimTranscriptionFrame(" ".join(words[:heard]), "", time_now_iso8601())
+        elif self._speaking:
+            self._quiet_secs += secs
+            if self._quiet_secs >= self._endpoint_secs:
+                self._speaking = False
+                self._spoken_secs = 0.0
+                self._interim_words = 0
+                text = self._lines[self._utterance % len(self._lines)]
+                self._utterance += 1
+                self.create_task(self._finalize(text, self._latency.sample(self._rng)))
+
+    async def _finalize(self, text: str, delay: float):
+        await asyncio.sleep(delay)
+        await self.push_frame(TranscriptionFrame(text, "", time_now_iso8601()))
+
+
+class _FakeStream:
+    """Enough of ``openai.AsyncStream`` for pipecat: async iteration and ``close``."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self._chunks
+
+    async def close(self):
+        await self._chunks.aclose()
+
+
+class FakeLLMService(SpeculativeLLMService):
+    """Streams a scripted customer reply word by word after ``ttft``.
+
+    Answers at the chat completions level, so speculative replies and the usual
+    request path both run. The reply is picked from the agent's last message,
+    so a speculative request gets the same answer the turn itself would.
+    """
+
+    def __init__(self, lines: List[str], ttft: Latency, tokens_per_sec: float = 50.0, seed: int = 0, **kwargs):
+        super().__init__(model="fake-llm", api_key="offline", **kwargs)
+        self._lines = lines
+        self._ttft = ttft
+        self._token_secs = 1.0 / tokens_per_sec
+        self._rng = random.Random(seed)
+        self.stats = {"requests": 0}
+
+    async def get_chat_completions(self, context, messages) -> _FakeStream:
+        self.stats["requests"] += 1
+        user = next((m for m in reversed(messages) if m.get("role") == "user"), None)
+        said = normalize(str(user.get("content") or "")) if user else ""
+        reply = self._lines[zlib.crc32(said.encode()) % len(self._lines)]
+        return _FakeStream(self._stream(reply, estimate_tokens(messages)))
+
+    async def _stream(self, reply: str, prompt_tokens: int):
+        await asyncio.sleep(self._ttft.sample(self._rng))
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            yield self._chunk(delta=ChoiceDelta(content=word if i == 0 else f" {word}"))
+            await asyncio.sleep(self._token_secs)
+        yield self._chunk(usage=CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=len(words),
+                                                total_tokens=prompt_tokens + len(words)))
+
+    @staticmethod
+    def _chunk(delta: Optional[ChoiceDelta] = None, usage: Optional[CompletionUsage] = None) -> ChatCompletionChunk:
+        choices = [Choice(index=0, delta=delta)] if delta else []
+        return ChatCompletionChunk(id="fake", choices=choices, created=int(time.time()), model="fake-llm",
+                                   object="chat.completion.chunk", usage=usage)
+
+
+class FakeTTSService(TTSService):
+    """Streams a synthetic voice, about as long as the text would take to say, after ``ttfb``."""
+
+    def __init__(self, ttfb: Latency, sample_rate: int, seed: int = 0, chars_per_sec: float = 15.0, **kwargs):
+        super().__init__(sample_rate=sample_rate, **kwargs)
+        self._ttfb = ttfb
+        self._rng = random.Random(seed)
+        self._chars_per_sec = chars_per_sec
+
+    def can_generate_metrics(self) -> bool:
+        return True
+
+    async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
+        await self.start_ttfb_metrics()
+        yield TTSStartedFrame()
+        await asyncio.sleep(self._ttfb.sample(self._rng))
+        await self.start_tts_usage_metrics(text)
+
+        audio = synthetic_speech(len(text) / self._chars_per_sec, self.sample_rate, self._rng)
+        # Faster than real time, in 40 ms chunks, the way the streaming APIs deliver it
+        chunk_bytes = 2 * int(self.sample_rate * 0.04)
+        await self.stop_ttfb_metrics()
+        for offset in range(0, len(audio), chunk_bytes):
+            yield TTSAudioRawFrame(audio[offset:offset + chunk_bytes], self.sample_rate, 1)
+        yield TTSStoppedFrame()
+
+
+class FakeEvaluatorEngine(EvaluatorEngine):
+    """The real evaluator engine, answering every chain locally after ``latency``."""
+
+    SUMMARY = "The agent greeted the customer, collected their details and is presenting a fixed rate plan."
+
+    def __init__(self, latency: Latency, seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self._latency = latency
+        self._rng = random.Random(seed)
+
+    def _answer(self, chain) -> str:
+        if chain is self._sentiment_chain:
+            return str(self._rng.randint(40, 85))
+        if chain is self._checklist_chain:
+            return json.dumps({"covered": []})
+        if chain is self._summary_chain:
+            return self.SUMMARY
+        return json.dumps({"score": self._rng.randint(60, 95)})
+
+    async def _run(self, chain, transcript: str, priority: Optional[str] = None):
+        async with self._semaphore(priority or current_priority()):
+            await asyncio.sleep(self._latency.sample(self._rng))
+            return AIMessage(content=self._answer(chain))
@@ -0,0 +1,242 @@
+"""Offline load test: how many concurrent calls can one host carry?
+
+Runs N calls at once through the same pipeline as ``run_bot`` (``create_call_task``)
+with a replay transport and local fake STT/LLM/TTS/evaluator services, for each
+N of ``--calls``, and reports per level:
+
+- CPU per call (percent of one core) and resident memory per call
+- event-loop lag, from a probe that should wake every 50 ms
+- reply latency percentiles from each call's ``LatencyObserver``: ``reply`` is
+  VAD end of speech -> first bot audio, ``perceived`` adds the wait from the
+  agent's last speech frame
+- speculative replies answered early (``spec hits``) and LLM requests made;
+  ``--no-speculate`` runs the same calls without speculation for comparison
+
+Usage (from the repository root, no network or API keys needed)::
+
+    python -m benchmarks.load_test --calls 1,5,10,20 --turns 8
+    python -m benchmarks.load_test --calls 10 --pcm agent1.wav --pcm agent2.wav
+    python -m benchmarks.load_test --calls 20 --max-p95-secs 2.5 --json results.json
+
+Without ``--pcm`` the agent's utterances are a synthetic voice. VAD is the pooled
+Silero model a real call uses; ``--vad energy`` swaps in a plain RMS threshold
+to take the model's cost out of the numbers.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List
+
+# Keep caches, reports and session files out of the real data directory,
+# and give the OpenAI clients a key; nothing is ever sent.
+os.environ.setdefault("ASCEND_DATA_DIR", tempfile.mkdtemp(prefix="ascend-load-"))
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+from loguru import logger
+
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.transports.base_transport import TransportParams
+
+import evaluators
+from bot import CALL_VAD_PARAMS, TTS_SAMPLE_RATE, create_call_task
+from benchmarks.fakes import (
+    AGENT_LINES,
+    CUSTOMER_LINES,
+    INPUT_SAMPLE_RATE,
+    EnergyVADAnalyzer,
+    FakeEvaluatorEngine,
+    FakeLLMService,
+    FakeSTTService,
+    FakeTTSService,
+    ReplayTransport,
+    load_pcm,
+    synthetic_speech,
+)
+from benchmarks.stats import Latency, LoopProbe, cpu_secs, rss_bytes, summarize
+from personas.registry import get_persona_registry
+from turn_detection import TURN_DETECTION, TURN_MODES, AdaptiveTurnAnalyzer, vad_params
+from vad_pool import get_vad_pool
+
+def agent_utterances(args) -> List[bytes]:
+    if args.pcm:
+        return [load_pcm(path) for path in args.pcm]
+    rng = random.Random(args.seed)
+    # Roughly the time it takes to say each scripted line
+    return [synthetic_speech(len(line) / 15.0, INPUT_SAMPLE_RATE, rng) for line in AGENT_LINES]
+
+
+async def run_call(index: int, args, utterances: List[bytes]) -> dict:
+    seed = args.seed * 1000 + index
+    personas = get_persona_registry().personas()
+    persona = personas[index % len(personas)]
+
+    if args.vad == "silero":
+        vad_analyzer = get_vad_pool().lease(params=vad_params(CALL_VAD_PARAMS, args.turn_detection))
+    else:
+        vad_analyzer = EnergyVADAnalyzer(params=vad_params(CALL_VAD_PARAMS, args.turn_detection))
+    turn_analyzer = AdaptiveTurnAnalyzer(vad_analyzer) if args.turn_detection == "adaptive" else None
+
+    transport = ReplayTransport(
+        utterances,
+        TransportParams(
+            audio_in_enabled=True,
+            audio_in_sample_rate=INPUT_SAMPLE_RATE,
+            audio_out_enabled=True,
+            vad_analyzer=vad_analyzer,
+            turn_analyzer=turn_analyzer,
+            audio_out_10ms_chunks=1,
+        ),
+        turns=args.turns,
+        gap=args.agent_gap,
+        seed=seed,
+    )
+    services = {
+        "stt": FakeSTTService(AGENT_LINES, args.stt, seed=seed),
+        "llm": FakeLLMService(CUSTOMER_LINES, args.llm, tokens_per_sec=args.llm_tokens_per_sec, seed=seed),
+        "tts": FakeTTSService(args.tts, TTS_SAMPLE_RATE, seed=seed),
+    }
+    counters = {"turns": 0}
+    task, latency_observer, _ = create_call_task(transport, services, persona, f"load-{index}",
+                                                 vad_analyzer.params.stop_secs, counters, speculate=args.speculate,
+                                                 turn_analyzer=turn_analyzer)
+
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    try:
+        await asyncio.wait_for(transport.input().finished.wait(), timeout=args.turns * 30)
+    except asyncio.TimeoutError:
+        logger.warning(f"Call {index} did not finish its turns in time")
+    finally:
+        await task.cancel()
+        await runner
+        if args.vad == "silero":
+            get_vad_pool().release(vad_analyzer)
+        latency_observer.close()
+
+    return {"turns": latency_observer.turns, "speculation": counters.get("speculation", {}),
+            "llm_requests": services["llm"].stats["requests"], **transport.input().stats}
+
+
+async def run_level(calls: int, args, utterances: List[bytes]) -> dict:
+    probe = LoopProbe()
+    rss_before = rss_bytes()
+    cpu_before = cpu_secs()
+    started = time.monotonic()
+    probe.start()
+
+    async def staggered(index: int):
+        # Spread the starts so the calls don't all speak in lockstep
+        await asyncio.sleep(args.ramp_secs * index / calls)
+        return await run_call(index, args, utterances)
+
+    results = await asyncio.gather(*(staggered(i) for i in range(calls)))
+    await probe.stop()
+    wall = time.monotonic() - started
+    cpu = cpu_secs() - cpu_before
+
+    turns = [t for r in results for t in r["turns"]]
+    reply = [t["first_audio_out"] for t in turns]
+    perceived = [t["perceived_secs"] for t in turns]
+
+    return {
+        "calls": calls,
+        "wall_secs": round(wall, 2),
+        "turns": len(turns),
+        "utterances": sum(r["utterances"] for r in results),
+        "reply_timeouts": sum(r["reply_timeouts"] for r in results),
+        "cpu_pct_per_call": round(100 * cpu / wall / calls, 2),
+        "rss_mb_per_call": round((probe.peak_rss - rss_before) / calls / 2 ** 20, 2),
+        "rss_mb_total": round(probe.peak_rss / 2 ** 20, 1),
+        "loop_lag_ms": probe.report(),
+        "reply_secs": summarize(reply),
+        "perceived_secs": summarize(perceived),
+        "llm_requests": sum(r["llm_requests"] for r in results),
+        "speculation": {k: round(sum(r["speculation"].get(k, 0) for r in results), 3)
+                        for k in ("started", "hit", "miss", "none", "cancelled", "saved_secs")},
+    }
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value}"
+
+
+def print_table(levels: List[dict]):
+    header = ("calls", "turns", "timeouts", "cpu%/call", "rss MB/call", "lag p99 ms", "lag max ms",
+              "reply p50", "reply p95", "reply p99", "perceived p95", "spec hits", "llm reqs")
+    rows = [(l["calls"], l["turns"], l["reply_timeouts"], l["cpu_pct_per_call"], l["rss_mb_per_call"],
+             l["loop_lag_ms"]["p99"], l["loop_lag_ms"]["max"], l["reply_secs"]["p50"], l["reply_secs"]["p95"],
+             l["reply_secs"]["p99"], l["perceived_secs"]["p95"], l["speculation"]["hit"], l["llm_requests"])
+            for l in levels]
+    widths = [max(len(h), *(len(_fmt(r[i])) for r in rows)) for i, h in enumerate(header)]
+    print("  ".join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(_fmt(v).rjust(w) for v, w in zip(row, widths)))
+
+
+async def main(args) -> int:
+    evaluators._engine = FakeEvaluatorEngine(args.evaluator, seed=args.seed)
+    if args.vad == "silero":
+        get_vad_pool()
+    utterances = agent_utterances(args)
+
+    levels = []
+    for calls in args.calls:
+        logger.info(f"Running {calls} concurrent calls, {args.turns} turns each")
+        level = await run_level(calls, args, utterances)
+        levels.append(level)
+        print_table([level])
+
+    print()
+    print_table(levels)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: str(v) for k, v in vars(args).items()}, "levels": levels}, f, indent=2)
+
+    if args.max_p95_secs is not None:
+        worst = max((l["perceived_secs"]["p95"] or 0 for l in levels), default=0)
+        if worst > args.max_p95_secs:
+            print(f"FAIL: perceived p95 {worst}s exceeds {args.max_p95_secs}s")
+            return 1
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline concurrent call load test")
+    parser.add_argument("--calls", type=lambda s: [int(n) for n in s.split(",")], default=[1, 5, 10, 20],
+                        help="Comma-separated concurrency levels to run in turn")
+    parser.add_argument("--turns", type=int, default=6, help="Agent utterances per call")
+    parser.add_argument("--pcm", action="append",
+                        help="Agent utterance recording (16 kHz mono WAV or raw s16le), repeatable")
+    parser.add_argument("--vad", choices=["silero", "energy"], default="silero")
+    parser.add_argument("--turn-detection", choices=TURN_MODES, default=TURN_DETECTION,
+                        help="End agent turns on the fixed VAD stop time or adaptively from transcript cues")
+    parser.add_argument("--stt", type=Latency.parse, default=Latency(0.15, 0.05),
+                        help="STT finalisation delay after end of speech, mean[:jitter] secs")
+    parser.add_argument("--llm", type=Latency.parse, default=Latency(0.45, 0.15), help="LLM time to first token")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=60.0)
+    parser.add_argument("--no-speculate", dest="speculate", action="store_false",
+                        help="Wait for the end of each turn before asking the LLM")
+    parser.add_argument("--tts", type=Latency.parse, default=Latency(0.25, 0.08), help="TTS time to first byte")
+    parser.add_argument("--evaluator", type=Latency.parse, default=Latency(0.8, 0.3),
+                        help="In-call scoring / sentiment / summary call latency")
+    parser.add_argument("--agent-gap", type=Latency.parse, default=Latency(0.8, 0.4),
+                        help="Pause after the bot's reply before the agent speaks again")
+    parser.add_argument("--ramp-secs", type=float, default=3.0, help="Spread call starts over this long")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--max-p95-secs", type=float,
+                        help="Exit non-zero if any level's perceived p95 exceeds this, for CI")
+    parser.add_argument("--verbose", "-v", action="count")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logger.remove(0)
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "WARNING")
+    sys.exit(asyncio.run(main(args)))
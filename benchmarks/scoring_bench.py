@@ -0,0 +1,257 @@
+"""Throughput benchmark for the post-call scoring endpoints.
+
+Starts the OpenAI-compatible stub (``benchmarks.stub_llm``) and points the
+evaluators at it, then sends synthetic transcripts (``benchmarks.corpus``) to the
+scoring endpoints at each concurrency level of ``--concurrency``. By default the
+app from ``server.py`` is served in-process, so event-loop blocking inside the
+handlers shows up in the numbers; ``--url`` targets a running server instead.
+The score cache is off unless ``--cache`` is given, so every request reaches the
+model.
+
+Reported per level: requests per second, p50/p99 latency per endpoint, event-loop
+blocking time and how often each endpoint answered with its fallback score
+(85, 3 or 70, or the default feedback), next to what the stub actually served.
+
+Evaluator changes should come with before/after numbers::
+
+    python -m benchmarks.scoring_bench --json before.json
+    # ...change the evaluators...
+    python -m benchmarks.scoring_bench --compare before.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+os.environ.setdefault("ASCEND_DATA_DIR", tempfile.mkdtemp(prefix="ascend-scoring-"))
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+from loguru import logger
+
+from benchmarks.corpus import generate
+from benchmarks.stats import Latency, LoopProbe, cpu_secs, summarize
+
+ENDPOINTS = ["compliance", "overall_score", "customer_satisfaction", "script_adherence", "hesitation", "feedback"]
+
+# Endpoint -> score it returns when the model's answer can't be used
+FALLBACK_SCORES = {
+    "compliance": 85,
+    "overall_score": 85,
+    "customer_satisfaction": 3,
+    "script_adherence": 70,
+    "hesitation": 70,
+}
+
+STUB_STARTUP_SECS = 30
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(args) -> tuple:
+    port = _free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.stub_llm", "--port", str(port),
+        "--latency", f"{args.latency.mean}:{args.latency.jitter}",
+        "--malformed-rate", str(args.malformed_rate), "--error-rate", str(args.error_rate),
+        "--seed", str(args.seed),
+    ])
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STUB_STARTUP_SECS
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{url}/stats", timeout=1)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Stub model server did not start")
+
+
+def is_fallback(endpoint: str, value, default_feedback: str) -> bool:
+    if endpoint == "feedback":
+        return value == default_feedback
+    return value == FALLBACK_SCORES[endpoint]
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, requests: int, work: list,
+                    stub_url: Optional[str], default_feedback: str) -> dict:
+    stub_before = httpx.get(f"{stub_url}/stats").json() if stub_url else {}
+    queue = itertools.islice(itertools.cycle(work), requests)
+    latencies: Dict[str, List[float]] = {e: [] for e in ENDPOINTS}
+    fallbacks = {e: 0 for e in ENDPOINTS}
+    errors = {e: 0 for e in ENDPOINTS}
+
+    async def worker():
+        for endpoint, transcript in queue:
+            start = time.monotonic()
+            try:
+                response = await client.post(f"/api/{endpoint}", json={"transcript": transcript})
+                response.raise_for_status()
+                value = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                logger.debug(f"{endpoint} failed: {e}")
+                errors[endpoint] += 1
+                continue
+            latencies[endpoint].append(time.monotonic() - start)
+            if is_fallback(endpoint, value, default_feedback):
+                fallbacks[endpoint] += 1
+
+    probe = LoopProbe()
+    cpu_before = cpu_secs()
+    started = time.monotonic()
+    probe.start()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await probe.stop()
+    wall = time.monotonic() - started
+
+    stub_served = {}
+    if stub_url:
+        after = httpx.get(f"{stub_url}/stats").json()
+        for kind, counts in after.items():
+            before = stub_before.get(kind, {})
+            stub_served[kind] = {k: v - before.get(k, 0) for k, v in counts.items()}
+
+    completed = sum(len(v) for v in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "wall_secs": round(wall, 2),
+        "req_per_sec": round(completed / wall, 2),
+        "latency_secs": summarize([v for values in latencies.values() for v in values]),
+        "cpu_pct": round(100 * (cpu_secs() - cpu_before) / wall, 1),
+        "loop_blocking_ms": probe.report(),
+        "endpoints": {
+            e: {
+                "completed": len(latencies[e]),
+                "errors": errors[e],
+                **summarize(latencies[e], (("p50", 0.5), ("p99", 0.99))),
+                "fallbacks": fallbacks[e],
+                "fallback_rate": round(fallbacks[e] / len(latencies[e]), 3) if latencies[e] else None,
+            }
+            for e in ENDPOINTS if latencies[e] or errors[e]
+        },
+        "stub_served": stub_served,
+    }
+
+
+def print_level(level: dict):
+    lag = level["loop_blocking_ms"]
+    print(f"\nconcurrency {level['concurrency']}: {level['req_per_sec']} req/s, "
+          f"p50 {level['latency_secs']['p50']}s, p99 {level['latency_secs']['p99']}s, cpu {level['cpu_pct']}%, "
+          f"loop blocked {lag['blocked_total']} ms (p99 lag {lag['p99']} ms, max {lag['max']} ms)")
+    print(f"  {'endpoint':<24}{'done':>6}{'errors':>8}{'p50 s':>9}{'p99 s':>9}{'fallbacks':>11}{'rate':>8}")
+    for name, e in level["endpoints"].items():
+        print(f"  {name:<24}{e['completed']:>6}{e['errors']:>8}{e['p50'] or '-':>9}{e['p99'] or '-':>9}"
+              f"{e['fallbacks']:>11}{e['fallback_rate'] if e['fallback_rate'] is not None else '-':>8}")
+    if level["stub_served"]:
+        served = ", ".join(f"{kind} {c['ok']}/{c['malformed']}/{c['error']}"
+                           for kind, c in sorted(level["stub_served"].items()))
+        print(f"  stub served (ok/malformed/error): {served}")
+
+
+def print_comparison(before: dict, after: dict):
+    print("\nbefore -> after")
+    previous = {level["concurrency"]: level for level in before["levels"]}
+    for level in after["levels"]:
+        old = previous.get(level["concurrency"])
+        if not old:
+            continue
+        print(f"  concurrency {level['concurrency']}: req/s {old['req_per_sec']} -> {level['req_per_sec']}, "
+              f"p99 {old['latency_secs']['p99']} -> {level['latency_secs']['p99']}s, "
+              f"loop blocked {old['loop_blocking_ms']['blocked_total']} -> "
+              f"{level['loop_blocking_ms']['blocked_total']} ms")
+        for name, e in level["endpoints"].items():
+            o = old["endpoints"].get(name)
+            if o:
+                print(f"    {name:<24}p99 {o['p99']} -> {e['p99']}s, fallback rate {o['fallback_rate']} -> "
+                      f"{e['fallback_rate']}")
+
+
+async def main(args) -> int:
+    stub, stub_url = (None, args.stub_url) if args.stub_url else start_stub(args)
+    try:
+        if not args.url:
+            # The evaluators' OpenAI clients read these when the engine is first built
+            os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = f"{stub_url}/v1"
+
+        import evaluators
+        default_feedback = evaluators.DEFAULT_FEEDBACK_TEXT.strip()
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=300)
+        else:
+            from server import app
+            if not args.cache:
+                evaluators._engine = evaluators.EvaluatorEngine(cache=None)
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300)
+
+        corpus = [item["transcript"] for item in generate(args.corpus_size, args.seed)]
+        work = [(e, t) for t in corpus for e in args.endpoints]
+        random.Random(args.seed).shuffle(work)
+
+        levels = []
+        async with client:
+            # One unmeasured request per endpoint, so first-use setup doesn't count as blocking
+            await asyncio.gather(*(client.post(f"/api/{e}", json={"transcript": corpus[0]}) for e in args.endpoints))
+            for concurrency in args.concurrency:
+                level = await run_level(client, concurrency, args.requests, work, stub_url, default_feedback)
+                levels.append(level)
+                print_level(level)
+    finally:
+        if stub:
+            stub.terminate()
+            stub.wait(timeout=10)
+
+    result = {"args": {k: str(v) for k, v in vars(args).items()}, "levels": levels}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), result)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scoring endpoint throughput benchmark")
+    parser.add_argument("--concurrency", type=lambda s: [int(n) for n in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=120, help="Requests per concurrency level")
+    parser.add_argument("--endpoints", type=lambda s: s.split(","), default=ENDPOINTS)
+    parser.add_argument("--corpus-size", type=int, default=60)
+    parser.add_argument("--latency", type=Latency.parse, default=Latency(0.6, 0.3),
+                        help="Stub model latency, mean[:jitter] secs")
+    parser.add_argument("--malformed-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="Keep the score cache on")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--stub-url", help="Use an already running stub instead of starting one")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file of an earlier run to compare against")
+    parser.add_argument("--verbose", "-v", action="count")
+    args = parser.parse_args(argv)
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logger.remove(0)
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "WARNING")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,88 @@
+"""Measurement helpers shared by the benchmarks."""
+
+import asyncio
+import os
+import random
+import resource
+import time
+from typing import Dict, List, Optional
+
+LAG_PROBE_SECS = 0.05
+
+
+class Latency:
+    """A delay of ``mean`` seconds, uniformly spread by up to ``jitter`` either side."""
+
+    def __init__(self, mean: float, jitter: float = 0.0):
+        self.mean = mean
+        self.jitter = jitter
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, self.mean + rng.uniform(-self.jitter, self.jitter))
+
+    @classmethod
+    def parse(cls, value: str) -> "Latency":
+        """``"0.3"`` or ``"0.3:0.1"`` (mean:jitter, in seconds)."""
+        mean, _, jitter = value.partition(":")
+        return cls(float(mean), float(jitter or 0))
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(values: List[float], quantiles=(("p50", 0.5), ("p95", 0.95), ("p99", 0.99)),
+              scale: float = 1.0, digits: int = 4) -> Dict[str, Optional[float]]:
+    return {name: round(scale * percentile(values, q), digits) if values else None for name, q in quantiles}
+
+
+def cpu_secs() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current, but all there is without procfs (KiB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoopProbe:
+    """Measures how late the event loop wakes a task up, sampling RSS as it goes.
+
+    Each wake-up later than ``LAG_PROBE_SECS`` means something held the loop for
+    that long; the sum of those delays approximates the time the loop was blocked.
+    """
+
+    def __init__(self):
+        self.lags: List[float] = []
+        self.peak_rss = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(LAG_PROBE_SECS)
+            self.lags.append(max(0.0, time.monotonic() - start - LAG_PROBE_SECS))
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+
+    def start(self):
+        self.peak_rss = rss_bytes()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    def report(self) -> dict:
+        return {
+            **summarize(self.lags, (("p50", 0.5), ("p99", 0.99)), scale=1000, digits=2),
+            "max": round(1000 * max(self.lags), 2) if self.lags else None,
+            "blocked_total": round(1000 * sum(self.lags), 1),
+        }
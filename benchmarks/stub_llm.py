@@ -0,0 +1,236 @@
+"""Local OpenAI-compatible chat completions stub for benchmarking the evaluators.
+
+Recognises each evaluator prompt (rubric scores, feedback, combined analysis,
+sentiment, checklist, summary) by its system message and answers in the shape
+that prompt asks for, after a configurable latency. A share of answers can be
+malformed (prose around the JSON, truncated JSON, wrong keys) and a share of
+requests can fail with a 500, to exercise the fallback paths.
+
+Valid scores never equal a rubric's fallback value (85, 3 or 70), so a client
+that gets one of those back knows a fallback was used. Streamed requests get
+the same answer as SSE chunks; with ``--tokens-per-sec`` answers take as long
+to write as a model would (about four characters a token), after the latency.
+
+Usage::
+
+    python -m benchmarks.stub_llm --port 8099 --latency 0.6:0.3 --malformed-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 python server.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stats import Latency
+from evaluators import (
+    CHECKLIST_PROMPT,
+    FEEDBACK_CATEGORIES,
+    FEEDBACK_PROMPT,
+    RUBRICS,
+    SENTIMENT_PROMPT,
+    SUMMARY_PROMPT,
+)
+
+ANALYSIS_FIRST_LINE = "You are a customer-service call evaluator. Read the transcript"
+
+_ANALYSIS_KEY = re.compile(r'"(\w+)" \((number|array)\)')
+_CHECKLIST_ITEM = re.compile(r"^- (\w+): ", re.MULTILINE)
+# Characters per streamed chunk, a few tokens' worth
+_CHUNK_CHARS = 12
+
+
+def _first_line(prompt: str) -> str:
+    return prompt.strip().splitlines()[0].strip()
+
+
+# First line of each evaluator system prompt -> the kind of answer it expects
+PROMPT_KINDS = {
+    **{_first_line(rubric["prompt"]): name for name, rubric in RUBRICS.items()},
+    _first_line(FEEDBACK_PROMPT): "feedback",
+    _first_line(SENTIMENT_PROMPT): "sentiment",
+    _first_line(CHECKLIST_PROMPT): "checklist",
+    _first_line(SUMMARY_PROMPT): "summary",
+}
+
+FALLBACK_SCORES = {85, 70}
+
+FEEDBACK_LINES = [
+    "Confirm the service address and zip code before discussing plans.",
+    "Summarise the plan's total monthly cost before asking for the sale.",
+    "Acknowledge the customer's budget concern before presenting the offer.",
+    "Answer fee questions directly and without pausing.",
+]
+
+
+def classify(system: str) -> str:
+    first = _first_line(system) if system.strip() else ""
+    if first.startswith(ANALYSIS_FIRST_LINE):
+        return "analysis"
+    return PROMPT_KINDS.get(first, "unknown")
+
+
+class StubModel:
+    def __init__(self, latency: Latency, malformed_rate: float, error_rate: float, seed: int = 0,
+                 tokens_per_sec: float = 0.0):
+        self._latency = latency
+        self._tokens_per_sec = tokens_per_sec
+        self._malformed_rate = malformed_rate
+        self._error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.stats = {}
+
+    def _count(self, kind: str, outcome: str):
+        counts = self.stats.setdefault(kind, {"ok": 0, "malformed": 0, "error": 0})
+        counts[outcome] += 1
+
+    def _score(self, low: int = 1, high: int = 100) -> int:
+        if high == 5:
+            return self._rng.choice([1, 2, 4, 5])
+        while True:
+            score = self._rng.randint(low, high)
+            if score not in FALLBACK_SCORES:
+                return score
+
+    def _feedback(self) -> list:
+        return [{"category": c, "feedback": self._rng.choice(FEEDBACK_LINES)} for c in FEEDBACK_CATEGORIES]
+
+    def answer(self, kind: str, system: str, user: str) -> str:
+        if kind in RUBRICS:
+            return json.dumps({"score": self._score(1, 5 if kind == "customer_satisfaction" else 100)})
+        if kind == "analysis":
+            payload = {}
+            for key, _ in _ANALYSIS_KEY.findall(system):
+                payload[key] = self._feedback() if key == "feedback" else \
+                    self._score(1, 5 if key == "customer_satisfaction" else 100)
+            return json.dumps(payload)
+        if kind == "feedback":
+            return json.dumps(self._feedback())
+        if kind == "sentiment":
+            return str(self._rng.randint(20, 95))
+        if kind == "checklist":
+            items = _CHECKLIST_ITEM.findall(user)
+            return json.dumps({"covered": [i for i in items if self._rng.random() < 0.5]})
+        if kind == "summary":
+            return "The customer shared their name and address and asked about monthly fees."
+        return "OK"
+
+    def malformed(self, kind: str, answer: str) -> str:
+        variant = self._rng.randrange(4)
+        if variant == 0:
+            return f"Sure! Here is my evaluation:\n{answer}\nLet me know if you need anything else."
+        if variant == 1:
+            return answer[:max(1, len(answer) // 2)]
+        if variant == 2:
+            return json.dumps({"rating": self._score()}) if kind != "sentiment" else "Fairly positive overall."
+        return ""
+
+    async def _chunks(self, body: dict, content: str):
+        created, completion_id = int(time.time()), f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> str:
+            choices = [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+            return "data: " + json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": body.get("model", "stub"), "choices": choices, **extra,
+            }) + "\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        for start in range(0, len(content), _CHUNK_CHARS):
+            if self._tokens_per_sec:
+                await asyncio.sleep(_CHUNK_CHARS / 4 / self._tokens_per_sec)
+            yield chunk({"content": content[start:start + _CHUNK_CHARS]})
+        yield chunk({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            # Like OpenAI, usage comes last in a chunk of its own
+            yield chunk(None, usage=_usage(body.get("messages") or [], content))
+        yield "data: [DONE]\n\n"
+
+    async def complete(self, body: dict):
+        messages = body.get("messages") or []
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        kind = classify(system)
+
+        await asyncio.sleep(self._latency.sample(self._rng))
+        if self._rng.random() < self._error_rate:
+            self._count(kind, "error")
+            return JSONResponse(status_code=500, content={"error": {"message": "stub error", "type": "server_error"}})
+
+        content = self.answer(kind, system, user)
+        if self._rng.random() < self._malformed_rate:
+            self._count(kind, "malformed")
+            content = self.malformed(kind, content)
+        else:
+            self._count(kind, "ok")
+
+        if body.get("stream"):
+            return StreamingResponse(self._chunks(body, content), media_type="text/event-stream")
+        if self._tokens_per_sec:
+            await asyncio.sleep(len(content) / 4 / self._tokens_per_sec)
+
+        return JSONResponse({
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(messages, content),
+        })
+
+
+def _usage(messages: list, content: str) -> dict:
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def create_app(model: StubModel) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await model.complete(await request.json())
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return model.stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub model server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=Latency.parse, default=Latency(0.6, 0.3),
+                        help="Response delay, mean[:jitter] secs")
+    parser.add_argument("--malformed-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0,
+                        help="Generation speed after the latency; 0 answers all at once")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    model = StubModel(args.latency, args.malformed_rate, args.error_rate, args.seed, args.tokens_per_sec)
+    uvicorn.run(create_app(model), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Offline evaluation of end-of-turn detection: reply latency against false cutoffs.
+
+Replays whole sessions of agent turns through each detector configuration, frame
+by frame and faster than real time, and reports per configuration how long the
+turn took to end after the agent's last word and how often it ended while the
+agent was only pausing.
+
+The agent's words are the "Agent:" lines of recorded calls in the transcript
+store (``--store``), or the synthetic corpus when there are none. Each session
+gets its own speaker: pause lengths after sentences and commas, a chance of
+hesitating with a filler, and a microphone level. So quiet and slow-pausing
+agents are both covered. Turns are voiced with the load test's synthetic
+speech over light background noise. STT is simulated the way Deepgram behaves:
+interim transcripts while the agent speaks, then a punctuated final ``--stt``
+after each pause.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.turn_eval --sessions 20
+    python -m benchmarks.turn_eval --vad-stop 0.6,0.8,1.2 --store data/transcripts.sqlite3 --json turns.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from pipecat.audio.turn.base_turn_analyzer import EndOfTurnState
+from pipecat.audio.vad.vad_analyzer import VADState
+
+from benchmarks.corpus import generate
+from benchmarks.fakes import CHUNK_SECS, INPUT_SAMPLE_RATE, EnergyVADAnalyzer, synthetic_speech
+from benchmarks.stats import Latency, summarize
+from bot import CALL_VAD_PARAMS
+from transcripts import TranscriptStore
+from turn_detection import AdaptiveTurnAnalyzer, vad_params
+from vad_pool import get_vad_pool
+
+CHARS_PER_SEC = 15.0
+# Quiet after each turn while the customer answers; an end later than this is a miss
+TAIL_SECS = 3.0
+INTERIM_SECS = 0.5
+QUIET_MIC_GAIN = 0.15
+
+_PIECE = re.compile(r"[^.?!,]+[.?!,]*")
+
+
+class Speaker:
+    """How one agent talks: pauses inside a turn, hesitations and microphone level."""
+
+    def __init__(self, rng: random.Random):
+        self.sentence_pause = Latency(rng.uniform(0.25, 0.9), 0.15)
+        self.comma_pause = Latency(rng.uniform(0.1, 0.45), 0.08)
+        self.hesitation = rng.uniform(0.0, 0.25)
+        self.hesitation_pause = Latency(rng.uniform(0.5, 1.3), 0.2)
+        # Log-uniform, so soft microphones are as common as loud ones
+        self.gain = math.exp(rng.uniform(math.log(0.04), 0.0))
+
+
+def turn_segments(line: str, speaker: Speaker, rng: random.Random) -> List[Tuple[str, float]]:
+    """The line as (spoken text, pause after) pieces, split where people pause."""
+    pieces = [p.strip() for p in _PIECE.findall(line) if p.strip()] or [line]
+    segments = []
+    for piece in pieces[:-1]:
+        if rng.random() < speaker.hesitation:
+            segments.append((f"{piece} um,", speaker.hesitation_pause.sample(rng)))
+        elif piece.endswith(","):
+            segments.append((piece, speaker.comma_pause.sample(rng)))
+        else:
+            segments.append((piece, speaker.sentence_pause.sample(rng)))
+    segments.append((pieces[-1], 0.0))
+    return segments
+
+
+class Session:
+    """One session's audio, the transcripts STT would send, and where each turn really ended."""
+
+    def __init__(self, lines: List[str], speaker: Speaker, stt: Latency, noise: float, rng: random.Random):
+        self.speaker = speaker
+        self.events: List[Tuple[float, str, bool]] = []
+        self.turns: List[Tuple[float, float]] = []
+        chunks = []
+        t = 0.5
+        chunks.append(np.zeros(int(t * INPUT_SAMPLE_RATE), dtype=np.float32))
+        for line in lines:
+            start = t
+            for text, pause in turn_segments(line, speaker, rng):
+                secs = len(text) / CHARS_PER_SEC
+                speech = np.frombuffer(synthetic_speech(secs, INPUT_SAMPLE_RATE, rng), dtype=np.int16)
+                chunks.append(speech.astype(np.float32) * speaker.gain)
+                words = text.split()
+                for at in np.arange(INTERIM_SECS, secs, INTERIM_SECS):
+                    heard = words[:max(1, int(len(words) * at / secs))]
+                    self.events.append((t + at, " ".join(heard), False))
+                t += len(speech) / INPUT_SAMPLE_RATE
+                end = t
+                self.events.append((t + stt.sample(rng), text, True))
+                chunks.append(np.zeros(int(pause * INPUT_SAMPLE_RATE), dtype=np.float32))
+                t += pause
+            self.turns.append((start, end))
+            chunks.append(np.zeros(int(TAIL_SECS * INPUT_SAMPLE_RATE), dtype=np.float32))
+            t = end + TAIL_SECS
+        audio = np.concatenate(chunks)
+        audio += np.random.default_rng(rng.randrange(2 ** 32)).normal(0.0, noise, audio.size)
+        self.audio = np.clip(audio, -32768, 32767).astype(np.int16).tobytes()
+        self.events.sort()
+
+
+def load_lines(args, rng: random.Random) -> List[List[str]]:
+    """Agent lines per session, from recorded calls when there are any."""
+    sessions = []
+    if args.store and os.path.exists(args.store):
+        store = TranscriptStore(args.store)
+        for call in store.calls(limit=args.sessions):
+            lines = [line[len("Agent: "):] for line in store.lines(call["session_id"]) if line.startswith("Agent: ")]
+            if lines:
+                sessions.append(lines[:args.turns])
+        store.close()
+        logger.info(f"Loaded {len(sessions)} recorded sessions from {args.store}")
+    for item in generate(args.sessions - len(sessions), seed=rng.randrange(2 ** 16)):
+        lines = [line[len("Agent: "):] for line in item["transcript"].splitlines() if line.startswith("Agent: ")]
+        sessions.append(lines[:args.turns])
+    return sessions
+
+
+def detect(session: Session, mode: str, stop_secs: Optional[float], vad_kind: str) -> Tuple[List[float], dict]:
+    """Feed the session through one detector; the times it ended a turn, and its final state."""
+    params = vad_params(CALL_VAD_PARAMS, mode)
+    if stop_secs is not None:
+        params.stop_secs = stop_secs
+    if vad_kind == "silero":
+        vad = get_vad_pool().lease(params=params)
+    else:
+        # Low enough to hear the quietest speaker, like Silero's level-independent confidence;
+        # telling quiet speech from noise is left to the volume gate
+        vad = EnergyVADAnalyzer(threshold=100.0, params=params)
+    vad.set_sample_rate(INPUT_SAMPLE_RATE)
+    analyzer = None
+    if mode == "adaptive":
+        analyzer = AdaptiveTurnAnalyzer(vad)
+        analyzer.set_sample_rate(INPUT_SAMPLE_RATE)
+
+    ends = []
+    state = VADState.QUIET
+    frame_bytes = 2 * int(INPUT_SAMPLE_RATE * CHUNK_SECS)
+    events = iter(session.events)
+    event = next(events, None)
+    for offset in range(0, len(session.audio), frame_bytes):
+        frame = session.audio[offset:offset + frame_bytes]
+        now = (offset + len(frame)) / (2 * INPUT_SAMPLE_RATE)
+        while event is not None and event[0] <= now:
+            if analyzer:
+                analyzer.on_transcript(event[1], final=event[2])
+            event = next(events, None)
+        # Only settled VAD states count, as in the input transport
+        previous = state
+        new = vad.analyze_audio(frame)
+        if new not in (VADState.STARTING, VADState.STOPPING):
+            state = new
+        if analyzer:
+            if analyzer.append_audio(frame, state == VADState.SPEAKING) == EndOfTurnState.COMPLETE:
+                ends.append(now)
+        elif previous == VADState.SPEAKING and state == VADState.QUIET:
+            ends.append(now)
+
+    if vad_kind == "silero":
+        get_vad_pool().release(vad)
+    return ends, analyzer.stats if analyzer else {}
+
+
+def score(session: Session, ends: List[float]) -> List[dict]:
+    outcomes = []
+    for start, end in session.turns:
+        cutoffs = sum(1 for e in ends if start < e < end)
+        after = [e - end for e in ends if end <= e <= end + TAIL_SECS]
+        outcomes.append({"cutoffs": cutoffs, "latency": after[0] if after else None})
+    return outcomes
+
+
+def evaluate(name: str, mode: str, stop_secs: Optional[float], sessions: List[Session], vad_kind: str) -> dict:
+    outcomes, quiet, volumes = [], [], []
+    started = time.monotonic()
+    for session in sessions:
+        ends, stats = detect(session, mode, stop_secs, vad_kind)
+        scored = score(session, ends)
+        outcomes += scored
+        if session.speaker.gain < QUIET_MIC_GAIN:
+            quiet += scored
+        if stats.get("min_volume") is not None:
+            volumes.append(stats["min_volume"])
+
+    latencies = [o["latency"] for o in outcomes if o["latency"] is not None]
+    turns = len(outcomes)
+    return {
+        "config": name,
+        "turns": turns,
+        "cutoff_turns_pct": round(100 * sum(1 for o in outcomes if o["cutoffs"]) / turns, 1) if turns else None,
+        "cutoffs": sum(o["cutoffs"] for o in outcomes),
+        "missed_pct": round(100 * sum(1 for o in outcomes if o["latency"] is None) / turns, 1) if turns else None,
+        "quiet_mic_missed_pct": round(100 * sum(1 for o in quiet if o["latency"] is None) / len(quiet), 1)
+        if quiet else None,
+        "end_latency_secs": summarize(latencies, (("p50", 0.5), ("p90", 0.9), ("p95", 0.95))),
+        "min_volume": summarize(volumes, (("p50", 0.5),)) if volumes else None,
+        "eval_secs": round(time.monotonic() - started, 1),
+    }
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value}"
+
+
+def print_table(results: List[dict]):
+    header = ("config", "turns", "cutoff turns %", "cutoffs", "missed %", "quiet mic missed %",
+              "end p50", "end p90", "end p95")
+    rows = [(r["config"], r["turns"], r["cutoff_turns_pct"], r["cutoffs"], r["missed_pct"], r["quiet_mic_missed_pct"],
+             r["end_latency_secs"]["p50"], r["end_latency_secs"]["p90"], r["end_latency_secs"]["p95"])
+            for r in results]
+    widths = [max(len(h), *(len(_fmt(r[i])) for r in rows)) for i, h in enumerate(header)]
+    print("  ".join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(_fmt(v).rjust(w) for v, w in zip(row, widths)))
+
+
+def main(args) -> int:
+    rng = random.Random(args.seed)
+    sessions = [Session(lines, Speaker(rng), args.stt, args.noise, rng) for lines in load_lines(args, rng)]
+    logger.info(f"Evaluating {len(sessions)} sessions, {sum(len(s.turns) for s in sessions)} turns")
+
+    configs = [(f"vad {stop}s", "vad", stop) for stop in args.vad_stop] + [("adaptive", "adaptive", None)]
+    results = []
+    for name, mode, stop_secs in configs:
+        result = evaluate(name, mode, stop_secs, sessions, args.vad)
+        logger.info(f"{name}: {result}")
+        results.append(result)
+
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: str(v) for k, v in vars(args).items()}, "results": results}, f, indent=2)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-of-turn detection evaluation")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=8, help="Agent turns per session, at most")
+    parser.add_argument("--store", help="Transcript store to take recorded sessions from")
+    parser.add_argument("--vad-stop", type=lambda s: [float(v) for v in s.split(",")],
+                        default=[CALL_VAD_PARAMS.stop_secs], help="Fixed VAD stop times to compare against")
+    # The synthetic voice sits right at Silero's confidence threshold, so energy is the default here
+    parser.add_argument("--vad", choices=["silero", "energy"], default="energy")
+    parser.add_argument("--stt", type=Latency.parse, default=Latency(0.25, 0.1),
+                        help="Time from the end of speech to the final transcript")
+    parser.add_argument("--noise", type=float, default=30.0, help="Background noise level (int16 standard deviation)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--verbose", "-v", action="count")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "INFO")
+    sys.exit(main(args))
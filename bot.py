@@ -1,222 +1,451 @@
 import os
 import sys
 import asyncio
+import random
+from typing import Optional, Tuple
 
 from dotenv import load_dotenv
 from loguru import logger
 
 from pipecat.processors.frameworks.rtvi import RTVIConfig, RTVIObserver, RTVIProcessor, RTVIServerMessageFrame
-from pipecat.audio.vad.silero import SileroVADAnalyzer, VADParams
+from pipecat.audio.vad.silero import VADParams
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
 from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
 from pipecat.services.deepgram.tts import DeepgramTTSService
 from pipecat.services.deepgram.stt import DeepgramSTTService, LiveOptions
-from pipecat.services.openai.llm import OpenAILLMService
 from pipecat.transports.base_transport import TransportParams
 from pipecat.transports.network.small_webrtc import SmallWebRTCTransport
 from pipecat.transcriptions.language import Language
 from pipecat.services.elevenlabs.tts import ElevenLabsTTSService
-from personas.confused_customer import persona as confused_customer_persona
 from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
 from pipecat.frames.frames import TransportMessageUrgentFrame, LLMFullResponseEndFrame, LLMTextFrame, Frame, \
-    LLMFullResponseStartFrame
+    LLMFullResponseStartFrame, TranscriptionUpdateFrame
+from pipecat.processors.transcript_processor import TranscriptProcessor
 from pipecat.processors.aggregators.llm_response import LLMFullResponseAggregator
 
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-import json
-from personas.budget_customer import persona as cost_sensitive_persona
-from personas.frustrated_customer import persona as angry_customer_persona
-from personas.struggling_customer import persona as struggling_customer_persona
-from personas.concerned_customer import persona as concerned_customer_persona
+from compliance import checklist_score, match_compliance
+from context_window import ContextWindowProcessor
+from latency import LatencyObserver
+from evaluators import COMPLIANCE_ITEMS, SCRIPT_STEPS, get_engine
+from service_pool import ServicePool
+from tts_cache import CachedTTS, get_tts_cache, known_phrases
+from vad_pool import get_vad_pool
+from personas.registry import get_persona_registry
+from sentiment import SENTIMENT_LLM_SAMPLE_RATE, SENTIMENT_WINDOW_TURNS, SentimentScheduler, score_conversation
+from sessions import WORKER_ID
+from speculation import SPECULATIVE_REPLIES, SpeculativeLLMService, SpeculativeReplyProcessor
+from turn_detection import TURN_DETECTION, AdaptiveTurnAnalyzer, TurnCueProcessor, vad_params
+from transcripts import AUTO_SCORE_CALLS, TranscriptStore, get_call_scorer, get_transcript_store
 
 load_dotenv(override=True)
 
 
-def get_sentiment(transcript: str):
-    model = ChatOpenAI(model="gpt-4o-mini-2024-07-18",
-                       temperature=0.8,
-                       max_tokens=None,
-                       timeout=None,
-                       max_retries=2)
+async def get_sentiment(transcript: str) -> int:
+    return await get_engine().sentiment(transcript)
 
-    # Building the compliance checker prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """Given the following conversation (which may be partial and ongoing), analyze the overall sentiment expressed so far.
-            Assign a single sentiment score on a scale of 1 to 100, where 1 indicates extremely negative sentiment, 50 is neutral, and 100 is extremely positive.
-            Only return the score as a single integer (no explanations or extra text).
-        """),
-        ("user", "{input}")
-    ])
 
-    chain = prompt | model
-    response = chain.invoke({"input": transcript})
+TTS_MODEL = "eleven_flash_v2_5"
+TTS_SAMPLE_RATE = 24000
 
+CALL_VAD_PARAMS = VADParams(
+    confidence=0.8,  # Higher = more strict (default: 0.7)
+    start_secs=0.3,  # Longer before detecting speech (default: 0.2)
+    stop_secs=1.2,  # Longer silence before stopping (default: 0.8)
+    min_volume=0.7  # Higher volume threshold (default: 0.6)
+)
+
+
+async def build_services(voice_id: str) -> dict:
+    """Build the per-call STT, LLM and TTS services for a persona voice."""
+    llm = SpeculativeLLMService(
+        model="gpt-4o",
+        api_key=os.getenv("OPENAI_API_KEY"),
+        params=SpeculativeLLMService.InputParams(
+            temperature=0.7,
+        )
+    )
+
+    stt = DeepgramSTTService(
+        api_key=os.getenv("DEEPGRAM_API_KEY"),
+        live_options=LiveOptions(
+            model="nova-3-general",
+            language=Language.EN,
+            smart_format=True
+        )
+    )
+
+    # tts = DeepgramTTSService(
+    #     api_key=os.getenv("DEEPGRAM_API_KEY"),
+    #     voice="aura-luna-en",
+    #     sample_rate=24000,
+    #     encoding="linear16"
+    # )
+
+    ## Use this for demo. Its better quality
+    tts = ElevenLabsTTSService(  # ElevenLabs TTS
+    api_key=os.getenv("ELEVENLABS_API_KEY"),
+    voice_id=voice_id,
+    model=TTS_MODEL,
+    sample_rate=TTS_SAMPLE_RATE
+    )
+
+    # Open the OpenAI connection (DNS + TLS) now so the first completion reuses it.
+    # Deepgram and ElevenLabs only connect their websockets once the pipeline starts.
     try:
-        score = response.content
-        logger.debug(f"sentiment score: {score}")
-        if isinstance(score, str):
-            return int(score)
-        else:
-            return 70
-    except Exception:
-        return 70
+        await llm._client.models.list()
+    except Exception as e:
+        logger.debug(f"LLM connection warm-up failed: {e}")
+
+    return {"stt": stt, "llm": llm, "tts": tts}
+
+
+async def dispose_services(services: dict):
+    await services["llm"]._client.close()
+
 
+_service_pool: Optional[ServicePool] = None
+
+
+def get_service_pool() -> ServicePool:
+    """Return the process-wide warm pool of service bundles keyed by voice id."""
+    global _service_pool
+    if _service_pool is None:
+        _service_pool = ServicePool(build_services, dispose=dispose_services)
+    return _service_pool
+
+
+class ConversationProcessor(FrameProcessor):
+    """Tracks both sides of the call as "Agent: ..." / "Customer: ..." lines.
+
+    Agent lines come from the TranscriptProcessor updates upstream, customer
+    lines from the LLM response passing through. ``on_turn_complete`` runs once
+    the customer has finished replying.
+    """
 
-class SentimentAnalysisProcessor(FrameProcessor):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self._turns = []
         self._accumulated_text = ""
 
+    def _add_turn(self, speaker: str, text: str):
+        text = text.strip()
+        if text:
+            self._turns.append(f"{speaker}: {text}")
+
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
 
+        if isinstance(frame, TranscriptionUpdateFrame):
+            for message in frame.messages:
+                if message.role == "user":
+                    self._add_turn("Agent", message.content)
+
         # Start accumulating when LLM response begins
-        if isinstance(frame, LLMFullResponseStartFrame):
+        elif isinstance(frame, LLMFullResponseStartFrame):
             self._accumulated_text = ""
 
         # Accumulate text chunks
         elif isinstance(frame, LLMTextFrame):
             self._accumulated_text += frame.text
 
-        # Process sentiment when response is complete
+        # A turn is complete once the customer has finished replying
         elif isinstance(frame, LLMFullResponseEndFrame):
-            if self._accumulated_text:
-                # Run sentiment analysis asynchronously without blocking
-                self.create_task(self._analyze_and_send_sentiment(self._accumulated_text))
+            if self._accumulated_text.strip():
+                reply = self._accumulated_text.strip()
+                self._add_turn("Customer", reply)
                 self._accumulated_text = ""
+                await self.on_turn_complete(reply)
 
         # Always forward the frame immediately
         await self.push_frame(frame, direction)
 
-    async def _analyze_and_send_sentiment(self, text: str):
-        """Analyze sentiment asynchronously and send result"""
-        try:
-            sentiment = await self._analyze_sentiment(text)
-            await self.push_frame(
-                RTVIServerMessageFrame(
-                    data={
-                        "type": "sentiment-analysis",
-                        "sentiment": sentiment,
-                        "text": text,
-                    }
-                )
-            )
-        except Exception as e:
-            print(f"Sentiment analysis error: {e}")
-
-    async def _analyze_sentiment(self, text: str) -> int:
-        # Run in thread pool to avoid blocking
-        import asyncio
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, get_sentiment, text)
-
-
-async def run_bot(webrtc_connection, persona_name: str = "cost_sensitive"):
-    pipecat_transport = SmallWebRTCTransport(
-        webrtc_connection=webrtc_connection,
-        params=TransportParams(
-            audio_in_enabled=True,
-            audio_out_enabled=True,
-            vad_analyzer=SileroVADAnalyzer(
-                params=VADParams(
-                    confidence=0.8,  # Higher = more strict (default: 0.7)
-                    start_secs=0.3,  # Longer before detecting speech (default: 0.2)
-                    stop_secs=1.2,  # Longer silence before stopping (default: 0.8)
-                    min_volume=0.7  # Higher volume threshold (default: 0.6)
-                )
-            ),
-            audio_out_10ms_chunks=1,
-        ),
-    )
+    async def on_turn_complete(self, reply: str):
+        pass
 
-    llm = OpenAILLMService(
-        model="gpt-4o",
-        api_key=os.getenv("OPENAI_API_KEY"),
-        params=OpenAILLMService.InputParams(
-            temperature=0.7,
+
+class SentimentAnalysisProcessor(ConversationProcessor):
+    """Scores a rolling window of the conversation after every customer reply.
+
+    The in-process lexicon model produces the live score on every turn. A sampled
+    fraction of turns (``SENTIMENT_LLM_SAMPLE_RATE``) is also sent to the LLM through
+    a ``SentimentScheduler``; its answers calibrate an offset applied to later scores.
+    """
+
+    def __init__(self, sample_rate: float = SENTIMENT_LLM_SAMPLE_RATE, **kwargs):
+        super().__init__(**kwargs)
+        self._sample_rate = sample_rate
+        self._turn_seq = 0
+        self._offset = 0.0
+        self._scheduler = SentimentScheduler(
+            self._analyze_sentiment, self._calibrate, create_task=self.create_task
         )
-    )
 
-    stt = DeepgramSTTService(
-        api_key=os.getenv("DEEPGRAM_API_KEY"),
-        live_options=LiveOptions(
-            model="nova-3-general",
-            language=Language.EN,
-            smart_format=True
+    def _calibrated(self, score: int) -> int:
+        return max(1, min(100, round(score + self._offset)))
+
+    async def on_turn_complete(self, reply: str):
+        self._turn_seq += 1
+        window = self._turns[-SENTIMENT_WINDOW_TURNS:]
+        lexicon_score = score_conversation(window)
+        await self._send_sentiment(self._turn_seq, self._calibrated(lexicon_score), reply)
+
+        if self._sample_rate > 0 and random.random() < self._sample_rate:
+            self._scheduler.submit(self._turn_seq, "\n".join(window), text=reply, lexicon_score=lexicon_score)
+
+    async def _calibrate(self, seq: int, llm_score: int, context: dict):
+        self._offset = 0.7 * self._offset + 0.3 * (llm_score - context["lexicon_score"])
+        # Only correct the meter if no newer turn has been shown since
+        if seq == self._turn_seq:
+            await self._send_sentiment(seq, self._calibrated(context["lexicon_score"]), context["text"])
+
+    async def _send_sentiment(self, seq: int, sentiment: int, text: str):
+        await self.push_frame(
+            RTVIServerMessageFrame(
+                data={
+                    "type": "sentiment-analysis",
+                    "sentiment": sentiment,
+                    "text": text,
+                    "turn": seq,
+                }
+            )
         )
-    )
 
-    # Map the incoming persona name to the actual prompt string. Default to
-    # the cost-sensitive customer if the name is unrecognised.
-    _persona_map = {
-        "cost_sensitive": cost_sensitive_persona,
-        "confused_customer": confused_customer_persona,
-        "frustrated_customer": angry_customer_persona,
-        "concerned_customer": concerned_customer_persona,
-        "struggling_customer": struggling_customer_persona,
-    }
+    async def _analyze_sentiment(self, text: str) -> Optional[int]:
+        # No fallback score here: a failed call must not drag the calibration towards it
+        return await get_engine().sentiment(text, default=None)
+
+    async def cleanup(self):
+        await super().cleanup()
+        if self._scheduler.worker and not self._scheduler.worker.done():
+            await self.cancel_task(self._scheduler.worker)
 
-    persona_prompt = _persona_map.get(persona_name, cost_sensitive_persona)
 
-    # Map the persona name to the voice id
-    _voice_map = {
-        "cost_sensitive": "4NejU5DwQjevnR6mh3mb",
-        "confused_customer": "EIsgvJT3rwoPvRFG6c4n",
-        "frustrated_customer": "x3gYeuNB0kLLYxOZsaSh",
-        "concerned_customer": "x3gYeuNB0kLLYxOZsaSh",
-        "struggling_customer": "EIsgvJT3rwoPvRFG6c4n",
+class InCallScoringProcessor(ConversationProcessor):
+    """Keeps the running transcript and updates the checklist rubrics after every turn.
+
+    Compliance items are matched locally first. Only the turns added since the
+    last check are sent to the evaluator, together with the items that are still
+    open (for compliance, only those the matcher couldn't decide), and the partial
+    scores are pushed to the client as ``rubric-progress`` server messages.
+    When the call ends, ``reconcile`` settles what is still open into the final
+    scores for both rubrics.
+    """
+
+    CHECKLISTS = {
+        "compliance": COMPLIANCE_ITEMS,
+        "script_adherence": SCRIPT_STEPS,
     }
 
-    voice_id = _voice_map.get(persona_name, "aura-luna-en")
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._checked = 0
+        self._covered = {name: set() for name in self.CHECKLISTS}
+        self._lock = asyncio.Lock()
+
+    async def on_turn_complete(self, reply: str):
+        self.create_task(self._update_scores())
+
+    def scores(self) -> dict:
+        return {
+            name: round(100 * len(self._covered[name]) / len(items))
+            for name, items in self.CHECKLISTS.items()
+        }
+
+    async def reconcile(self) -> Optional[dict]:
+        """Final compliance and script adherence scores for the whole call.
+
+        Only what the live updates left open is checked: compliance items the
+        matcher still can't decide and script steps not yet covered, against the
+        turns no update got to. Returns None if that check fails.
+        """
+        async with self._lock:
+            matched = match_compliance([t[len("Agent: "):] for t in self._turns if t.startswith("Agent: ")])
+            items = matched["items"]
+            undecided = {k for k, v in items.items() if v["status"] == "ambiguous"}
+
+            start = self._checked
+            turns = self._turns[start:]
+            previous = self._turns[start - 1] if start else ""
+            for name, checklist in self.CHECKLISTS.items():
+                open_items = {k: v for k, v in checklist.items() if k not in self._covered[name]}
+                if name == "compliance":
+                    open_items = {k: v for k, v in open_items.items() if k in undecided}
+                if not open_items or not turns:
+                    continue
+                covered = await get_engine().check_items(open_items, turns, previous)
+                if covered is None:
+                    return None
+                self._covered[name].update(covered)
+            self._checked = len(self._turns)
+
+            # Undecided items the live checks didn't confirm were never asked
+            for item_id, item in items.items():
+                if item["status"] != "hit":
+                    item["status"] = "hit" if item_id in self._covered["compliance"] else "miss"
+            return {
+                "compliance": checklist_score(items),
+                "compliance_items": items,
+                "script_adherence": self.scores()["script_adherence"],
+            }
+
+    async def _update_scores(self):
+        # Updates run one at a time so each sees exactly the turns the previous one didn't
+        async with self._lock:
+            start, end = self._checked, len(self._turns)
+            if start == end:
+                return
+            turns = self._turns[start:end]
+            previous = self._turns[start - 1] if start else ""
+
+            changed = False
+
+            # Compliance is matched locally over the whole call; only open items the
+            # matcher can't decide are left for the LLM below
+            matched = match_compliance([t[len("Agent: "):] for t in self._turns[:end] if t.startswith("Agent: ")])
+            hits = {k for k, v in matched["items"].items() if v["status"] == "hit"} - self._covered["compliance"]
+            if hits:
+                self._covered["compliance"].update(hits)
+                changed = True
+            undecided = {k for k, v in matched["items"].items() if v["status"] == "ambiguous"}
+
+            for name, items in self.CHECKLISTS.items():
+                open_items = {k: v for k, v in items.items() if k not in self._covered[name]}
+                if name == "compliance":
+                    open_items = {k: v for k, v in open_items.items() if k in undecided}
+                if not open_items:
+                    continue
+                covered = await get_engine().check_items(open_items, turns, previous)
+                if covered is None:
+                    # Leave these turns unchecked so the next update retries them
+                    return
+                if covered:
+                    self._covered[name].update(covered)
+                    changed = True
+            self._checked = end
+
+        if changed:
+            try:
+                await self.push_frame(
+                    RTVIServerMessageFrame(
+                        data={
+                            "type": "rubric-progress",
+                            **self.scores(),
+                            "covered": {name: sorted(items) for name, items in self._covered.items()},
+                        }
+                    )
+                )
+            except Exception as e:
+                logger.error(f"Rubric progress error: {e}")
+
+
+class TranscriptCaptureProcessor(ConversationProcessor):
+    """Appends every final agent and customer line to the call's stored transcript."""
+
+    def __init__(self, store: TranscriptStore, session_id: str, **kwargs):
+        super().__init__(**kwargs)
+        self._store = store
+        self._session_id = session_id
+
+    def _add_turn(self, speaker: str, text: str):
+        super()._add_turn(speaker, text)
+        text = text.strip()
+        if text:
+            self._store.append(self._session_id, speaker, text)
+
+
+def create_call_task(transport, services: dict, persona, session_id: str, vad_stop_secs: float,
+                     counters: dict, agent_id: Optional[str] = None,
+                     speculate: bool = SPECULATIVE_REPLIES,
+                     turn_analyzer: Optional[AdaptiveTurnAnalyzer] = None
+                     ) -> Tuple[PipelineTask, LatencyObserver, InCallScoringProcessor]:
+    """Assemble a call's pipeline around a transport and its STT/LLM/TTS services.
+
+    Shared by ``run_bot`` and the offline load test, which plugs in a replay
+    transport and local fake services.
+    """
+    stt, llm, tts = services["stt"], services["llm"], services["tts"]
+
+    # Replays recurring short lines from the on-disk audio cache instead of the TTS
+    tts_cache = CachedTTS(get_tts_cache(), persona.voice_id, TTS_MODEL, TTS_SAMPLE_RATE,
+                          known_phrases(persona.spec.scenario))
 
     context = OpenAILLMContext(
         [
             {
                 "role": "system",
-                "content": persona_prompt,
+                "content": persona.prompt,
             }
         ],
     )
     context_aggregator = llm.create_context_aggregator(context)
 
-    # tts = DeepgramTTSService(
-    #     api_key=os.getenv("DEEPGRAM_API_KEY"),
-    #     voice="aura-luna-en",
-    #     sample_rate=24000,
-    #     encoding="linear16"
-    # )
-
-    ## Use this for demo. Its better quality
-    tts = ElevenLabsTTSService(  # ElevenLabs TTS
-    api_key=os.getenv("ELEVENLABS_API_KEY"),
-    voice_id=voice_id,
-    model="eleven_flash_v2_5",
-    sample_rate=24000
-    )
+    # Persona prompt + recent turns verbatim, older turns folded into a summary
+    context_window = ContextWindowProcessor()
+    counters["context"] = context_window.stats
+
+    # Starts the customer's reply while the agent's last words are still inside the VAD silence window
+    speculation = []
+    if speculate and isinstance(llm, SpeculativeLLMService):
+        speculative_replies = SpeculativeReplyProcessor(llm, context, context_window.window)
+        counters["speculation"] = speculative_replies.stats
+        speculation.append(speculative_replies)
+    elif isinstance(llm, SpeculativeLLMService):
+        # Pooled services may still point at a previous call's processor
+        llm.speculator = None
+
+    # Transcript cues for the transport's adaptive end-of-turn detection
+    turn_cues = []
+    if turn_analyzer is not None:
+        turn_cues.append(TurnCueProcessor(turn_analyzer))
+        counters["turn_detection"] = turn_analyzer.stats
 
     rtvi = RTVIProcessor(config=RTVIConfig(config=[]))
 
+    # Emits the agent's final transcripts so later processors see both sides of the call
+    transcript = TranscriptProcessor()
+
+    @transcript.event_handler("on_transcript_update")
+    async def on_transcript_update(processor, frame):
+        counters["turns"] += len(frame.messages)
+
     # Sentiment aggregator plugged after the LLM
     sentiment_agg = SentimentAnalysisProcessor()
 
+    # Live compliance / script adherence checklist scoring
+    in_call_scoring = InCallScoringProcessor()
+
+    # Server-side copy of the transcript, scored once the call ends
+    store = get_transcript_store()
+    store.start_call(session_id, persona.id, agent_id=agent_id, worker=WORKER_ID)
+    transcript_capture = TranscriptCaptureProcessor(store, session_id)
+
     pipeline = Pipeline(
         [
-            pipecat_transport.input(),
+            transport.input(),
             stt,
+            *turn_cues,
+            transcript.user(),
+            *speculation,
             context_aggregator.user(),
             rtvi,
+            context_window,
             llm,  # LLM
             sentiment_agg,
+            in_call_scoring,
+            transcript_capture,
+            tts_cache.lookup(),
             tts,
-            pipecat_transport.output(),
+            tts_cache.output(),
+            transport.output(),
             context_aggregator.assistant(),
         ]
     )
 
+    # Per-stage reply latency and usage, exported on /metrics and per session
+    latency_observer = LatencyObserver(session_id, vad_stop_secs)
+
     task = PipelineTask(
         pipeline,
         params=PipelineParams(
@@ -224,7 +453,7 @@ async def run_bot(webrtc_connection, persona_name: str = "cost_sensitive"):
             enable_usage_metrics=True,
             allow_interruptions=False,
         ),
-        observers=[RTVIObserver(rtvi)],
+        observers=[RTVIObserver(rtvi), latency_observer],
 
     )
 
@@ -233,13 +462,65 @@ async def run_bot(webrtc_connection, persona_name: str = "cost_sensitive"):
     async def on_client_ready(rtvi):
         # Signal bot is ready to receive messages
         await rtvi.set_bot_ready()
+        # Lets the client ask for this call's scores by id instead of re-uploading the transcript
+        await rtvi.send_server_message({"type": "session", "session_id": session_id})
         # Removed the initial user frame – the customer persona should wait for the agent to initiate the conversation.
 
-    @pipecat_transport.event_handler("on_client_disconnected")
-    async def on_client_disconnected(transport, client):
-        logger.info("Pipecat Client disconnected")
-        await task.cancel()
+    return task, latency_observer, in_call_scoring
 
-    runner = PipelineRunner(handle_sigint=False)
 
-    await runner.run(task)
+async def run_bot(webrtc_connection, persona_name: str = "budget_customer", counters: Optional[dict] = None,
+                  agent_id: Optional[str] = None, turn_detection: str = TURN_DETECTION):
+    # Per-session resource counters surfaced by /api/sessions
+    counters = counters if counters is not None else {}
+
+    # Per-stream VAD state over a model session shared by every call
+    vad_pool = get_vad_pool()
+    vad_analyzer = vad_pool.lease(params=vad_params(CALL_VAD_PARAMS, turn_detection))
+    # Set once the pipeline is built; anything before that can fail too
+    services = latency_observer = in_call_scoring = None
+    try:
+        # Adaptive mode ends turns from transcript cues; VAD alone waits out its fixed stop time
+        turn_analyzer = AdaptiveTurnAnalyzer(vad_analyzer) if turn_detection == "adaptive" else None
+
+        pipecat_transport = SmallWebRTCTransport(
+            webrtc_connection=webrtc_connection,
+            params=TransportParams(
+                audio_in_enabled=True,
+                audio_out_enabled=True,
+                vad_analyzer=vad_analyzer,
+                turn_analyzer=turn_analyzer,
+                audio_out_10ms_chunks=1,
+            ),
+        )
+
+        # Compiled once per persona; unknown names fall back to the default persona
+        persona = get_persona_registry().get(persona_name)
+        counters.update({"voice_id": persona.voice_id, "vad_session": vad_analyzer.slot, "turns": 0})
+
+        # Pre-built STT/LLM/TTS services for this voice, warmed before the call arrived
+        services = await get_service_pool().claim(persona.voice_id)
+
+        task, latency_observer, in_call_scoring = create_call_task(
+            pipecat_transport, services, persona, webrtc_connection.pc_id, vad_analyzer.params.stop_secs, counters,
+            agent_id=agent_id, turn_analyzer=turn_analyzer,
+        )
+
+        @pipecat_transport.event_handler("on_client_disconnected")
+        async def on_client_disconnected(transport, client):
+            logger.info("Pipecat Client disconnected")
+            await task.cancel()
+
+        runner = PipelineRunner(handle_sigint=False)
+        await runner.run(task)
+    finally:
+        vad_pool.release(vad_analyzer)
+        if services is not None:
+            await get_service_pool().release(services)
+        if latency_observer is not None:
+            latency_observer.close()
+        get_transcript_store().end_call(webrtc_connection.pc_id)
+        if AUTO_SCORE_CALLS:
+            # The live checklist progress saves re-scoring compliance and script adherence
+            get_call_scorer().schedule(webrtc_connection.pc_id,
+                                       live=in_call_scoring.reconcile if in_call_scoring is not None else None)
@@ -0,0 +1,210 @@
+"""Deterministic compliance checklist matcher.
+
+Each required question is described by one or more concepts that all have to
+show up in the agent's turns. A concept is a hit when one of its phrase
+patterns matches a sentence in which the agent is asking something (it ends in
+"?" or opens like a question or request). The same phrase in a statement ("my
+name is Alex", "the state average"), or a keyword alone, including fuzzy ones
+that tolerate transcription slips ("adress", "zipcode"), only makes the
+concept ambiguous. Items the matcher can't decide either way are the only ones
+sent to the LLM.
+"""
+
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from evaluators import CHECKLIST_PROMPT, COMPLIANCE_ITEMS, RUBRICS, EvaluationError, get_engine
+from single_flight import get_single_flight
+
+# Fuzzy keyword ratio at or above which the matcher defers a concept to the LLM
+FUZZY_AMBIGUOUS_RATIO = 0.7
+
+# item id -> list of concepts; each concept is (phrase patterns, fuzzy keywords)
+COMPLIANCE_PATTERNS = {
+    "address_zip": [
+        ([r"\baddress\b", r"\bwhere (do )?you live\b"], ["address"]),
+        ([r"\bzip\b", r"\bpostal code\b"], ["zip", "zipcode"]),
+    ],
+    "city_state": [
+        ([r"\bcity\b", r"\btown\b"], ["city"]),
+        ([r"\bstate\b", r"\btexas\b", r"\btx\b"], ["state", "texas"]),
+    ],
+    "full_name": [
+        ([r"\b(first|last|full) (and last )?name\b", r"(?<!in )(?<!under )\byour name\b",
+          r"\bwho (am i|i'm|do i have the pleasure of) speaking (with|to)\b",
+          r"\bspell (your|the) (first|last) name\b"], ["name"]),
+    ],
+    "rent_or_own": [
+        ([r"\brent\b.*\bown\b", r"\bown\b.*\brent\b", r"\brent(ing|er)?\b", r"\bhome ?owner\b", r"\bown (the|your) home\b"],
+         ["rent", "renting", "renter", "homeowner"]),
+    ],
+    "electricity_in_name": [
+        ([r"\b(electric\w*|power|account|service|utilities)\b.*\b(in|under) your name\b",
+          r"\b(in|under) your name\b.*\b(electric\w*|power|account|service)\b"], ["electricity", "electric"]),
+    ],
+    "lights_on": [
+        ([r"\blights?\b.*\bon\b", r"\b(power|electricity|service) (is )?(currently |already )?(on|connected|active)\b"],
+         ["lights"]),
+    ],
+}
+
+# Cached results follow the patterns as well as the prompt, so editing either starts afresh
+_CACHE_PROMPT = CHECKLIST_PROMPT + repr(COMPLIANCE_PATTERNS)
+
+# One alternation per concept, so each sentence costs a single regex search
+_COMPILED = {
+    item_id: [(re.compile("|".join(f"(?:{p})" for p in patterns)), keywords) for patterns, keywords in concepts]
+    for item_id, concepts in COMPLIANCE_PATTERNS.items()
+}
+
+_WORD = re.compile(r"[a-z0-9']+")
+_SENTENCE = re.compile(r"[^.!?]+(?:[.!?]+|$)")
+# How a question or a request for information opens, after any lead-in words
+_ASKING = re.compile(
+    r"^(?:(?:and|so|also|okay|ok|great|alright|now|first|next|then|lastly|finally|just)\s+)*"
+    r"(?:what|what's|where|where's|which|who|who's|when|how|can|could|may|would|will|do|does|did|is|are|"
+    r"have|has|please|confirm|to confirm|tell me|let me (?:get|have|grab|confirm)|i'll need|i need|i'd need)\b"
+)
+
+
+def agent_turns(transcript: str) -> List[str]:
+    """Return the agent's lines, or every line if the transcript has no speaker labels."""
+    lines = [line.strip() for line in transcript.splitlines() if line.strip()]
+    labelled = [line for line in lines if re.match(r"^(agent|customer):", line, re.I)]
+    if not labelled:
+        return lines
+    return [re.sub(r"^agent:\s*", "", line, flags=re.I) for line in labelled if line.lower().startswith("agent:")]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower().replace("’", "'")))
+
+
+def _fuzzy_ratio(keywords: List[str], tokens: set) -> float:
+    best = 0.0
+    for keyword in keywords:
+        if keyword in tokens:
+            return 1.0
+        for token in tokens:
+            # Only compare plausible variants; keeps the matcher well under a millisecond
+            if token[0] != keyword[0] or abs(len(token) - len(keyword)) > 2:
+                continue
+            best = max(best, _token_ratio(keyword, token))
+    return best
+
+
+@lru_cache(maxsize=8192)
+def _token_ratio(keyword: str, token: str) -> float:
+    return SequenceMatcher(None, keyword, token).ratio()
+
+
+def _sentences(turns: List[str]) -> List[tuple]:
+    """Split turns into (turn, normalized sentence, tokens, asking) tuples."""
+    sentences = []
+    for turn in turns:
+        for sentence in _SENTENCE.findall(turn):
+            text = _normalize(sentence)
+            if text:
+                asking = "?" in sentence or bool(_ASKING.match(text))
+                sentences.append((turn, text, set(text.split()), asking))
+    return sentences
+
+
+def _match_concept(pattern, keywords, sentences):
+    # A phrase pattern in a question is a hit; anywhere else the LLM has to decide
+    status, evidence = "miss", None
+    for turn, text, _, asking in sentences:
+        if pattern.search(text):
+            if asking:
+                return "hit", turn
+            status, evidence = "ambiguous", evidence or turn
+    if status == "ambiguous":
+        return status, evidence
+
+    # A keyword alone never proves the question was asked
+    for turn, _, tokens, _ in sentences:
+        if _fuzzy_ratio(keywords, tokens) >= FUZZY_AMBIGUOUS_RATIO:
+            return "ambiguous", turn
+    return "miss", None
+
+
+def match_compliance(turns: List[str]) -> dict:
+    """Check every compliance item against the agent's turns.
+
+    Returns the checklist score and, per item, a status of "hit", "miss" or
+    "ambiguous" plus the agent turn that matched.
+    """
+    sentences = _sentences(turns)
+
+    items = {}
+    for item_id, concepts in _COMPILED.items():
+        statuses = []
+        evidence: Optional[str] = None
+        for pattern, keywords in concepts:
+            status, match = _match_concept(pattern, keywords, sentences)
+            statuses.append(status)
+            evidence = evidence or match
+
+        if all(s == "hit" for s in statuses):
+            items[item_id] = {"status": "hit", "evidence": evidence}
+        elif all(s == "miss" for s in statuses):
+            items[item_id] = {"status": "miss", "evidence": None}
+        else:
+            items[item_id] = {"status": "ambiguous", "evidence": evidence}
+
+    return {"score": checklist_score(items), "items": items}
+
+
+def checklist_score(items: Dict[str, dict], decided_only: bool = False) -> int:
+    """Percentage of compliance items hit.
+
+    With ``decided_only`` ambiguous items are left out of the total rather than
+    counted as misses, for when they couldn't be checked.
+    """
+    hits = sum(1 for item in items.values() if item["status"] == "hit")
+    total = len(COMPLIANCE_ITEMS)
+    if decided_only:
+        total = sum(1 for item in items.values() if item["status"] != "ambiguous")
+        if not total:
+            return RUBRICS["compliance"]["default"]
+    return max(1, round(100 * hits / total))
+
+
+async def score_compliance(transcript: str, strict: bool = False) -> dict:
+    """Score compliance locally, asking the LLM only about the ambiguous items.
+
+    If that LLM check fails the ambiguous items stay "ambiguous", the score
+    covers only the items the matcher decided, and ``fallback`` is set; with
+    ``strict`` it raises ``EvaluationError``.
+    Results are cached like the other rubrics, and identical calls made while
+    one is running share its result.
+    """
+    key, cached = await get_engine().cached(transcript, "compliance_checklist", _CACHE_PROMPT)
+    if cached is not None:
+        return cached
+    return await get_single_flight().run(f"{key}:strict" if strict else key, "compliance",
+                                         lambda: _score_compliance(transcript, strict, key))
+
+
+async def _score_compliance(transcript: str, strict: bool, key: str) -> dict:
+    turns = agent_turns(transcript)
+    result = match_compliance(turns)
+    ambiguous = {k: COMPLIANCE_ITEMS[k] for k, v in result["items"].items() if v["status"] == "ambiguous"}
+    if ambiguous:
+        covered = await get_engine().check_items(ambiguous, [f"Agent: {turn}" for turn in turns])
+        if covered is None:
+            if strict:
+                raise EvaluationError("Compliance checklist check failed")
+            # A fallback, so it isn't cached
+            result["score"] = checklist_score(result["items"], decided_only=True)
+            result["fallback"] = True
+            return result
+
+        for item_id in ambiguous:
+            result["items"][item_id]["status"] = "hit" if item_id in covered else "miss"
+        result["score"] = checklist_score(result["items"])
+
+    await get_engine().store(key, result)
+    return result
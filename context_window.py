@@ -0,0 +1,126 @@
+"""Keeps the LLM context of a call bounded.
+
+The persona prompt and the last ``CONTEXT_KEEP_MESSAGES`` messages are always
+sent verbatim. Once enough older messages pile up, they are folded into a running
+summary by a background task; they stay in the context until that summary is
+ready, so nothing is lost while it runs. A per-turn token budget is enforced on
+top, dropping the oldest verbatim messages if a turn would still exceed it.
+"""
+
+import os
+from typing import List, Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import Frame
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContextFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from evaluators import get_engine
+
+# Conversation messages (agent and customer) always kept verbatim.
+CONTEXT_KEEP_MESSAGES = int(os.getenv("CONTEXT_KEEP_MESSAGES", "12"))
+# Older messages are summarised once at least this many have accumulated.
+CONTEXT_FOLD_BATCH = int(os.getenv("CONTEXT_FOLD_BATCH", "8"))
+# Upper bound on the estimated prompt tokens sent per turn.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+
+# Rough chars-per-token for English; good enough for a budget, no tokenizer needed.
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: List[dict]) -> int:
+    # ~4 tokens of per-message overhead in the chat format
+    return sum(len(str(m.get("content") or "")) // _CHARS_PER_TOKEN + 4 for m in messages)
+
+
+def _as_line(message: dict) -> str:
+    # The trainee talks to the bot as the "user"; the bot plays the customer
+    speaker = "Agent" if message.get("role") == "user" else "Customer"
+    return f"{speaker}: {message.get('content') or ''}"
+
+
+class ContextWindowProcessor(FrameProcessor):
+    """Place between the user context aggregator and the LLM."""
+
+    def __init__(self,
+                 keep_messages: int = CONTEXT_KEEP_MESSAGES,
+                 fold_batch: int = CONTEXT_FOLD_BATCH,
+                 token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self._keep = keep_messages
+        self._fold_batch = fold_batch
+        self._budget = token_budget
+        self._summary = ""
+        self._summary_message: Optional[dict] = None
+        # Messages covered by the current summary, dropped from the context on the next turn
+        self._summarized: List[dict] = []
+        self._folding = None
+        self.stats = {"folded": 0, "summaries": 0, "summary_failures": 0, "dropped_over_budget": 0,
+                      "last_prompt_tokens": 0}
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, OpenAILLMContextFrame) and direction == FrameDirection.DOWNSTREAM:
+            self._trim(frame.context)
+
+        await self.push_frame(frame, direction)
+
+    def window(self, messages: List[dict]) -> List[dict]:
+        """The messages a turn would send for this context, without changing any state."""
+        if not messages:
+            return messages
+        system, rest = messages[0], messages[1:]
+
+        # Earlier summary messages are replaced by the current one
+        summarized = {id(m) for m in self._summarized}
+        conversation = [m for m in rest if m.get("role") != "system" and id(m) not in summarized]
+
+        head = [system] + ([self._summary_message] if self._summary_message else [])
+        while len(conversation) > 2 and estimate_tokens(head + conversation) > self._budget:
+            conversation.pop(0)
+        return head + conversation
+
+    def _trim(self, context):
+        messages = context.get_messages()
+        if not messages:
+            return
+        trimmed = self.window(messages)
+
+        # Fold the oldest messages beyond the verbatim window in the background
+        summarized = {id(m) for m in self._summarized}
+        conversation = [m for m in messages[1:] if m.get("role") != "system" and id(m) not in summarized]
+        self._summarized = []
+        foldable = len(conversation) - self._keep
+        if foldable >= self._fold_batch and (self._folding is None or self._folding.done()):
+            self._folding = self.create_task(self._fold(conversation[:foldable]))
+
+        head = 2 if self._summary_message else 1
+        self.stats["dropped_over_budget"] += len(conversation) - (len(trimmed) - head)
+        self.stats["last_prompt_tokens"] = estimate_tokens(trimmed)
+        if len(trimmed) != len(messages) or any(a is not b for a, b in zip(trimmed, messages)):
+            context.set_messages(trimmed)
+
+    async def _fold(self, messages: List[dict]):
+        summary = await get_engine().summarize(self._summary, [_as_line(m) for m in messages])
+        if summary is None:
+            self.stats["summary_failures"] += 1
+            return
+
+        self._summary = summary
+        self._summary_message = {
+            "role": "system",
+            "content": f"Summary of the earlier part of this call:\n{summary}",
+        }
+        # Keep references so the ids stay valid until these messages leave the context
+        self._summarized = messages
+        self.stats["summaries"] += 1
+        self.stats["folded"] += len(messages)
+        logger.debug(f"Folded {len(messages)} messages into the call summary")
+
+    async def cleanup(self):
+        await super().cleanup()
+        if self._folding:
+            await self.cancel_task(self._folding)
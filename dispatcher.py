@@ -0,0 +1,350 @@
+"""Front dispatcher for running the server as several worker processes.
+
+Each worker is a normal ``server.py`` process on its own port that owns the
+pipelines of the calls it accepted. The dispatcher listens on the public port:
+
+- new offers go to the worker with the fewest live sessions, moving on to the
+  next one if a worker is at capacity;
+- renegotiations go to the worker that owns the ``pc_id``, looked up in the
+  ``SessionDirectory`` the workers keep up to date;
+- requests about a captured call (a ``session_id`` in the query or JSON body)
+  go to the worker that ran it, whose ``CallScorer`` owns the call's scoring
+  run, found in the ``TranscriptStore``;
+- batch scoring and analysis streams are passed through unbuffered; any worker
+  can serve a job's results since the stores are shared;
+- everything else (scoring, personas, static files) is spread round-robin.
+
+A worker process that exits is taken out of rotation, its sessions are dropped
+from the directory, and it is started again.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from loguru import logger
+from starlette.background import BackgroundTask
+
+from sessions import SESSION_RETRY_AFTER_SECS, SessionDirectory
+from transcripts import TranscriptStore
+
+# Scoring requests can take a while; offers should not.
+PROXY_TIMEOUT_SECS = float(os.getenv("DISPATCHER_PROXY_TIMEOUT_SECS", "120"))
+WORKER_STARTUP_SECS = float(os.getenv("DISPATCHER_WORKER_STARTUP_SECS", "60"))
+# How often worker processes are checked for having exited
+WORKER_CHECK_SECS = float(os.getenv("DISPATCHER_WORKER_CHECK_SECS", "2"))
+
+# Headers that describe the hop rather than the payload
+_HOP_HEADERS = {"connection", "content-length", "content-encoding", "host", "transfer-encoding", "keep-alive"}
+
+
+class Dispatcher:
+    def __init__(self, workers: Dict[str, str], directory: SessionDirectory, calls: TranscriptStore):
+        self._workers = workers  # worker id -> base url
+        self._directory = directory
+        self._calls = calls
+        self._round_robin = itertools.cycle(list(workers))
+        self._client = httpx.AsyncClient(timeout=PROXY_TIMEOUT_SECS)
+        # Workers being restarted, left out of routing until they answer again
+        self._down: Set[str] = set()
+        self._stats = {"offers": 0, "renegotiations": 0, "rejected": 0, "proxied": 0, "worker_errors": 0,
+                       "restarts": 0}
+
+    def _unreachable(self, worker: str, error: Exception):
+        self._stats["worker_errors"] += 1
+        logger.warning(f"Worker {worker} unreachable: {error}")
+
+    async def _forward(self, worker: str, method: str, path: str, *, content: bytes = b"",
+                       params=None, headers=None) -> httpx.Response:
+        headers = {k: v for k, v in (headers or {}).items() if k.lower() not in _HOP_HEADERS}
+        return await self._client.request(method, f"{self._workers[worker]}{path}",
+                                          content=content, params=params, headers=headers)
+
+    @staticmethod
+    def _response(upstream: httpx.Response) -> Response:
+        headers = {k: v for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS}
+        return Response(content=upstream.content, status_code=upstream.status_code, headers=headers)
+
+    async def offer(self, request: Request) -> Response:
+        body = await request.body()
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            return JSONResponse(status_code=400, content={"error": "Offer must be a JSON object"})
+        pc_id = payload.get("pc_id")
+
+        owner = self._directory.lookup(pc_id) if pc_id else None
+        if owner in self._workers and owner not in self._down:
+            try:
+                upstream = await self._forward(owner, "POST", "/api/offer", content=body,
+                                               params=request.query_params, headers=request.headers)
+            except httpx.HTTPError as e:
+                # The session went with its worker; placed below, the offer starts a new call
+                self._unreachable(owner, e)
+            else:
+                self._stats["renegotiations"] += 1
+                return self._response(upstream)
+
+        # Least-loaded first, so calls spread evenly across cores
+        counts = self._directory.counts()
+        for worker in sorted(self._live(), key=lambda w: counts.get(w, 0)):
+            try:
+                upstream = await self._forward(worker, "POST", "/api/offer", content=body,
+                                               params=request.query_params, headers=request.headers)
+            except httpx.HTTPError as e:
+                self._unreachable(worker, e)
+                continue
+            if upstream.status_code == 503:
+                continue
+            self._stats["offers"] += 1
+            return self._response(upstream)
+
+        self._stats["rejected"] += 1
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Server at capacity, try again shortly"},
+            headers={"Retry-After": str(SESSION_RETRY_AFTER_SECS)},
+        )
+
+    def _call_owner(self, request: Request, body: bytes) -> Optional[str]:
+        """The live worker that ran the call a request is about, if it names one."""
+        session_id = request.query_params.get("session_id")
+        if not session_id and body and request.headers.get("content-type", "").startswith("application/json"):
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict):
+                session_id = payload.get("session_id")
+        call = self._calls.call(session_id) if isinstance(session_id, str) and session_id else None
+        owner = call["worker"] if call else None
+        return owner if owner in self._workers and owner not in self._down else None
+
+    def _candidates(self, owner: Optional[str] = None):
+        """The owner first, if there is one, then the other live workers round-robin."""
+        if owner is not None:
+            yield owner
+        for _ in range(len(self._workers)):
+            worker = next(self._round_robin)
+            if worker != owner and worker not in self._down:
+                yield worker
+
+    async def proxy(self, request: Request, path: str) -> Response:
+        body = await request.body()
+        for worker in self._candidates(self._call_owner(request, body)):
+            try:
+                upstream = await self._forward(worker, request.method, f"/{path}", content=body,
+                                               params=request.query_params, headers=request.headers)
+            except httpx.HTTPError as e:
+                self._unreachable(worker, e)
+                continue
+            self._stats["proxied"] += 1
+            return self._response(upstream)
+        return JSONResponse(status_code=502, content={"error": "No worker available"})
+
+    async def stream(self, request: Request, path: str) -> Response:
+        """Like ``proxy``, but relays the body as it arrives and without a read timeout."""
+        body = await request.body()
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+        for worker in self._candidates(self._call_owner(request, body)):
+            upstream_request = self._client.build_request(
+                request.method, f"{self._workers[worker]}/{path}", content=body, params=request.query_params,
+                headers=headers, timeout=httpx.Timeout(PROXY_TIMEOUT_SECS, read=None),
+            )
+            try:
+                upstream = await self._client.send(upstream_request, stream=True)
+            except httpx.HTTPError as e:
+                self._unreachable(worker, e)
+                continue
+            self._stats["proxied"] += 1
+            return StreamingResponse(
+                upstream.aiter_bytes(), status_code=upstream.status_code,
+                headers={k: v for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS},
+                background=BackgroundTask(upstream.aclose),
+            )
+        return JSONResponse(status_code=502, content={"error": "No worker available"})
+
+    async def session_route(self, request: Request, path: str, pc_id: str) -> Response:
+        """Per-session routes go to the worker that owns the session, if it's still live."""
+        owner = self._directory.lookup(pc_id)
+        if owner in self._workers and owner not in self._down:
+            try:
+                upstream = await self._forward(owner, request.method, f"/{path}", params=request.query_params,
+                                               headers=request.headers)
+                return self._response(upstream)
+            except httpx.HTTPError as e:
+                self._unreachable(owner, e)
+        # Ended sessions, and those of a lost worker, are served from the shared stores
+        return await self.proxy(request, path)
+
+    async def metrics(self) -> str:
+        """Every worker's /metrics, with a worker label added to each sample."""
+        # Samples of one metric must stay together, so group them by family across workers
+        families: Dict[str, List[str]] = {}
+        for worker in self._workers:
+            try:
+                text = (await self._forward(worker, "GET", "/metrics")).text
+            except httpx.HTTPError:
+                continue
+            family = None
+            for line in text.splitlines():
+                if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                    family = line.split(" ", 3)[2]
+                    lines = families.setdefault(family, [])
+                    if line not in lines:
+                        lines.append(line)
+                elif line and family:
+                    if "{" in line:
+                        line = line.replace("{", f'{{worker="{worker}",', 1)
+                    else:
+                        name, value = line.split(" ", 1)
+                        line = f'{name}{{worker="{worker}"}} {value}'
+                    families[family].append(line)
+        return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+    async def sessions(self) -> dict:
+        async def worker_stats(worker):
+            try:
+                return (await self._forward(worker, "GET", "/api/sessions")).json()
+            except httpx.HTTPError as e:
+                return {"error": str(e)}
+
+        results = await asyncio.gather(*(worker_stats(w) for w in self._workers))
+        return {
+            "dispatcher": self._stats,
+            "active": sum(r.get("active", 0) for r in results),
+            "workers": dict(zip(self._workers, results)),
+        }
+
+    def _live(self) -> List[str]:
+        return [w for w in self._workers if w not in self._down]
+
+    async def supervise(self, processes: Dict[str, subprocess.Popen], spawn: Callable[[str], subprocess.Popen]):
+        """Restart worker processes that exit; runs until cancelled."""
+        while True:
+            await asyncio.sleep(WORKER_CHECK_SECS)
+            for worker, process in list(processes.items()):
+                if process.poll() is None:
+                    continue
+                logger.error(f"Worker {worker} exited with code {process.returncode}, restarting it")
+                self._down.add(worker)
+                # Its calls are gone, so they no longer count towards its load
+                self._directory.clear_worker(worker)
+                self._stats["restarts"] += 1
+                processes[worker] = spawn(worker)
+                await self.wait_ready([worker])
+                self._down.discard(worker)
+
+    async def wait_ready(self, workers: Optional[Iterable[str]] = None):
+        """Wait until the workers (all by default) answer, so the first offers aren't refused."""
+        deadline = asyncio.get_running_loop().time() + WORKER_STARTUP_SECS
+        pending = set(self._workers if workers is None else workers)
+        while pending and asyncio.get_running_loop().time() < deadline:
+            for worker in list(pending):
+                try:
+                    await self._forward(worker, "GET", "/api/sessions")
+                    pending.discard(worker)
+                except httpx.HTTPError:
+                    pass
+            if pending:
+                await asyncio.sleep(0.5)
+        if pending:
+            logger.warning(f"Workers not ready after {WORKER_STARTUP_SECS}s: {sorted(pending)}")
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def spawn_worker(worker: str, host: str, base_port: int, verbose: Optional[int]) -> subprocess.Popen:
+    args = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py"),
+            "--host", host, "--port", str(base_port + int(worker)), "--workers", "1"]
+    if verbose:
+        args.append("-" + "v" * verbose)
+    return subprocess.Popen(args, env={**os.environ, "ASCEND_WORKER_ID": worker})
+
+
+def spawn_workers(count: int, host: str, base_port: int, verbose: Optional[int]) -> Dict[str, subprocess.Popen]:
+    return {str(i): spawn_worker(str(i), host, base_port, verbose) for i in range(count)}
+
+
+def create_app(workers: int, host: str, base_port: int, verbose: Optional[int] = None) -> FastAPI:
+    urls = {str(i): f"http://{host}:{base_port + i}" for i in range(workers)}
+    directory = SessionDirectory()
+    calls = TranscriptStore()
+    dispatcher = Dispatcher(urls, directory, calls)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        processes = spawn_workers(workers, host, base_port, verbose)
+        await dispatcher.wait_ready()
+        logger.info(f"Dispatching to {workers} workers on ports {base_port}-{base_port + workers - 1}")
+        supervisor = asyncio.create_task(
+            dispatcher.supervise(processes, lambda worker: spawn_worker(worker, host, base_port, verbose))
+        )
+        yield
+        # Stopped first, so the workers being shut down aren't restarted
+        supervisor.cancel()
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        await dispatcher.aclose()
+        directory.close()
+        calls.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.post("/api/offer")
+    async def offer(request: Request):
+        return await dispatcher.offer(request)
+
+    @app.get("/api/sessions")
+    async def sessions():
+        return await dispatcher.sessions()
+
+    @app.get("/api/sessions/{pc_id}/latency")
+    async def session_latency(request: Request, pc_id: str):
+        return await dispatcher.session_route(request, f"api/sessions/{pc_id}/latency", pc_id)
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(await dispatcher.metrics(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/api/analyze/batch")
+    async def analyze_batch(request: Request):
+        return await dispatcher.stream(request, "api/analyze/batch")
+
+    @app.get("/api/analyze/stream")
+    async def analyze_stream(request: Request):
+        return await dispatcher.stream(request, "api/analyze/stream")
+
+    @app.get("/api/analyze/batch/{job_id}/results")
+    async def batch_results(request: Request, job_id: str):
+        return await dispatcher.stream(request, f"api/analyze/batch/{job_id}/results")
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+    async def proxy(request: Request, path: str):
+        return await dispatcher.proxy(request, path)
+
+    return app
@@ -0,0 +1,727 @@
+"""Rubric evaluators shared by the scoring API and the bot pipeline.
+
+Every chain is built once and run with ``ainvoke`` over a single pooled HTTP
+client, so scoring never blocks the event loop that also serves WebRTC
+signalling. Concurrency towards each upstream model is bounded by a semaphore.
+"""
+
+import ast
+import asyncio
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+import httpx
+from langchain.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+from loguru import logger
+from pydantic import BaseModel
+
+from llm_scheduler import IN_CALL, current_priority, get_llm_scheduler, request_tokens
+from score_cache import ScoreCache, cache_key
+from single_flight import get_single_flight
+
+SCORING_MODEL = "gpt-4o-mini-2024-07-18"
+
+# Upper bound on concurrent requests per upstream model, and on pooled connections.
+MAX_CONCURRENCY = int(os.getenv("EVALUATOR_MAX_CONCURRENCY", "8"))
+MAX_CONNECTIONS = int(os.getenv("EVALUATOR_MAX_CONNECTIONS", "20"))
+
+COMPLIANCE_PROMPT = """You are a compliance checker for customer service transcripts. 
+     Return a compliance score from 1 to 100 based on whether the agent asked all of the following questions (accept similar/related questions, not just exact wording):
+ 
+     - Street address and Zip Code
+     - Confirm City and State
+     - First and Last Name
+     - Do you rent or own?
+     - Is the electricity in your name at this address?
+     - If already in their name: Are the lights on?
+ 
+     If any are missing, reduce the score proportionally. 
+     Return your answer as a JSON object with keys: "score" (integer). I just need the score and no other explanation.
+     """
+
+OVERALL_SCORE_PROMPT = """You are a call quality checker for customer service transcripts.
+             Return a call quality score from 1 to 100 based on whether the agent did all of the following (accept similar/related actions, not just exact wording):
+ 
+             Greeted the customer.
+ 
+             Collected customer information.
+ 
+             Answered the customer’s questions politely.
+ 
+             Acknowledged and addressed the customer’s questions.
+ 
+             Pitched the product to the customer.
+ 
+             Closed the call and ended the call on a good note.
+ 
+             If any are missing, reduce the score proportionally.
+             Return your answer as a JSON object with the key: "score" (integer). I just need the score and no other explanation.
+             """
+
+CUSTOMER_SATISFACTION_PROMPT = """You are an evaluator tasked with rating customer satisfaction based on service call transcripts.
+          Assign a customer satisfaction score from 1 to 5, where:
+  
+          5 = Extremely satisfied
+  
+          4 = Satisfied
+  
+          3 = Neutral
+  
+          2 = Dissatisfied
+  
+          1 = Extremely dissatisfied
+  
+          Base your score on tone, professionalism, helpfulness, and whether the customer’s needs were fully understood and resolved. 
+          Look for signs of frustration or delight from the customer, and how effectively the agent handled the interaction overall.
+          Return your result as a JSON object with the key: "score" (integer). Do not include any explanations or comments—just the score.
+          """
+
+SCRIPT_ADHERENCE_PROMPT = """You are a script adherence evaluator for customer service transcripts.
+          Return a score from 1 to 100 based on how closely the agent followed the expected call flow and maintained topic relevance. Evaluate the following:
+  
+          Greeting – The agent greeted the customer politely and naturally.
+          Customer Info – The agent collected customer information and responded politely to provided details.
+          Mandatory Questions – The agent asked required questions and responded politely to answers.
+          Coupons & Discounts – The agent acknowledged any discounts or coupons appreciatively.
+          SOE Value Statement / Credit – The agent acknowledged this in a way tailored to the customer’s setting.
+          Pitch – The agent acknowledged the context and pitched the offering while creating relevant hesitation, politely.
+          Close / Overcoming Hesitation – The agent appreciated the customer’s engagement, addressed any hesitations sincerely, and closed the call naturally.
+          Topic Relevance – The agent stayed focused on the reason the customer reached out (e.g., discussing energy plans if the customer inquired about that), and did not diverge into unrelated topics (e.g., selling unrelated products like burgers).
+  
+          If any step is missed or done poorly, deduct points proportionally.
+          Return the result as a JSON object with the key: "score" (integer, 1–100). Do not include explanations—just the score.
+          """
+
+HESITATION_PROMPT = """You are an evaluator assessing an agent’s ability to handle hesitation in a customer service transcript.
+     Return a score from 1 to 100 based on the agent’s effectiveness in managing hesitation moments during the conversation.
+ 
+     Handling Hesitation includes:
+ 
+     Responding confidently and fluidly, without long pauses or awkward transitions.
+ 
+     Proactively addressing customer doubts, uncertainty, or objections with reassurance.
+ 
+     Maintaining a steady, calm, and composed tone even when the customer is unsure.
+ 
+     Minimizing signs of confusion, delay, or indecision from the agent.
+ 
+     Helping reduce customer uncertainty and guiding them toward a decision.
+ 
+     Deduct points if the agent hesitates, shows signs of uncertainty, fails to resolve customer doubts, or causes more confusion.
+     Reward high scores for smooth, confident handling, even in difficult parts of the call.
+ 
+     Return your answer as a JSON object with the key: "score" (integer, 1–100). No other explanation is needed.
+     """
+
+FEEDBACK_PROMPT = """
+You are a customer-service call evaluator.
+
+Task
+1. Read the transcript provided by the user.
+2. Assess the agent in four categories:
+   • compliance: Did the agent ask required questions like name, address, city/state, electricity status, etc.?
+   • call_quality: Did the agent greet, collect info, answer politely, pitch, and close professionally?
+   • customer_satisfaction: Was the customer’s tone positive, and were their needs understood and resolved effectively?
+   • handling_hesitation: Did the agent respond confidently and reduce customer uncertainty without sounding unsure or pausing?
+
+Output
+Return a JSON array that contains EXACTLY five (5) objects.
+Each object must include:
+  "category" – one of the four category names above (snake_case)
+  "feedback" – ONE actionable sentence (≤ 20 words) that ends with a newline character
+
+Rules
+• Output only the JSON array – no extra text before or after it.  
+• Do NOT include scores, numbers, or long explanations.  
+• Do not repeat the same words or ideas across sentences.  
+• The JSON must be valid.
+
+Example (double braces are used only to escape literal braces):
+[
+{{  
+  "category": "compliance",
+  "feedback": "Always verify the customer's service address to meet regulatory requirements."
+}},
+...
+]
+"""
+
+SENTIMENT_PROMPT = """Given the following conversation (which may be partial and ongoing), analyze the overall sentiment expressed so far.
+            Assign a single sentiment score on a scale of 1 to 100, where 1 indicates extremely negative sentiment, 50 is neutral, and 100 is extremely positive.
+            Only return the score as a single integer (no explanations or extra text).
+        """
+
+CHECKLIST_PROMPT = """You are monitoring a customer service call while it is still in progress.
+     The user message lists checklist items (id: description) the agent has not covered yet, then the newest turns of the call.
+     Decide which of the listed items the agent covered in the newest turns (accept similar/related wording, not just exact wording).
+     Return a JSON object with the key "covered": an array of item ids. Return an empty array if none were covered. No other text.
+     """
+
+SUMMARY_PROMPT = """You keep a running summary of a practice sales call between an energy company agent and a customer, so the customer's side can stay consistent once older turns are dropped.
+     The user message has the summary so far (may be empty) and the next turns of the call.
+     Return an updated summary in at most 120 words: details the customer has already shared, questions asked and answered, prices or plans mentioned, commitments made, and the customer's current mood.
+     Write plain sentences only, no preamble.
+     """
+
+# Checklists scored live during the call, one point per item covered.
+COMPLIANCE_ITEMS = {
+    "address_zip": "Asked for the street address and Zip Code",
+    "city_state": "Confirmed the city and state",
+    "full_name": "Asked for the customer's first and last name",
+    "rent_or_own": "Asked whether the customer rents or owns",
+    "electricity_in_name": "Asked whether the electricity is in the customer's name at this address",
+    "lights_on": "Asked whether the lights are currently on",
+}
+
+SCRIPT_STEPS = {
+    "greeting": "Greeted the customer politely and naturally",
+    "customer_info": "Collected customer information and responded politely to the details provided",
+    "mandatory_questions": "Asked the required questions and responded politely to the answers",
+    "coupons_discounts": "Acknowledged discounts or coupons appreciatively",
+    "value_statement": "Gave the SOE value statement / credit tailored to the customer's situation",
+    "pitch": "Pitched the offering in the context of the customer's needs",
+    "close": "Addressed hesitations sincerely and closed the call naturally",
+}
+
+# Single-score rubrics served by their own /api/<name> endpoint.
+RUBRICS = {
+    "compliance": {"prompt": COMPLIANCE_PROMPT, "temperature": 0.6, "default": 85},
+    "overall_score": {"prompt": OVERALL_SCORE_PROMPT, "temperature": 0.6, "default": 85},
+    "customer_satisfaction": {"prompt": CUSTOMER_SATISFACTION_PROMPT, "temperature": 0.6, "default": 3},
+    "script_adherence": {"prompt": SCRIPT_ADHERENCE_PROMPT, "temperature": 0.6, "default": 70},
+    "hesitation": {"prompt": HESITATION_PROMPT, "temperature": 0.8, "default": 70},
+}
+
+DEFAULT_FEEDBACK_TEXT = """
+    Please ensure all required questions are asked to stay compliant with the call script.\n
+    Maintain a natural flow from greeting to closing for better overall call quality.\n
+    Make sure the customer feels heard and their concerns are fully addressed.\n
+    Speak confidently and avoid pauses to reduce customer hesitation and build trust.\n
+    Keep the conversation relevant and focused on the customer’s original reason for calling.\n
+    """
+
+DEFAULT_SENTIMENT = 70
+
+# Rubrics scored together by /api/analyze. Each entry carries the same fallback
+# score its dedicated endpoint returns when the model output can't be used.
+ANALYSIS_RUBRICS = {
+    "compliance": {
+        "min": 1,
+        "max": 100,
+        "default": 85,
+        "criteria": """Score 1 to 100 on whether the agent asked all of the following questions (accept similar/related questions, not just exact wording):
+     - Street address and Zip Code
+     - Confirm City and State
+     - First and Last Name
+     - Do you rent or own?
+     - Is the electricity in your name at this address?
+     - If already in their name: Are the lights on?
+     If any are missing, reduce the score proportionally.""",
+    },
+    "overall_score": {
+        "min": 1,
+        "max": 100,
+        "default": 85,
+        "criteria": """Score 1 to 100 for call quality based on whether the agent did all of the following (accept similar/related actions, not just exact wording):
+     greeted the customer, collected customer information, answered the customer’s questions politely,
+     acknowledged and addressed the customer’s questions, pitched the product, and closed the call on a good note.
+     If any are missing, reduce the score proportionally.""",
+    },
+    "customer_satisfaction": {
+        "min": 1,
+        "max": 5,
+        "default": 3,
+        "criteria": """Score 1 to 5 for customer satisfaction (5 = extremely satisfied, 3 = neutral, 1 = extremely dissatisfied).
+     Base it on tone, professionalism, helpfulness, and whether the customer’s needs were fully understood and resolved.""",
+    },
+    "script_adherence": {
+        "min": 1,
+        "max": 100,
+        "default": 70,
+        "criteria": """Score 1 to 100 on how closely the agent followed the expected call flow and stayed on topic:
+     greeting, customer info, mandatory questions, coupons & discounts, SOE value statement / credit, pitch,
+     close / overcoming hesitation, and topic relevance (no unrelated products).
+     If any step is missed or done poorly, deduct points proportionally.""",
+    },
+    "hesitation": {
+        "min": 1,
+        "max": 100,
+        "default": 70,
+        "criteria": """Score 1 to 100 on how well the agent handled hesitation: responding confidently without long pauses,
+     proactively addressing doubts and objections, staying calm and composed, minimising confusion or indecision,
+     and guiding the customer toward a decision.""",
+    },
+}
+
+FEEDBACK_CATEGORIES = ["compliance", "call_quality", "customer_satisfaction", "handling_hesitation"]
+
+DEFAULT_FEEDBACK = [
+    {"category": "compliance",
+     "feedback": "Please ensure all required questions are asked to stay compliant with the call script."},
+    {"category": "call_quality",
+     "feedback": "Maintain a natural flow from greeting to closing for better overall call quality."},
+    {"category": "customer_satisfaction",
+     "feedback": "Make sure the customer feels heard and their concerns are fully addressed."},
+    {"category": "handling_hesitation",
+     "feedback": "Speak confidently and avoid pauses to reduce customer hesitation and build trust."},
+]
+
+
+class EvaluationError(Exception):
+    """The model's answer couldn't be used; raised instead of falling back in strict mode."""
+
+
+class FeedbackItem(BaseModel):
+    category: str
+    feedback: str
+
+
+def _build_analysis_prompt(rubrics: List[str], with_feedback: bool) -> ChatPromptTemplate:
+    sections = "\n\n".join(
+        f'"{name}": {ANALYSIS_RUBRICS[name]["criteria"]}' for name in rubrics
+    )
+    keys = [f'"{name}" (number)' for name in rubrics]
+    if with_feedback:
+        keys.append('"feedback" (array)')
+
+    feedback_rules = ""
+    if with_feedback:
+        feedback_rules = f"""
+
+     "feedback": an array of objects, one per category in {", ".join(FEEDBACK_CATEGORIES)}.
+     Each object has "category" (one of those names) and "feedback" (ONE actionable sentence, 20 words or fewer).
+     Do not include scores or numbers in feedback and do not repeat the same idea across sentences."""
+
+    # Braces in the literal JSON hints have to be escaped for the template.
+    system = f"""You are a customer-service call evaluator. Read the transcript provided by the user and evaluate the agent on every rubric below.
+
+     {sections}{feedback_rules}
+
+     Return a single JSON object with exactly these keys: {", ".join(keys)}. No other text or explanation."""
+    return ChatPromptTemplate.from_messages([
+        ("system", system.replace("{", "{{").replace("}", "}}")),
+        ("user", "{input}")
+    ])
+
+
+def _validate_score(name: str, value) -> float:
+    rubric = ANALYSIS_RUBRICS[name]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return rubric["default"]
+    if not rubric["min"] <= value <= rubric["max"]:
+        return rubric["default"]
+    return value
+
+
+def _feedback_item(entry) -> Optional[dict]:
+    try:
+        item = FeedbackItem.model_validate(entry)
+    except Exception:
+        return None
+    return item.model_dump() if item.feedback.strip() else None
+
+
+def _validate_feedback(value) -> List[dict]:
+    if not isinstance(value, list):
+        return DEFAULT_FEEDBACK
+    items = [item for item in map(_feedback_item, value) if item is not None]
+    return items or DEFAULT_FEEDBACK
+
+
+_MEMBER_KEY = re.compile(r'\s*"((?:[^"\\]|\\.)*)"\s*:')
+
+
+class _JsonMembers:
+    """Picks finished parts out of a JSON object while the model is still writing it.
+
+    ``feed`` returns ``("member", key, value)`` for each top-level member whose
+    value is complete, and ``("item", key, value)`` for each object or array
+    inside an array member as soon as it closes, ahead of the array itself.
+    Parts that don't parse are skipped.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = 0
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[tuple]:
+        start, self._text = len(self._text), self._text + chunk
+        found = []
+        for i in range(start, len(self._text)):
+            c = self._text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+                elif self._depth == 3:
+                    self._item_start = i
+            elif c in "}]":
+                if self._depth == 3 and self._item_start is not None:
+                    self._found(found, "item", self._item_start, i + 1)
+                    self._item_start = None
+                elif self._depth == 1:
+                    self._found(found, "member", self._member_start, i)
+                self._depth -= 1
+            elif c == "," and self._depth == 1:
+                self._found(found, "member", self._member_start, i)
+                self._member_start = i + 1
+        return found
+
+    def _found(self, found: List[tuple], kind: str, start: int, end: int):
+        match = _MEMBER_KEY.match(self._text, self._member_start)
+        try:
+            key = json.loads(f'"{match.group(1)}"')
+            if kind == "member":
+                value = json.loads("{" + self._text[start:end] + "}")[key]
+            else:
+                value = json.loads(self._text[start:end])
+        except (AttributeError, ValueError, KeyError):
+            return
+        found.append((kind, key, value))
+
+
+def _used_tokens(message) -> Optional[int]:
+    """Tokens a response reports using, or None if it doesn't say (or never came)."""
+    return (getattr(message, "usage_metadata", None) or {}).get("total_tokens")
+
+
+class EvaluatorEngine:
+    """Pre-built rubric chains sharing one pooled HTTP client.
+
+    Requests to each upstream model are bounded by ``max_concurrency`` per priority
+    class, so a burst of finished calls queues here instead of piling onto the
+    OpenAI connection pool, and in-call checks never queue behind it. Each request
+    then waits for its class's share of the rate limit from ``get_llm_scheduler``.
+    Rubric, feedback and analysis results are served from ``cache`` when present,
+    and identical ones already in flight are shared through ``get_single_flight``.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 max_connections: int = MAX_CONNECTIONS,
+                 cache: Optional[ScoreCache] = None):
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        self._max_concurrency = max_concurrency
+        self._semaphores: Dict[tuple, asyncio.Semaphore] = {}
+        self._models: Dict[float, ChatOpenAI] = {}
+        self._cache = cache
+
+        self._rubric_chains = {
+            name: self._chain(rubric["prompt"], rubric["temperature"])
+            for name, rubric in RUBRICS.items()
+        }
+        self._feedback_chain = self._chain(FEEDBACK_PROMPT, 0.8)
+        self._sentiment_chain = self._chain(SENTIMENT_PROMPT, 0.8)
+        self._checklist_chain = self._chain(CHECKLIST_PROMPT, 0.0, json_mode=True)
+        self._summary_chain = self._chain(SUMMARY_PROMPT, 0.0)
+        self._analysis_chains: Dict[tuple, tuple] = {}
+        self._analysis_chain([*ANALYSIS_RUBRICS], True)
+
+    def _model(self, temperature: float) -> ChatOpenAI:
+        if temperature not in self._models:
+            self._models[temperature] = ChatOpenAI(model=SCORING_MODEL,
+                                                   temperature=temperature,
+                                                   max_tokens=None,
+                                                   timeout=None,
+                                                   max_retries=2,
+                                                   # Streams end with a usage chunk to settle the rate-limit slot
+                                                   stream_usage=True,
+                                                   http_async_client=self._http_client)
+        return self._models[temperature]
+
+    def _chain(self, system_prompt: str, temperature: float, json_mode: bool = False):
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("user", "{input}")
+        ])
+        model = self._model(temperature)
+        if json_mode:
+            model = model.bind(response_format={"type": "json_object"})
+        return prompt | model
+
+    def _analysis_chain(self, rubrics: List[str], with_feedback: bool) -> tuple:
+        """Return the (chain, system prompt) pair for a rubric subset, building it once."""
+        key = (tuple(rubrics), with_feedback)
+        if key not in self._analysis_chains:
+            prompt = _build_analysis_prompt(rubrics, with_feedback)
+            chain = prompt | self._model(0.6).bind(response_format={"type": "json_object"})
+            self._analysis_chains[key] = (chain, prompt.messages[0].prompt.template)
+        return self._analysis_chains[key]
+
+    def _semaphore(self, priority: str) -> asyncio.Semaphore:
+        key = (SCORING_MODEL, priority)
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphores[key]
+
+    async def _run(self, chain, transcript: str, priority: Optional[str] = None):
+        priority = priority or current_priority()
+        async with self._semaphore(priority):
+            slot = await get_llm_scheduler().acquire(SCORING_MODEL, request_tokens(transcript), priority)
+            response = None
+            try:
+                response = await chain.ainvoke({"input": transcript})
+                return response
+            finally:
+                slot.settle(_used_tokens(response))
+
+    async def _stream(self, chain, transcript: str, priority: Optional[str] = None):
+        priority = priority or current_priority()
+        async with self._semaphore(priority):
+            slot = await get_llm_scheduler().acquire(SCORING_MODEL, request_tokens(transcript), priority)
+            used = None
+            try:
+                async for chunk in chain.astream({"input": transcript}):
+                    # Only the last chunk reports usage
+                    used = _used_tokens(chunk) or used
+                    yield chunk
+            finally:
+                slot.settle(used)
+
+    async def cached(self, transcript: str, name: str, prompt: str):
+        """The key of this evaluation, and its cached result if there is one.
+
+        The key also identifies the evaluation to the single-flight group.
+        """
+        key = cache_key(transcript, name, prompt, SCORING_MODEL)
+        if self._cache is None:
+            return key, None
+        return key, await self._cache.get(key)
+
+    async def store(self, key: str, value):
+        """Cache a result under a key from ``cached``; only real answers belong here."""
+        if self._cache is not None:
+            await self._cache.set(key, value)
+
+    async def score(self, rubric: str, transcript: str):
+        key, cached = await self.cached(transcript, rubric, RUBRICS[rubric]["prompt"])
+        if cached is not None:
+            return cached
+        return await get_single_flight().run(key, rubric, lambda: self._score(rubric, transcript, key))
+
+    async def _score(self, rubric: str, transcript: str, key: str):
+        default = RUBRICS[rubric]["default"]
+        try:
+            response = await self._run(self._rubric_chains[rubric], transcript)
+            score = json.loads(response.content)['score']
+            if isinstance(score, (int, float)):
+                await self.store(key, score)
+                return score
+            else:
+                return default
+        except Exception:
+            return default
+
+    async def feedback(self, transcript: str):
+        key, cached = await self.cached(transcript, "feedback", FEEDBACK_PROMPT)
+        if cached is not None:
+            return cached
+        return await get_single_flight().run(key, "feedback", lambda: self._feedback(transcript, key))
+
+    async def _feedback(self, transcript: str, key: str):
+        try:
+            response = await self._run(self._feedback_chain, transcript)
+            raw_feedback = response.content.strip()
+        except Exception:
+            return DEFAULT_FEEDBACK_TEXT.strip()
+
+        try:
+            # 1️⃣ normal case – valid JSON already
+            feedback = json.loads(raw_feedback)
+        except (json.JSONDecodeError, TypeError, ValueError):
+            # 2️⃣ the model might answer with single-quoted literals, which Python can read
+            try:
+                feedback = ast.literal_eval(raw_feedback)
+            except Exception:
+                # 3️⃣ still not valid → fall back to default text
+                return DEFAULT_FEEDBACK_TEXT.strip()
+
+        entries = feedback if isinstance(feedback, list) else []
+        items = [item for item in map(_feedback_item, entries) if item is not None]
+        if not items:
+            return DEFAULT_FEEDBACK_TEXT.strip()
+        # Only a complete answer is cached; a short one is used this once
+        if len(items) == len(entries) and {item["category"] for item in items} == set(FEEDBACK_CATEGORIES):
+            await self.store(key, items)
+        return items
+
+    async def analyze(self, transcript: str, rubrics: List[str], with_feedback: bool, strict: bool = False) -> dict:
+        """Score ``rubrics`` (and feedback) in one model call.
+
+        Unusable answers fall back to each rubric's default, listed under
+        ``fallback``, or raise ``EvaluationError`` when ``strict`` so the caller
+        can retry.
+        """
+        chain, system_prompt = self._analysis_chain(rubrics, with_feedback)
+        key, cached = await self.cached(transcript, "analyze", system_prompt)
+        if cached is not None:
+            return cached
+        # A strict caller wants the error rather than the fallbacks, so it can't share
+        return await get_single_flight().run(f"{key}:strict" if strict else key, "analyze",
+                                             lambda: self._analyze(chain, transcript, rubrics, with_feedback,
+                                                                   strict, key))
+
+    async def _analyze(self, chain, transcript: str, rubrics: List[str], with_feedback: bool, strict: bool,
+                       key: str) -> dict:
+        try:
+            response = await self._run(chain, transcript)
+            payload = json.loads(response.content)
+            if not isinstance(payload, dict):
+                payload = {}
+        except Exception as e:
+            if strict:
+                raise EvaluationError(f"Combined analysis failed: {e}") from e
+            logger.warning(f"Combined analysis failed, using fallbacks: {e}")
+            payload = {}
+
+        result = {name: _validate_score(name, payload.get(name)) for name in rubrics}
+        if with_feedback:
+            result["feedback"] = _validate_feedback(payload.get("feedback"))
+        fallback = [name for name in rubrics if result[name] != payload.get(name)]
+
+        # Only cache answers the model actually gave, never the fallbacks.
+        if not fallback and (not with_feedback or result["feedback"] is not DEFAULT_FEEDBACK):
+            await self.store(key, result)
+        elif strict:
+            raise EvaluationError("Combined analysis returned unusable values")
+        if fallback:
+            result["fallback"] = fallback
+        return result
+
+    async def analyze_stream(self, transcript: str, rubrics: List[str], with_feedback: bool):
+        """``analyze``, yielding each result as soon as the model has written it.
+
+        Yields ``("score", {"rubric": ..., "score": ...})`` and ``("feedback", item)``
+        pairs. Rubrics the model left out follow at the end with their defaults, and
+        ``DEFAULT_FEEDBACK`` is used if no feedback item was usable. A default score's
+        event is marked ``"fallback": True``. Shares its cache entries with ``analyze``.
+        """
+        chain, system_prompt = self._analysis_chain(rubrics, with_feedback)
+        key, cached = await self.cached(transcript, "analyze", system_prompt)
+        if cached is not None:
+            for name in rubrics:
+                yield "score", {"rubric": name, "score": cached[name]}
+            for item in cached.get("feedback", []):
+                yield "feedback", item
+            return
+
+        members = _JsonMembers()
+        answered, result, items = {}, {}, []
+        try:
+            async for chunk in self._stream(chain, transcript):
+                for kind, name, value in members.feed(chunk.content):
+                    if kind == "member" and name in rubrics and name not in result:
+                        answered[name] = value
+                        result[name] = _validate_score(name, value)
+                        event = {"rubric": name, "score": result[name]}
+                        if result[name] != value:
+                            event["fallback"] = True
+                        yield "score", event
+                    elif kind == "item" and name == "feedback" and with_feedback:
+                        item = _feedback_item(value)
+                        if item is not None:
+                            items.append(item)
+                            yield "feedback", item
+        except Exception as e:
+            logger.warning(f"Streamed analysis failed, using fallbacks: {e}")
+
+        for name in rubrics:
+            if name not in result:
+                result[name] = _validate_score(name, None)
+                yield "score", {"rubric": name, "score": result[name], "fallback": True}
+        if with_feedback:
+            if not items:
+                for item in DEFAULT_FEEDBACK:
+                    yield "feedback", item
+            result["feedback"] = items or DEFAULT_FEEDBACK
+
+        if all(result[name] == answered.get(name) for name in rubrics) and (not with_feedback or items):
+            await self.store(key, result)
+
+    async def sentiment(self, transcript: str, default: Optional[int] = DEFAULT_SENTIMENT) -> Optional[int]:
+        try:
+            response = await self._run(self._sentiment_chain, transcript, IN_CALL)
+            score = response.content
+            logger.debug(f"sentiment score: {score}")
+            # Tolerate extra words around the number ("Score: 42.")
+            match = re.search(r"\d+", score) if isinstance(score, str) else None
+            if match:
+                return max(1, min(100, int(match.group())))
+            else:
+                return default
+        except Exception:
+            return default
+
+    async def check_items(self, items: Dict[str, str], turns: List[str], previous: str = "") -> Optional[List[str]]:
+        """Return the ids in ``items`` the agent covered in ``turns``, or None if the check failed."""
+        checklist = "\n".join(f"- {item_id}: {desc}" for item_id, desc in items.items())
+        message = f"Checklist:\n{checklist}\n\n"
+        if previous:
+            message += f"Previous turn:\n{previous}\n\n"
+        message += "Newest turns:\n" + "\n".join(turns)
+
+        try:
+            response = await self._run(self._checklist_chain, message, IN_CALL)
+            covered = json.loads(response.content)["covered"]
+            return [item_id for item_id in covered if item_id in items]
+        except Exception as e:
+            logger.warning(f"Checklist update failed: {e}")
+            return None
+
+    async def summarize(self, previous: str, turns: List[str]) -> Optional[str]:
+        """Fold ``turns`` into the running call summary, or return None if the call failed."""
+        message = f"Summary so far:\n{previous or '(none)'}\n\nNext turns:\n" + "\n".join(turns)
+        try:
+            response = await self._run(self._summary_chain, message, IN_CALL)
+            return response.content.strip() or None
+        except Exception as e:
+            logger.warning(f"Context summary failed: {e}")
+            return None
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats() if self._cache is not None else {}
+
+    async def aclose(self):
+        await self._http_client.aclose()
+        if self._cache is not None:
+            self._cache.close()
+
+
+_engine: Optional[EvaluatorEngine] = None
+
+
+def get_engine() -> EvaluatorEngine:
+    """Return the process-wide evaluator engine, building it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = EvaluatorEngine(cache=ScoreCache())
+    return _engine
+
+
+async def close_engine():
+    global _engine
+    if _engine is not None:
+        await _engine.aclose()
+        _engine = None
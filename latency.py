@@ -0,0 +1,331 @@
+"""Per-stage voice latency and usage metrics.
+
+``LatencyObserver`` watches a call's pipeline and times each customer reply from
+the moment VAD decides the agent stopped talking: the final STT transcript, the
+first LLM token, the first TTS audio and the bot actually starting to speak.
+The wait before that decision (``vad_end``) is measured from when the agent's
+last speech frame went through the pipeline.
+Service TTFB, LLM token and TTS character usage come from pipecat's metrics
+frames. Everything is aggregated into process-wide histograms rendered in the
+Prometheus text format, and kept per session as a JSON report that is written
+to ``data/latency`` when the call ends.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import (
+    BotStartedSpeakingFrame,
+    InputAudioRawFrame,
+    LLMTextFrame,
+    MetricsFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+    VADUserStartedSpeakingFrame,
+    VADUserStoppedSpeakingFrame,
+)
+from pipecat.metrics.metrics import LLMUsageMetricsData, TTFBMetricsData, TTSUsageMetricsData
+from pipecat.observers.base_observer import BaseObserver, FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+LATENCY_REPORT_DIR = os.getenv("LATENCY_REPORT_DIR", os.path.join(DATA_DIR, "latency"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+# Recently seen frame ids kept to skip a frame's later hops; they all come within a few frames
+_SEEN_FRAMES = 256
+# Input audio frames kept to find the last speech frame, well over any VAD stop time
+_AUDIO_FRAMES = 500
+
+# Stages of a customer reply, in pipeline order
+STAGES = ("vad_end", "stt_final", "llm_first_token", "tts_first_byte", "first_audio_out")
+
+
+class Histogram:
+    """A minimal Prometheus histogram with one label."""
+
+    def __init__(self, name: str, help: str, label: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        # label value -> (bucket counts, sum, count)
+        self._series: Dict[str, list] = {}
+
+    def observe(self, label_value: str, value: float):
+        series = self._series.setdefault(label_value, [[0] * len(self.buckets), 0.0, 0])
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{self.label}="{value}"}} {total}')
+            lines.append(f'{self.name}_count{{{self.label}="{value}"}} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: Dict[str, float] = {}
+
+    def inc(self, label_value: str, amount: float = 1):
+        self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for value, total in sorted(self._values.items()):
+            lines.append(f'{self.name}{{{self.label}="{value}"}} {total}')
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, label_value: str, value: float):
+        self._values[label_value] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for value, current in sorted(self._values.items()):
+            lines.append(f'{self.name}{{{self.label}="{value}"}} {current}')
+        return lines
+
+
+STAGE_SECONDS = Histogram("ascend_turn_stage_seconds",
+                          "Time from the agent's end of speech (VAD) to each stage of the customer's reply",
+                          "stage")
+SERVICE_TTFB_SECONDS = Histogram("ascend_service_ttfb_seconds", "Time to first byte reported by each service",
+                                 "service")
+LLM_TOKENS = Counter("ascend_llm_tokens_total", "LLM tokens used by live calls", "type")
+TTS_CHARACTERS = Counter("ascend_tts_characters_total", "Characters sent to TTS by live calls", "service")
+TURNS = Counter("ascend_turns_total", "Customer replies timed", "outcome")
+SPECULATIONS = Counter("ascend_speculative_replies_total",
+                       "Customer replies by speculation outcome (hit, miss, none, cancelled)", "outcome")
+SPECULATION_SAVED_SECONDS = Histogram("ascend_speculation_saved_seconds",
+                                      "LLM wait hidden by starting a reply before the agent's turn ended", "service")
+TURN_ENDS = Counter("ascend_turn_ends_total",
+                    "Agent turns ended by the adaptive detector, by transcript cue; 'resumed' when the agent "
+                    "kept talking right after", "cue")
+TURN_WAIT_SECONDS = Histogram("ascend_turn_wait_seconds",
+                              "Silence waited before ending the agent's turn, by transcript cue", "cue")
+COALESCED_REQUESTS = Counter("ascend_scoring_coalesced_total",
+                             "Scoring requests that joined an identical one already in flight", "rubric")
+LLM_REQUESTS = Counter("ascend_llm_requests_total", "LLM requests let through by the scheduler, by priority class",
+                       "priority")
+LLM_QUEUE_DEPTH = Gauge("ascend_llm_queue_depth", "LLM requests waiting for rate-limit budget, by priority class",
+                        "priority")
+LLM_QUEUE_WAIT_SECONDS = Histogram("ascend_llm_queue_wait_seconds",
+                                   "Time LLM requests waited for rate-limit budget, by priority class", "priority")
+
+_METRICS = [STAGE_SECONDS, SERVICE_TTFB_SECONDS, LLM_TOKENS, TTS_CHARACTERS, TURNS, SPECULATIONS,
+            SPECULATION_SAVED_SECONDS, TURN_ENDS, TURN_WAIT_SECONDS, COALESCED_REQUESTS,
+            LLM_REQUESTS, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _service(processor: str) -> str:
+    return processor.split("#", 1)[0]
+
+
+# Live observers by session id, so a running call's report can be served
+_active: Dict[str, "LatencyObserver"] = {}
+
+
+class LatencyObserver(BaseObserver):
+    """Times a call's replies and tallies its usage.
+
+    Observers run behind a queue, so ``vad_end`` uses the times frames were
+    pushed. VAD stops ``vad_stop_secs`` of audio after the last speech frame;
+    that frame's push time is found by walking back over the input audio, and
+    ``vad_end`` runs from it to the end of the turn, which adaptive turn
+    detection may hold back further. A turn VAD didn't stop (one emulated from
+    a transcript, or a timed out input) counts ``vad_stop_secs``.
+    """
+
+    def __init__(self, session_id: str, vad_stop_secs: float, **kwargs):
+        super().__init__(**kwargs)
+        self._session_id = session_id
+        self._vad_stop_secs = vad_stop_secs
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        # (push time in ns, seconds of audio) of the latest input audio frames
+        self._audio: deque = deque(maxlen=_AUDIO_FRAMES)
+        self._audio_id = -1
+        self._speech_at: Optional[int] = None
+        self._turn: Optional[dict] = None
+        self._turn_start = 0.0
+        self._transcript_at: Optional[float] = None
+        self.turns: List[dict] = []
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0, "tts_characters": 0}
+        self.ttfb: Dict[str, List[float]] = {}
+        self.started_at = time.time()
+        _active[session_id] = self
+
+    def _first_sight(self, frame) -> bool:
+        # Frames are observed on every hop; only the first one counts
+        if frame.id in self._seen:
+            return False
+        self._seen[frame.id] = None
+        if len(self._seen) > _SEEN_FRAMES:
+            self._seen.popitem(last=False)
+        return True
+
+    def _last_speech_at(self) -> Optional[int]:
+        # VAD stops before pushing the frame that completes its stop time, so the
+        # frame that takes the walk back to it is the last one with speech
+        silence = 0.0
+        for pushed_at, secs in reversed(self._audio):
+            silence += secs
+            if round(silence, 4) >= self._vad_stop_secs:
+                return pushed_at
+        return None
+
+    async def on_push_frame(self, data: FramePushed):
+        frame = data.frame
+        if isinstance(frame, MetricsFrame):
+            if self._first_sight(frame):
+                self._record_metrics(frame)
+            return
+        if data.direction != FrameDirection.DOWNSTREAM:
+            return
+        now = time.monotonic()
+
+        if isinstance(frame, InputAudioRawFrame):
+            # Frame ids only grow, so later hops are skipped without keeping the ids
+            if frame.id > self._audio_id:
+                self._audio_id = frame.id
+                self._audio.append((data.timestamp, len(frame.audio) / (2 * frame.num_channels * frame.sample_rate)))
+        elif isinstance(frame, VADUserStartedSpeakingFrame) and self._first_sight(frame):
+            self._speech_at = None
+        elif isinstance(frame, VADUserStoppedSpeakingFrame) and self._first_sight(frame):
+            self._speech_at = self._last_speech_at()
+        # Only the first LLM token / audio chunk of a turn is used, no need to track every chunk
+        elif isinstance(frame, (LLMTextFrame, TTSAudioRawFrame)):
+            if self._turn is not None:
+                self._mark(frame, now)
+        elif isinstance(frame, UserStartedSpeakingFrame) and self._first_sight(frame):
+            if self._turn is not None:
+                TURNS.inc("interrupted")
+            self._turn = None
+            self._transcript_at = None
+        elif isinstance(frame, TranscriptionFrame) and self._first_sight(frame):
+            self._transcript_at = now
+        elif isinstance(frame, UserStoppedSpeakingFrame) and self._first_sight(frame):
+            self._turn_start = now
+            vad_end = (data.timestamp - self._speech_at) / 1e9 if self._speech_at is not None else self._vad_stop_secs
+            self._turn = {"vad_end": vad_end}
+            self._speech_at = None
+        elif isinstance(frame, BotStartedSpeakingFrame) and self._turn is not None and self._first_sight(frame):
+            self._mark(frame, now)
+
+    def _mark(self, frame, now: float):
+        turn = self._turn
+        if "stt_final" not in turn and self._transcript_at is not None:
+            # Deepgram often finalises before VAD gives up on the pause
+            turn["stt_final"] = max(0.0, self._transcript_at - self._turn_start)
+        if isinstance(frame, LLMTextFrame):
+            turn.setdefault("llm_first_token", now - self._turn_start)
+        elif isinstance(frame, TTSAudioRawFrame):
+            turn.setdefault("tts_first_byte", now - self._turn_start)
+        elif isinstance(frame, BotStartedSpeakingFrame):
+            turn["first_audio_out"] = now - self._turn_start
+            self._finish_turn()
+
+    def _finish_turn(self):
+        turn, self._turn = self._turn, None
+        for stage in STAGES:
+            if stage in turn:
+                STAGE_SECONDS.observe(stage, turn[stage])
+        turn["perceived_secs"] = turn["vad_end"] + turn["first_audio_out"]
+        self.turns.append({k: round(v, 4) for k, v in turn.items()})
+        TURNS.inc("completed")
+
+    def _record_metrics(self, frame: MetricsFrame):
+        for data in frame.data:
+            if isinstance(data, TTFBMetricsData) and data.value > 0:
+                service = _service(data.processor)
+                SERVICE_TTFB_SECONDS.observe(service, data.value)
+                self.ttfb.setdefault(service, []).append(data.value)
+            elif isinstance(data, LLMUsageMetricsData):
+                usage = data.value
+                self.usage["prompt_tokens"] += usage.prompt_tokens
+                self.usage["completion_tokens"] += usage.completion_tokens
+                self.usage["cached_prompt_tokens"] += usage.cache_read_input_tokens or 0
+                LLM_TOKENS.inc("prompt", usage.prompt_tokens)
+                LLM_TOKENS.inc("completion", usage.completion_tokens)
+                LLM_TOKENS.inc("cached_prompt", usage.cache_read_input_tokens or 0)
+            elif isinstance(data, TTSUsageMetricsData):
+                self.usage["tts_characters"] += data.value
+                TTS_CHARACTERS.inc(_service(data.processor), data.value)
+
+    def report(self) -> dict:
+        stages = {}
+        for stage in (*STAGES, "perceived_secs"):
+            values = [t[stage] for t in self.turns if stage in t]
+            stages[stage] = {"p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95), "count": len(values)}
+        return {
+            "session_id": self._session_id,
+            "started_at": self.started_at,
+            "vad_stop_secs": self._vad_stop_secs,
+            "stages": stages,
+            "service_ttfb": {s: {"p50": _percentile(v, 0.5), "p95": _percentile(v, 0.95), "count": len(v)}
+                             for s, v in self.ttfb.items()},
+            "usage": self.usage,
+            "turns": self.turns,
+        }
+
+    def close(self):
+        """Write the session report to disk and stop serving it as live."""
+        _active.pop(self._session_id, None)
+        try:
+            os.makedirs(LATENCY_REPORT_DIR, exist_ok=True)
+            with open(os.path.join(LATENCY_REPORT_DIR, f"{self._session_id}.json"), "w") as f:
+                json.dump(self.report(), f)
+        except OSError as e:
+            logger.warning(f"Failed to write latency report for {self._session_id}: {e}")
+
+
+def session_report(session_id: str) -> Optional[dict]:
+    """The live report of a running call, or the saved one of a finished call."""
+    observer = _active.get(session_id)
+    if observer:
+        return observer.report()
+    # Session ids come from the URL; never let one escape the report directory
+    if os.path.basename(session_id) != session_id:
+        return None
+    try:
+        with open(os.path.join(LATENCY_REPORT_DIR, f"{session_id}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,220 @@
+"""Process-wide scheduling of LLM requests against the account's rate limits.
+
+Live persona turns, in-call sentiment, post-call scoring and batch re-scoring
+all draw on the same OpenAI account. Every request first gets a slot from
+``LLMScheduler``. The scheduler keeps a request bucket and a token bucket per
+model, refilled at the model's per-minute limits from ``LLM_RATE_LIMITS``, and
+hands out slots in priority order:
+
+1. ``live``: the persona's reply in a call
+2. ``in_call``: sentiment, checklist progress and context summaries during a call
+3. ``post_call``: scoring a finished call
+4. ``batch``: batch re-scoring
+
+A request waits while a higher class is waiting. Lower classes must also leave
+part of each bucket untouched (``PRIORITY_HEADROOM``). When the budget runs
+short they queue, and batch workers and scoring requests slow down, while live
+turns still go straight through. Tokens are charged from an estimate up front
+and corrected when the response reports what it actually used.
+
+The class of a request comes from the caller, or otherwise from the
+``llm_priority`` context it runs in; the default is ``post_call``.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from latency import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS, LLM_REQUESTS
+
+LIVE, IN_CALL, POST_CALL, BATCH = "live", "in_call", "post_call", "batch"
+PRIORITIES = (LIVE, IN_CALL, POST_CALL, BATCH)
+# Share of each bucket a class leaves for the classes above it
+PRIORITY_HEADROOM = {LIVE: 0.0, IN_CALL: 0.1, POST_CALL: 0.25, BATCH: 0.5}
+# "model=requests:tokens" per minute, comma separated; unlisted (or zero) models aren't limited
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "gpt-4o=5000:450000,gpt-4o-mini-2024-07-18=5000:2000000")
+# Allowance for the system prompt and the answer on top of a request's input
+PROMPT_TOKENS = 600
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default=POST_CALL)
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run the LLM requests made inside the block, and in tasks it starts, as ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def request_tokens(text: str, extra: int = PROMPT_TOKENS) -> int:
+    """Rough token cost of a request sending ``text``, before the response says."""
+    return len(text) // 4 + extra
+
+
+def parse_limits(spec: str) -> Dict[str, tuple]:
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = entry.partition("=")
+        requests, _, tokens = values.partition(":")
+        limits[model.strip()] = (float(requests), float(tokens))
+    return limits
+
+
+class TokenBucket:
+    """Refills at ``per_minute`` a minute, up to a minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self._rate = per_minute / 60
+        self._at = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._at) * self._rate)
+        self._at = now
+
+    def wait_secs(self, amount: float, headroom: float) -> float:
+        """How long until ``amount`` can be taken leaving ``headroom`` of the capacity."""
+        reserve = headroom * self.capacity
+        # A request bigger than the bucket only has to wait for a full one
+        needed = min(amount, self.capacity - reserve) + reserve
+        return max(0.0, needed - self.level) / self._rate
+
+
+class _Model:
+    def __init__(self, name: str, requests_per_min: float, tokens_per_min: float):
+        self.name = name
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        # Heap of [class rank, arrival, class] for every request waiting for budget
+        self.waiting: List[list] = []
+        self.changed = asyncio.Event()
+
+    def wait_secs(self, tokens: int, priority: str) -> float:
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        headroom = PRIORITY_HEADROOM[priority]
+        return max(self.requests.wait_secs(1, headroom), self.tokens.wait_secs(tokens, headroom))
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class LLMSlot:
+    """A granted request; ``settle`` corrects its token charge once usage is known."""
+
+    def __init__(self, model: Optional[_Model], tokens: int):
+        self._model = model
+        self._tokens = tokens
+
+    def settle(self, used_tokens: Optional[int]):
+        """Charge what the request used; without a count (a failed request) the estimate stands."""
+        if self._model is None or not used_tokens:
+            return
+        self._model.tokens.level += self._tokens - used_tokens
+        self._tokens = used_tokens
+        self._model.notify()
+
+
+class LLMScheduler:
+    """Request and token budgets per model, handed out highest priority first."""
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None):
+        limits = parse_limits(LLM_RATE_LIMITS) if limits is None else limits
+        self._models = {name: _Model(name, *budget) for name, budget in limits.items() if min(budget) > 0}
+        self._arrivals = itertools.count()
+        self._stats = {p: {"requests": 0, "queued": 0, "waited_secs": 0.0, "max_wait_secs": 0.0}
+                       for p in PRIORITIES}
+
+    async def acquire(self, model: str, tokens: int, priority: Optional[str] = None) -> LLMSlot:
+        priority = priority or current_priority()
+        budget = self._models.get(model)
+        if budget is None:
+            self._granted(priority, 0.0)
+            return LLMSlot(None, tokens)
+
+        started = time.monotonic()
+        entry = [PRIORITIES.index(priority), next(self._arrivals), priority]
+        heapq.heappush(budget.waiting, entry)
+        self._queue_depth()
+        try:
+            while True:
+                changed = budget.changed
+                delay = None
+                if budget.waiting[0] is entry:
+                    delay = budget.wait_secs(tokens, priority)
+                    if delay == 0:
+                        budget.requests.level -= 1
+                        budget.tokens.level -= tokens
+                        break
+                # Woken early when the queue or the budget changes. Not wait_for, which can
+                # swallow a cancellation that lands as the event fires and grant the slot anyway.
+                woken = asyncio.ensure_future(changed.wait())
+                try:
+                    await asyncio.wait([woken], timeout=delay)
+                finally:
+                    woken.cancel()
+        finally:
+            budget.waiting.remove(entry)
+            heapq.heapify(budget.waiting)
+            budget.notify()
+            self._queue_depth()
+
+        waited = time.monotonic() - started
+        self._granted(priority, waited)
+        if waited > 1.0:
+            logger.debug(f"{priority} request to {model} waited {waited:.2f}s for rate-limit budget")
+        return LLMSlot(budget, tokens)
+
+    def _granted(self, priority: str, waited: float):
+        stats = self._stats[priority]
+        stats["requests"] += 1
+        LLM_REQUESTS.inc(priority)
+        if waited > 0.001:
+            stats["queued"] += 1
+            stats["waited_secs"] = round(stats["waited_secs"] + waited, 3)
+            stats["max_wait_secs"] = round(max(stats["max_wait_secs"], waited), 3)
+        LLM_QUEUE_WAIT_SECONDS.observe(priority, waited)
+
+    def _queue_depth(self):
+        for priority in PRIORITIES:
+            LLM_QUEUE_DEPTH.set(priority, sum(1 for m in self._models.values() for e in m.waiting if e[2] == priority))
+
+    def stats(self) -> dict:
+        models = {}
+        now = time.monotonic()
+        for name, budget in self._models.items():
+            budget.requests.refill(now)
+            budget.tokens.refill(now)
+            models[name] = {
+                "requests_left": round(budget.requests.level, 1),
+                "tokens_left": round(budget.tokens.level),
+                "waiting": {p: sum(1 for e in budget.waiting if e[2] == p) for p in PRIORITIES},
+            }
+        return {"models": models, "priorities": self._stats}
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
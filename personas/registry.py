@@ -0,0 +1,238 @@
+"""Persona registry loaded from the data files in this directory.
+
+Each persona is a ``<id>.json`` file (card fields, voice, customer details) plus
+a ``<id>.txt`` scenario. The system prompt is compiled once per persona, in the
+layout the prompts were written in: the scenario's opening paragraph, the
+customer details, then the rest of the scenario. It is the same for every call
+with that persona, so upstream prompt caching can reuse it. The
+``/api/personas`` body and its ETag are rendered once per load. Files are
+re-read when they change on disk.
+
+Custom personas written in the UI go through the same model and compiler, and
+are stored under ``data/custom_personas`` so every worker can serve them.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+
+PERSONA_DIR = os.path.dirname(os.path.abspath(__file__))
+CUSTOM_PERSONA_DIR = os.getenv("CUSTOM_PERSONA_DIR", os.path.join(DATA_DIR, "custom_personas"))
+# Minimum seconds between checks of the persona files for changes.
+PERSONA_RELOAD_SECS = float(os.getenv("PERSONA_RELOAD_SECS", "2"))
+CUSTOM_PERSONA_CACHE_SIZE = 256
+
+DEFAULT_PERSONA_ID = "budget_customer"
+DEFAULT_VOICE_ID = "4NejU5DwQjevnR6mh3mb"
+
+# The "Create Your Own" card has no persona behind it; the UI collects a scenario
+# and posts it to /api/personas/custom.
+CREATE_CUSTOMER_CARD = {
+    "id": "create_customer",
+    "title": "Create Your Own",
+    "desc": "Write your own customer scenario and behavior summary.",
+    "img": "./public/create_customer.png",
+    "custom": True,
+}
+
+
+class PersonaDetails(BaseModel):
+    name: str = Field("Casey Morgan", min_length=1, max_length=80)
+    address: str = Field("500 Main St, Dallas, TX 75201", min_length=1, max_length=160)
+    birthDate: str = Field("01/01/1990", max_length=20)
+    email: str = Field("casey.morgan@email.com", max_length=120)
+    ownership: str = Field("Renter", max_length=20)
+    language: str = Field("English", max_length=40)
+
+
+class PersonaSpec(BaseModel):
+    id: str = Field(pattern=r"^[a-z0-9_]{1,64}$")
+    order: int = 100
+    title: str = Field(min_length=1, max_length=80)
+    desc: str = Field("", max_length=200)
+    img: str = "./public/create_customer.png"
+    voice_id: str = DEFAULT_VOICE_ID
+    aliases: List[str] = []
+    # Rubrics this persona tests hardest; used to pick a practice persona for an agent's weak spots
+    trains: List[str] = []
+    details: PersonaDetails = PersonaDetails()
+    scenario: str = Field(min_length=20, max_length=6000)
+
+
+class CustomPersonaRequest(BaseModel):
+    title: str = Field("Custom Customer", min_length=1, max_length=80)
+    scenario: str = Field(min_length=20, max_length=4000)
+    details: PersonaDetails = PersonaDetails()
+    voice_id: Optional[str] = None
+
+    @field_validator("scenario")
+    @classmethod
+    def _strip(cls, value: str) -> str:
+        return value.strip()
+
+
+def compile_prompt(spec: PersonaSpec) -> str:
+    d = spec.details
+    intro, _, rest = spec.scenario.strip().partition("\n\n")
+    details = (
+        f"Customer Details:\n"
+        f"- Name: {d.name}\n"
+        f"- Address: {d.address}\n"
+        f"- Birth Date: {d.birthDate}\n"
+        f"- Email: {d.email}\n"
+        f"- Ownership: {d.ownership}\n"
+        f"- Language: {d.language}"
+    )
+    return "\n\n".join(part for part in (intro, details, rest) if part) + "\n"
+
+
+class Persona:
+    def __init__(self, spec: PersonaSpec):
+        self.spec = spec
+        self.id = spec.id
+        self.voice_id = spec.voice_id
+        self.prompt = compile_prompt(spec)
+
+    def card(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.spec.title,
+            "desc": self.spec.desc,
+            "img": self.spec.img,
+            **self.spec.details.model_dump(),
+        }
+
+
+class PersonaRegistry:
+    def __init__(self, directory: str = PERSONA_DIR, custom_directory: str = CUSTOM_PERSONA_DIR):
+        self._directory = directory
+        self._custom_directory = custom_directory
+        self._personas: Dict[str, Persona] = {}
+        self._aliases: Dict[str, str] = {}
+        self._custom: "OrderedDict[str, Persona]" = OrderedDict()
+        self._signature = None
+        self._checked_at = 0.0
+        self.body = b"[]"
+        self.etag = ""
+        self.reload()
+
+    def _files(self) -> List[str]:
+        return sorted(f for f in os.listdir(self._directory) if f.endswith((".json", ".txt")))
+
+    def _current_signature(self) -> tuple:
+        return tuple((f, os.stat(os.path.join(self._directory, f)).st_mtime_ns) for f in self._files())
+
+    def _load(self, name: str) -> PersonaSpec:
+        with open(os.path.join(self._directory, f"{name}.json"), encoding="utf-8") as f:
+            raw = json.load(f)
+        with open(os.path.join(self._directory, f"{name}.txt"), encoding="utf-8") as f:
+            raw["scenario"] = f.read()
+        return PersonaSpec(**raw)
+
+    def reload(self):
+        """Re-read every persona file. A persona that fails to load keeps its previous version."""
+        personas = {}
+        for name in sorted({f[:-5] for f in self._files() if f.endswith(".json")}):
+            try:
+                spec = self._load(name)
+                personas[spec.id] = Persona(spec)
+            except (OSError, ValueError, ValidationError) as e:
+                logger.error(f"Failed to load persona {name}: {e}")
+                if name in self._personas:
+                    personas[name] = self._personas[name]
+
+        self._personas = personas
+        self._aliases = {alias: p.id for p in personas.values() for alias in p.spec.aliases}
+        self._signature = self._current_signature()
+
+        cards = [p.card() for p in sorted(personas.values(), key=lambda p: (p.spec.order, p.id))]
+        self.body = json.dumps(cards + [CREATE_CUSTOMER_CARD]).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:16]}"'
+        logger.info(f"Loaded {len(personas)} personas")
+
+    def maybe_reload(self):
+        """Reload if any persona file changed, checking at most every PERSONA_RELOAD_SECS."""
+        now = time.monotonic()
+        if now - self._checked_at < PERSONA_RELOAD_SECS:
+            return
+        self._checked_at = now
+        if self._current_signature() != self._signature:
+            self.reload()
+
+    def voice_ids(self) -> List[str]:
+        return sorted({p.voice_id for p in self._personas.values()})
+
+    def personas(self) -> List[Persona]:
+        return list(self._personas.values())
+
+    def get(self, persona_id: Optional[str]) -> Persona:
+        """Look up a persona by id or alias, falling back to the default persona."""
+        self.maybe_reload()
+        persona_id = self._aliases.get(persona_id, persona_id)
+        if persona_id in self._personas:
+            return self._personas[persona_id]
+        if persona_id and persona_id.startswith("custom_"):
+            custom = self._get_custom(persona_id)
+            if custom:
+                return custom
+        logger.warning(f"Unknown persona {persona_id}, using {DEFAULT_PERSONA_ID}")
+        return self._personas[DEFAULT_PERSONA_ID]
+
+    def _remember_custom(self, persona: Persona):
+        self._custom[persona.id] = persona
+        self._custom.move_to_end(persona.id)
+        while len(self._custom) > CUSTOM_PERSONA_CACHE_SIZE:
+            self._custom.popitem(last=False)
+
+    def _get_custom(self, persona_id: str) -> Optional[Persona]:
+        persona = self._custom.get(persona_id)
+        if persona:
+            self._custom.move_to_end(persona_id)
+            return persona
+        try:
+            with open(os.path.join(self._custom_directory, f"{persona_id}.json"), encoding="utf-8") as f:
+                persona = Persona(PersonaSpec(**json.load(f)))
+        except (OSError, ValueError, ValidationError):
+            return None
+        self._remember_custom(persona)
+        return persona
+
+    def create_custom(self, request: CustomPersonaRequest) -> Persona:
+        """Validate, compile and store a user-authored persona. Identical requests share an id."""
+        voices = self.voice_ids()
+        voice_id = request.voice_id if request.voice_id in voices else DEFAULT_VOICE_ID
+        content = json.dumps([request.title, request.scenario, request.details.model_dump(), voice_id], sort_keys=True)
+        persona_id = f"custom_{hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]}"
+
+        existing = self._get_custom(persona_id)
+        if existing:
+            return existing
+
+        spec = PersonaSpec(id=persona_id, title=request.title, desc=request.scenario[:200],
+                           voice_id=voice_id, details=request.details, scenario=request.scenario)
+        persona = Persona(spec)
+        os.makedirs(self._custom_directory, exist_ok=True)
+        path = os.path.join(self._custom_directory, f"{persona_id}.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(spec.model_dump(), f)
+        os.replace(f"{path}.tmp", path)
+        self._remember_custom(persona)
+        return persona
+
+
+_registry: Optional[PersonaRegistry] = None
+
+
+def get_persona_registry() -> PersonaRegistry:
+    global _registry
+    if _registry is None:
+        _registry = PersonaRegistry()
+    return _registry
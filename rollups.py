@@ -0,0 +1,286 @@
+"""Running per-agent and per-persona aggregates of post-call scores.
+
+Each scored call updates a fixed number of rows: one for its agent, one for its
+persona and one for everyone. Each row holds, per rubric, a count and sum, an
+EWMA, the last ``ROLLUP_WINDOW`` scores and a 0-100 histogram, plus compliance
+item hit counts. So recording a call and reading any profile take the same
+time however long the history is. Scores are kept on a 0-100 scale (customer
+satisfaction is out of 5 and gets scaled up).
+
+The weakness profile ranks an agent's rubrics by how far their EWMA is below
+``ROLLUP_TARGET_SCORE``. The recommended persona is the one whose ``trains``
+rubrics cover the biggest gaps, nudged towards personas the agent does worse
+against than everyone else and ones they haven't tried.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from loguru import logger
+
+from evaluators import ANALYSIS_RUBRICS
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+ROLLUP_DB_PATH = os.getenv("ROLLUP_DB_PATH", os.path.join(DATA_DIR, "rollups.sqlite3"))
+ROLLUP_WINDOW = int(os.getenv("ROLLUP_WINDOW", "10"))
+ROLLUP_EWMA_ALPHA = float(os.getenv("ROLLUP_EWMA_ALPHA", "0.3"))
+ROLLUP_TARGET_SCORE = float(os.getenv("ROLLUP_TARGET_SCORE", "80"))
+# Extra weight for a persona the agent has never practised with
+NEW_PERSONA_BONUS = 5.0
+# Taken off the persona of the agent's last call so recommendations rotate
+REPEAT_PERSONA_PENALTY = 5.0
+PERCENTILES = (("p10", 0.1), ("p50", 0.5), ("p90", 0.9))
+
+
+def _normalize(rubric: str, value) -> Optional[int]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    top = ANALYSIS_RUBRICS[rubric]["max"]
+    return max(0, min(100, round(value * 100 / top)))
+
+
+def _new_rubric() -> dict:
+    return {"count": 0, "sum": 0, "ewma": None, "recent": [], "hist": [0] * 101}
+
+
+def _add(rubric: dict, score: int):
+    rubric["count"] += 1
+    rubric["sum"] += score
+    ewma = rubric["ewma"]
+    rubric["ewma"] = score if ewma is None else ewma + ROLLUP_EWMA_ALPHA * (score - ewma)
+    rubric["recent"] = (rubric["recent"] + [score])[-ROLLUP_WINDOW:]
+    rubric["hist"][score] += 1
+
+
+def _percentile(hist: List[int], count: int, q: float) -> int:
+    rank = q * (count - 1)
+    seen = 0
+    for score, n in enumerate(hist):
+        seen += n
+        if seen > rank:
+            return score
+    return 100
+
+
+def _render_rubric(rubric: dict) -> dict:
+    count = rubric["count"]
+    recent = rubric["recent"]
+    mean = rubric["sum"] / count
+    return {
+        "count": count,
+        "mean": round(mean, 1),
+        "recent_mean": round(sum(recent) / len(recent), 1),
+        "ewma": round(rubric["ewma"], 1),
+        # Positive when recent calls score above the agent's long-run average
+        "trend": round(rubric["ewma"] - mean, 1),
+        **{name: _percentile(rubric["hist"], count, q) for name, q in PERCENTILES},
+    }
+
+
+class ScoreRollups:
+    """Rollup rows in SQLite, updated in one transaction per call.
+
+    Transactions are ``BEGIN IMMEDIATE`` so workers sharing the file never
+    interleave read-modify-writes of the same row.
+    """
+
+    def __init__(self, path: str = ROLLUP_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rollups (
+                scope TEXT NOT NULL, key TEXT NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL,
+                brief TEXT NOT NULL, PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS recorded (session_id TEXT PRIMARY KEY, recorded_at REAL NOT NULL);
+            """
+        )
+
+    def _load(self, scope: str, key: str) -> Optional[dict]:
+        row = self._db.execute("SELECT state FROM rollups WHERE scope = ? AND key = ?", (scope, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save(self, scope: str, key: str, state: dict):
+        # The brief is what dashboard lists need, so they don't parse every histogram
+        ewma = {r: round(v["ewma"], 1) for r, v in state["rubrics"].items()}
+        brief = {"calls": state["calls"], "last_at": state["last_at"], "ewma": ewma,
+                 "weakest": min(ewma, key=ewma.get) if ewma else None}
+        self._db.execute(
+            "INSERT INTO rollups (scope, key, state, updated_at, brief) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (scope, key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at, "
+            "brief = excluded.brief",
+            (scope, key, json.dumps(state), time.time(), json.dumps(brief)),
+        )
+
+    def record(self, session_id: str, agent_id: Optional[str], persona: str, scores: dict) -> bool:
+        """Fold one call's scores into its rollups. A call is only ever counted once.
+
+        Rubrics listed in ``fallback`` hold defaults rather than real scores and
+        are left out; a call with nothing else isn't recorded.
+        """
+        fallback = set(scores.get("fallback") or [])
+        normalized = {r: _normalize(r, scores.get(r)) for r in ANALYSIS_RUBRICS if r not in fallback}
+        normalized = {r: v for r, v in normalized.items() if v is not None}
+        if not normalized:
+            return False
+        composite = sum(normalized.values()) / len(normalized)
+        items = {} if "compliance" in fallback else scores.get("compliance_items") or {}
+        now = time.time()
+
+        scopes = [("all", "*"), ("persona", persona)]
+        if agent_id:
+            scopes.append(("agent", agent_id))
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._db.execute("SELECT 1 FROM recorded WHERE session_id = ?", (session_id,)).fetchone():
+                    self._db.execute("ROLLBACK")
+                    return False
+                self._db.execute("INSERT INTO recorded (session_id, recorded_at) VALUES (?, ?)", (session_id, now))
+                for scope, key in scopes:
+                    state = self._load(scope, key) or {
+                        "calls": 0, "first_at": now, "rubrics": {}, "items": {}, "item_calls": 0, "personas": {},
+                    }
+                    state["calls"] += 1
+                    state["last_at"] = now
+                    state["last_persona"] = persona
+                    for rubric, score in normalized.items():
+                        _add(state["rubrics"].setdefault(rubric, _new_rubric()), score)
+                    if items:
+                        state["item_calls"] += 1
+                        for item, outcome in items.items():
+                            hit = isinstance(outcome, dict) and outcome.get("status") == "hit"
+                            state["items"][item] = state["items"].get(item, 0) + hit
+                    if scope != "persona":
+                        # Composite score per persona, for comparing an agent against everyone
+                        against = state["personas"].setdefault(persona, {"calls": 0, "sum": 0.0})
+                        against["calls"] += 1
+                        against["sum"] += composite
+                    self._save(scope, key, state)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return True
+
+    def state(self, scope: str, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._load(scope, key)
+
+    def summary(self, scope: str, key: str) -> Optional[dict]:
+        state = self.state(scope, key)
+        return self._render(key, state) if state else None
+
+    @staticmethod
+    def _render(key: str, state: dict) -> dict:
+        item_calls = state["item_calls"]
+        return {
+            "id": key,
+            "calls": state["calls"],
+            "first_at": state["first_at"],
+            "last_at": state["last_at"],
+            "rubrics": {r: _render_rubric(v) for r, v in state["rubrics"].items()},
+            "compliance_items": {item: round(hits / item_calls, 2) for item, hits in state["items"].items()}
+            if item_calls else {},
+        }
+
+    def agents(self, limit: int = 500) -> List[dict]:
+        """One line per agent, most recently active first, for dashboards."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, brief FROM rollups WHERE scope = 'agent' ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"agent_id": key, **json.loads(brief)} for key, brief in rows]
+
+    def weakness_profile(self, agent_id: str, personas: List) -> Optional[dict]:
+        """An agent's rubrics weakest first, weakest compliance items, and a persona to practise with next."""
+        with self._lock:
+            agent = self._load("agent", agent_id)
+            everyone = self._load("all", "*")
+        if agent is None:
+            return None
+
+        weaknesses = []
+        for rubric, values in agent["rubrics"].items():
+            population = everyone["rubrics"].get(rubric) if everyone else None
+            weaknesses.append({
+                "rubric": rubric,
+                "ewma": round(values["ewma"], 1),
+                "deficit": round(max(0.0, ROLLUP_TARGET_SCORE - values["ewma"]), 1),
+                "vs_everyone": round(values["ewma"] - population["ewma"], 1) if population else None,
+                "trend": round(values["ewma"] - values["sum"] / values["count"], 1),
+            })
+        weaknesses.sort(key=lambda w: (-w["deficit"], w["ewma"]))
+
+        items = []
+        if agent["item_calls"]:
+            items = sorted(((hits / agent["item_calls"], item) for item, hits in agent["items"].items()))
+            items = [{"item": item, "hit_rate": round(rate, 2)} for rate, item in items[:3] if rate < 1]
+
+        return {
+            "agent_id": agent_id,
+            "calls": agent["calls"],
+            "target": ROLLUP_TARGET_SCORE,
+            "weaknesses": weaknesses,
+            "weakest_compliance_items": items,
+            "recommended_persona": self._recommend(agent, everyone, weaknesses, personas),
+        }
+
+    @staticmethod
+    def _recommend(agent: dict, everyone: Optional[dict], weaknesses: List[dict], personas: List) -> Optional[dict]:
+        deficits = {w["rubric"]: w["deficit"] for w in weaknesses}
+        best = None
+        for persona in personas:
+            trains = persona.spec.trains
+            need = sum(deficits.get(r, 0.0) for r in trains) / len(trains) if trains else 0.0
+            score = need
+            mine = agent["personas"].get(persona.id)
+            theirs = everyone["personas"].get(persona.id) if everyone else None
+            if mine is None:
+                score += NEW_PERSONA_BONUS
+            elif theirs:
+                # How much worse this agent does against the persona than everyone does
+                score += max(0.0, theirs["sum"] / theirs["calls"] - mine["sum"] / mine["calls"])
+            if persona.id == agent.get("last_persona"):
+                score -= REPEAT_PERSONA_PENALTY
+            if best is None or score > best[0]:
+                best = (score, persona, [r for r in trains if deficits.get(r, 0.0) > 0])
+        if best is None:
+            return None
+        score, persona, gaps = best
+        return {
+            "persona": persona.id,
+            "title": persona.spec.title,
+            "score": round(score, 1),
+            "works_on": gaps or persona.spec.trains,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_rollups: Optional[ScoreRollups] = None
+
+
+def get_score_rollups() -> ScoreRollups:
+    global _rollups
+    if _rollups is None:
+        _rollups = ScoreRollups()
+    return _rollups
+
+
+def record_call(call: dict, scores: dict):
+    """Fold a finished call's scores into the rollups, logging rather than raising on failure."""
+    try:
+        get_score_rollups().record(call["session_id"], call["agent_id"], call["persona"], scores)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to update rollups for {call['session_id']}: {e}")
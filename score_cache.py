@@ -0,0 +1,131 @@
+"""Content-addressed cache for transcript scores.
+
+Keys are a hash of the normalized transcript, the rubric name, a hash of the
+rubric prompt and the model name, so editing a prompt invalidates its entries
+without any bookkeeping. Lookups go through an in-memory LRU with a TTL first,
+then a SQLite file that survives restarts.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+
+SCORE_CACHE_PATH = os.getenv("SCORE_CACHE_PATH", os.path.join(DATA_DIR, "score_cache.sqlite3"))
+SCORE_CACHE_MAX_ENTRIES = int(os.getenv("SCORE_CACHE_MAX_ENTRIES", "2048"))
+SCORE_CACHE_TTL_SECS = float(os.getenv("SCORE_CACHE_TTL_SECS", "3600"))
+# Entries on disk are kept much longer; they only go stale when a prompt changes.
+SCORE_CACHE_DISK_TTL_SECS = float(os.getenv("SCORE_CACHE_DISK_TTL_SECS", str(30 * 24 * 3600)))
+
+
+def normalize_transcript(transcript: str) -> str:
+    lines = (" ".join(line.split()) for line in transcript.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def prompt_version(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(transcript: str, rubric: str, prompt: str, model: str) -> str:
+    h = hashlib.sha256()
+    for part in (normalize_transcript(transcript), rubric, prompt_version(prompt), model):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ScoreCache:
+    def __init__(self,
+                 path: Optional[str] = SCORE_CACHE_PATH,
+                 max_entries: int = SCORE_CACHE_MAX_ENTRIES,
+                 ttl: float = SCORE_CACHE_TTL_SECS,
+                 disk_ttl: float = SCORE_CACHE_DISK_TTL_SECS):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._disk_ttl = disk_ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+        # A single connection guarded by a lock; disk work runs in a worker thread.
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM scores WHERE created_at < ?", (time.time() - disk_ttl,))
+            self._db.commit()
+
+    def _remember(self, key: str, value: Any):
+        self._memory[key] = (time.monotonic() + self._ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM scores WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self._disk_ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _disk_set(self, key: str, value: Any):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scores (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        if self._db is not None:
+            value = await asyncio.to_thread(self._disk_get, key)
+            if value is not None:
+                self._remember(key, value)
+                self._stats["disk_hits"] += 1
+                return value
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        self._remember(key, value)
+        self._stats["writes"] += 1
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value)
+
+    def stats(self) -> dict:
+        lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return {
+            **self._stats,
+            "memory_entries": len(self._memory),
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
@@ -0,0 +1,178 @@
+"""Live sentiment scoring: an in-process lexicon model and a per-session scheduler.
+
+The lexicon scorer runs synchronously on every turn and maps onto the same 1–100
+scale as the LLM sentiment prompt. The LLM is only used for an optional, sampled
+calibration pass scheduled through ``SentimentScheduler``.
+"""
+
+import asyncio
+import math
+import os
+import re
+from typing import Awaitable, Callable, List, Optional
+
+from loguru import logger
+
+# Number of most recent transcript lines (agent and customer) scored per update.
+SENTIMENT_WINDOW_TURNS = 8
+
+# Fraction of turns that also get an LLM calibration pass (0 disables it).
+SENTIMENT_LLM_SAMPLE_RATE = float(os.getenv("SENTIMENT_LLM_SAMPLE_RATE", "0"))
+
+# Valence on a -4..4 scale, tuned to the vocabulary of the persona scenarios in
+# personas/*.txt, the data files personas/registry.py loads.
+LEXICON = {
+    # frustration, distrust, cost pressure
+    "ridiculous": -3.0, "misled": -3.0, "misleading": -2.8, "lied": -3.2, "scam": -3.4, "ripoff": -3.0,
+    "angry": -3.0, "upset": -2.4, "frustrated": -2.6, "frustrating": -2.6, "tired": -1.6, "annoyed": -2.2,
+    "burned": -2.4, "hiding": -2.2, "evasive": -2.0, "vague": -1.4, "confusing": -1.8, "confused": -1.6,
+    "overwhelmed": -1.8, "worried": -1.8, "concerned": -1.4, "embarrassed": -1.6, "hate": -2.8,
+    "unfair": -2.4, "expensive": -1.8, "overcharged": -2.6, "surprised": -0.6, "shutoff": -2.0,
+    "behind": -1.0, "hardship": -2.0, "struggling": -2.0, "problem": -1.4, "wrong": -1.8, "error": -1.4,
+    "terrible": -3.0, "awful": -3.0, "bad": -2.2, "worse": -2.2, "worst": -3.0, "unacceptable": -3.0,
+    "sorry": -0.4, "unfortunately": -1.2, "hesitant": -1.0, "doubt": -1.2, "suspicious": -1.8,
+    # relief, trust, satisfaction
+    "thanks": 1.8, "thank": 1.8, "appreciate": 2.2, "appreciated": 2.2, "great": 2.8, "perfect": 3.0,
+    "awesome": 3.0, "excellent": 3.0, "helpful": 2.2, "clear": 1.2, "fair": 1.6, "affordable": 1.8,
+    "cheap": 1.0, "cheaper": 1.4, "cheapest": 1.2, "save": 1.6, "savings": 1.6, "discount": 1.4,
+    "good": 1.8, "better": 1.6, "best": 2.2, "nice": 1.8, "happy": 2.6, "glad": 2.2, "relieved": 2.4,
+    "understand": 0.8, "okay": 0.6, "ok": 0.6, "sure": 0.6, "yes": 0.4, "love": 2.8, "wonderful": 3.0,
+    "transparent": 1.6, "honest": 1.8, "easy": 1.6, "simple": 1.2, "reasonable": 1.6, "works": 1.0,
+}
+
+# Multi-word expressions, matched before single words.
+PHRASES = {
+    "hidden fee": -2.6, "hidden fees": -2.6, "hidden charges": -2.6, "extra charges": -2.0,
+    "fine print": -1.6, "price hike": -2.2, "price hikes": -2.2, "rip off": -3.0, "too high": -2.2,
+    "too expensive": -2.4, "no surprises": 0.8, "not fair": -2.4, "makes sense": 1.6,
+    "sounds good": 2.2, "that helps": 2.0, "thank you": 2.2, "thanks so much": 2.8,
+    "shut off": -2.0, "plain english": -0.6, "not sure": -1.0, "what does that mean": -1.2,
+}
+
+NEGATIONS = {"not", "no", "never", "dont", "don't", "isnt", "isn't", "cant", "can't", "wont", "won't",
+             "didnt", "didn't", "doesnt", "doesn't", "wasnt", "wasn't", "aint", "ain't", "nothing", "without"}
+INTENSIFIERS = {"very": 1.3, "really": 1.3, "so": 1.25, "extremely": 1.5, "totally": 1.4, "absolutely": 1.4,
+                "completely": 1.4, "super": 1.3, "incredibly": 1.5, "way": 1.2}
+DIMINISHERS = {"slightly": 0.6, "somewhat": 0.7, "barely": 0.5, "little": 0.7, "kinda": 0.7, "bit": 0.7}
+
+NEGATION_SCALAR = -0.74
+# Customer lines drive the meter; the agent's words count for less.
+AGENT_WEIGHT = 0.4
+
+# Negation and degree words don't reach past the end of a clause ("No, that's great")
+CLAUSE_BREAKS = {",", ".", ";", ":", "?", "!"}
+
+_TOKEN = re.compile(r"__[a-z_']+__|[a-z']+|[!,.;:?]")
+_PHRASE = re.compile(r"\b(" + "|".join(re.escape(p) for p in sorted(PHRASES, key=len, reverse=True)) + r")\b")
+
+
+def _tokenize(text: str) -> List[str]:
+    # Known phrases become single "__hidden_fee__" style tokens
+    text = _PHRASE.sub(lambda m: f" __{m.group(1).replace(' ', '_')}__ ", text.lower().replace("’", "'"))
+    return _TOKEN.findall(text)
+
+
+def _valence(text: str) -> float:
+    tokens = _tokenize(text)
+
+    total = 0.0
+    but_index = tokens.index("but") if "but" in tokens else -1
+    for i, token in enumerate(tokens):
+        if token.startswith("__"):
+            value = PHRASES[token.strip("_").replace("_", " ")]
+        else:
+            value = LEXICON.get(token)
+        if value is None:
+            continue
+
+        # Negation and degree words in the three preceding tokens of the same clause
+        for prev in reversed(tokens[max(0, i - 3):i]):
+            if prev in CLAUSE_BREAKS:
+                break
+            if prev in NEGATIONS:
+                value *= NEGATION_SCALAR
+            elif prev in INTENSIFIERS:
+                value *= INTENSIFIERS[prev]
+            elif prev in DIMINISHERS:
+                value *= DIMINISHERS[prev]
+
+        # "..., but ..." shifts the weight to the second clause
+        if but_index >= 0:
+            value *= 0.5 if i < but_index else 1.5
+        total += value
+
+    total *= 1 + min(tokens.count("!"), 3) * 0.1
+    return total
+
+
+def _to_scale(total: float) -> int:
+    compound = total / math.sqrt(total * total + 15)
+    return max(1, min(100, round(50.5 + 49.5 * compound)))
+
+
+def score_text(text: str) -> int:
+    """Map the valence of ``text`` onto the 1–100 sentiment scale (50 is neutral)."""
+    return _to_scale(_valence(text))
+
+
+def score_conversation(lines: List[str]) -> int:
+    """Score "Agent: ..." / "Customer: ..." lines, weighting customer lines and recent turns higher."""
+    total = 0.0
+    for age, line in enumerate(reversed(lines)):
+        weight = AGENT_WEIGHT if line.startswith("Agent:") else 1.0
+        total += _valence(line.split(":", 1)[-1]) * weight * 0.85 ** age
+    return _to_scale(total)
+
+
+class SentimentScheduler:
+    """Runs at most one sentiment request at a time for a session.
+
+    A turn submitted while a request is in flight replaces whatever was queued
+    before it, so a chatty call still costs a single outstanding request. Results
+    are delivered in turn order; anything older than the last delivered turn is
+    dropped so the meter never moves backwards.
+    """
+
+    def __init__(self,
+                 score: Callable[[str], Awaitable[Optional[int]]],
+                 on_result: Callable[[int, int, dict], Awaitable[None]],
+                 create_task: Callable[[Awaitable], asyncio.Task] = asyncio.create_task):
+        self._score = score
+        self._on_result = on_result
+        self._create_task = create_task
+        self._pending: Optional[tuple] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._last_delivered = -1
+        self.stats = {"submitted": 0, "scored": 0, "failed": 0, "replaced": 0, "dropped": 0}
+
+    def submit(self, seq: int, transcript: str, **context):
+        self.stats["submitted"] += 1
+        if self._pending is not None:
+            self.stats["replaced"] += 1
+        self._pending = (seq, transcript, context)
+        if self._worker is None or self._worker.done():
+            self._worker = self._create_task(self._drain())
+
+    async def _drain(self):
+        while self._pending is not None:
+            seq, transcript, context = self._pending
+            self._pending = None
+            try:
+                score = await self._score(transcript)
+            except Exception as e:
+                logger.error(f"Sentiment analysis error: {e}")
+                score = None
+            if score is None:
+                self.stats["failed"] += 1
+                continue
+            self.stats["scored"] += 1
+
+            if seq <= self._last_delivered:
+                self.stats["dropped"] += 1
+                continue
+            self._last_delivered = seq
+            await self._on_result(seq, score, context)
+
+    @property
+    def worker(self) -> Optional[asyncio.Task]:
+        return self._worker
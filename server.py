@@ -5,34 +5,63 @@
 #
 
 import argparse
-import asyncio
+import json
+import os
 import sys
 from contextlib import asynccontextmanager
-from typing import Dict
-
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-import json
+from typing import List, Optional
 
 from fastapi.middleware.cors import CORSMiddleware
 
 import uvicorn
-from bot import run_bot
+from analysis import ALL_SELECTIONS, analyze_transcript, select_rubrics, stream_analysis
+from batch_scoring import BATCH_MAX_ITEMS, get_batch_runner, parse_jsonl
+from bot import get_service_pool, run_bot
+from compliance import score_compliance
+from evaluators import close_engine, get_engine
+from latency import render_metrics, session_report
+from llm_scheduler import get_llm_scheduler
+from personas.registry import CustomPersonaRequest, get_persona_registry
+from sessions import SESSION_RETRY_AFTER_SECS, get_sessions
+from single_flight import get_single_flight
+from rollups import get_score_rollups
+from transcripts import CallInProgress, get_call_scorer, get_transcript_store
+from turn_detection import TURN_DETECTION, TURN_MODES
+from tts_cache import get_tts_cache
+from vad_pool import get_vad_pool
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, Request, Body
+from fastapi import FastAPI, Query, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from loguru import logger
+from pydantic import BaseModel
 
 from pipecat.transports.network.webrtc_connection import IceServer, SmallWebRTCConnection
 
 # Load environment variables
 load_dotenv(override=True)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build every evaluator chain and the pooled HTTP client before serving requests
+    get_engine()
+    # Load the shared VAD model sessions so the first call doesn't pay for it
+    get_vad_pool()
+    # Pre-build a service bundle for every persona voice
+    await get_service_pool().start(get_persona_registry().voice_ids())
+    get_sessions().start()
+    # Picks up batch jobs this worker left unfinished
+    get_batch_runner().start()
+    yield  # Run app
+    # Calls first, so the scoring they schedule as they end is waited for below
+    await get_sessions().stop()
+    await get_call_scorer().stop()
+    await get_batch_runner().stop()
+    await get_service_pool().stop()
+    await close_engine()
+
 
-# Store connections by pc_id
-pcs_map: Dict[str, SmallWebRTCConnection] = {}
+app = FastAPI(lifespan=lifespan)
 
 ice_servers = [
     IceServer(
@@ -53,417 +82,389 @@ app.mount("/src", StaticFiles(directory="src"), name="static")
 
 
 @app.get("/api/personas")
-async def get_personas():
-    personas = [
-        {
-            "id": "frustrated_customer",
-            "title": "The Frustrated Customer",
-            "desc": "Angry, direct, and demands clear, fee-free pricing.",
-            "img": "./public/frustrated_customer.png",
-            "address": "4121 Oak Creek Dr, Austin, TX 78727",
-            "birthDate": "07/12/1994",
-            "email": "john.dean@gmail.com",
-            "ownership": "Owner",
-            "language": "English"
-        },
-        {
-            "id": "confused_customer",
-            "title": "The Confused Customer",
-            "desc": "Polite but overwhelmed and needs simple, step-by-step help.",
-            "img": "./public/confused_customer.png",
-            "address": "2 Cedar Court, Dallas, TX 75238",
-            "birthDate": "08/12/1994",
-            "email": "sarah.hill@email.com",
-            "ownership": "Renter",
-            "language": "English"
-        },
-        {
-            "id": "budget_customer",
-            "title": "The Budget Customer",
-            "desc": "Focused on finding the lowest price and avoiding hidden fees.",
-            "img": "./public/budget_customer.png",
-            "address": "10500 Cloisters Dr, Fort Worth, TX 3941",
-            "birthDate": "08/12/1994",
-            "email": "taylor.braxton@gmail.com",
-            "ownership": "Renter",
-            "language": "English"
-        },
-        {
-            "id": "struggling_customer",
-            "title": "The Struggling Customer",
-            "desc": "Facing hardship and seeks a fair, respectful payment plan.",
-            "img": "./public/struggling_customer.png",
-            "address": "1835 Maplewood Dr, Houston, TX 77009",
-            "birthDate": "08/12/1994",
-            "email": "jordan.rivera@email.com",
-            "ownership": "Renter",
-            "language": "English"
-        },
-        {
-            "id": "concerned_customer",
-            "title": "The Concerned Customer",
-            "desc": "Surprised by a high bill and wants answers without excuses.",
-            "img": "./public/concerned_customer.png",
-            "address": "1835 Maplewood Dr, Houston, TX 77009",
-            "birthDate": "08/12/1994",
-            "email": "jordan.rivera@email.com",
-            "ownership": "Renter",
-            "language": "English"
-        },
-        {
-            "id": "create_customer",
-            "title": "Create Your Own",
-            "desc": "Write your own customer scenario and behavior summary.",
-            "img": "./public/create_customer.png",
-        }
-    ]
-
-    return JSONResponse(content=personas)
+async def get_personas(request: Request):
+    registry = get_persona_registry()
+    registry.maybe_reload()
+    headers = {"ETag": registry.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == registry.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=registry.body, media_type="application/json", headers=headers)
+
+
+@app.post("/api/personas/custom")
+async def create_custom_persona(body: CustomPersonaRequest):
+    persona = get_persona_registry().create_custom(body)
+    return persona.card()
+
+
+@app.post("/api/personas/reload")
+async def reload_personas():
+    registry = get_persona_registry()
+    registry.reload()
+    return {"personas": len(registry.personas()), "etag": registry.etag}
 
 
 @app.post("/api/offer")
-async def offer(persona: str, request: dict, background_tasks: BackgroundTasks):
+async def offer(persona: str, request: dict, agent: Optional[str] = None, turn: Optional[str] = None):
     pc_id = request.get("pc_id")
+    if turn is not None and turn not in TURN_MODES:
+        raise HTTPException(status_code=400, detail=f"turn must be one of {', '.join(TURN_MODES)}")
     logger.info(f"Using persona: {persona}")
 
-    if pc_id and pc_id in pcs_map:
-        pipecat_connection = pcs_map[pc_id]
+    sessions = get_sessions()
+    session = sessions.get(pc_id)
+    if session:
         logger.info(f"Reusing existing connection for pc_id: {pc_id}")
-        await pipecat_connection.renegotiate(sdp=request["sdp"], type=request["type"])
-    else:
-        pipecat_connection = SmallWebRTCConnection(ice_servers)
-        await pipecat_connection.initialize(sdp=request["sdp"], type=request["type"])
-
-        @pipecat_connection.event_handler("closed")
-        async def handle_disconnected(webrtc_connection: SmallWebRTCConnection):
-            logger.info(f"Discarding peer connection for pc_id: {webrtc_connection.pc_id}")
-            pcs_map.pop(webrtc_connection.pc_id, None)
-
-        # Forward the persona name so that the bot behaves accordingly
-        background_tasks.add_task(run_bot, pipecat_connection, persona)
+        session.counters["renegotiations"] += 1
+        await session.connection.renegotiate(sdp=request["sdp"], type=request["type"])
+        return session.connection.get_answer()
+
+    # Refuse new calls up front rather than degrading every call already running
+    if not sessions.has_capacity():
+        logger.warning(f"Rejecting call: {sessions.max_sessions} sessions already active")
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Server at capacity, try again shortly"},
+            headers={"Retry-After": str(SESSION_RETRY_AFTER_SECS)},
+        )
+
+    pipecat_connection = SmallWebRTCConnection(ice_servers)
+    await pipecat_connection.initialize(sdp=request["sdp"], type=request["type"])
+    session = sessions.add(pipecat_connection, persona)
+
+    # Forward the persona name so that the bot behaves accordingly
+    sessions.run(session, run_bot(pipecat_connection, persona, session.counters, agent_id=agent,
+                                    turn_detection=turn or TURN_DETECTION))
+
+    return pipecat_connection.get_answer()
+
+
+async def _transcript(body: dict) -> str:
+    """The transcript in the body, or the stored one of its ``session_id``."""
+    session_id = body.get("session_id")
+    if not session_id:
+        return body.get("transcript", "")
+    transcript = get_transcript_store().transcript(session_id)
+    if transcript is None:
+        raise HTTPException(status_code=404, detail="No transcript for this session")
+    return transcript
+
+
+async def _call_scores(body: dict) -> dict:
+    """Scores already worked out for the body's ``session_id``, if it has one."""
+    session_id = body.get("session_id")
+    if not session_id:
+        return {}
+    if get_transcript_store().call(session_id) is None:
+        raise HTTPException(status_code=404, detail="No transcript for this session")
+    try:
+        return await get_call_scorer().result(session_id) or {}
+    except CallInProgress:
+        raise HTTPException(status_code=409, detail="Call still in progress")
 
-    answer = pipecat_connection.get_answer()
-    # Updating the peer connection inside the map
-    pcs_map[answer["pc_id"]] = pipecat_connection
 
-    return answer
+async def _score_rubric(request: Request, rubric: str):
+    body = await request.json()
+    scores = await _call_scores(body)
+    if rubric in scores:
+        return scores[rubric]
+    return await get_engine().score(rubric, await _transcript(body))
 
 
 @app.post("/api/compliance")
 async def get_compliance_score(request: Request):
     body = await request.json()
-    transcript = body.get("transcript", "")
-
-    # Model
-    model = ChatOpenAI(model="gpt-4o-mini-2024-07-18",
-                       temperature=0.6,
-                       max_tokens=None,
-                       timeout=None,
-                       max_retries=2)
-
-    # Building the compliance checker prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """You are a compliance checker for customer service transcripts. 
-     Return a compliance score from 1 to 100 based on whether the agent asked all of the following questions (accept similar/related questions, not just exact wording):
- 
-     - Street address and Zip Code
-     - Confirm City and State
-     - First and Last Name
-     - Do you rent or own?
-     - Is the electricity in your name at this address?
-     - If already in their name: Are the lights on?
- 
-     If any are missing, reduce the score proportionally. 
-     Return your answer as a JSON object with keys: "score" (integer). I just need the score and no other explanation.
-     """),
-        ("user", "{input}")
-    ])
-
-    chain = prompt | model
-    response = chain.invoke({"input": transcript})
-
-    try:
-        score = json.loads(response.content)['score']
-        if isinstance(score, (int, float)):
-            return score
-        else:
-            return 85
-    except Exception:
-        return 85
+    scores = await _call_scores(body)
+    if "compliance" in scores:
+        return scores["compliance"]
+    # Checklist matched locally, only undecided items go to the LLM; cached like the other rubrics
+    result = await score_compliance(await _transcript(body))
+    return result["score"]
 
 
 @app.post("/api/overall_score")
 async def get_overall_score(request: Request):
-    body = await request.json()
-    transcript = body.get("transcript", "")
-
-    # Model
-    model = ChatOpenAI(model="gpt-4o-mini-2024-07-18",
-                       temperature=0.6,
-                       max_tokens=None,
-                       timeout=None,
-                       max_retries=2)
-
-    # Building the compliance checker prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """You are a call quality checker for customer service transcripts.
-             Return a call quality score from 1 to 100 based on whether the agent did all of the following (accept similar/related actions, not just exact wording):
- 
-             Greeted the customer.
- 
-             Collected customer information.
- 
-             Answered the customer’s questions politely.
- 
-             Acknowledged and addressed the customer’s questions.
- 
-             Pitched the product to the customer.
- 
-             Closed the call and ended the call on a good note.
- 
-             If any are missing, reduce the score proportionally.
-             Return your answer as a JSON object with the key: "score" (integer). I just need the score and no other explanation.
-             """),
-        ("user", "{input}")
-    ])
-
-    chain = prompt | model
-    response = chain.invoke({"input": transcript})
-
-    try:
-        score = json.loads(response.content)['score']
-        if isinstance(score, (int, float)):
-            return score
-        else:
-            return 85
-    except Exception:
-        return 85
+    return await _score_rubric(request, "overall_score")
 
 
 @app.post("/api/customer_satisfaction")
 async def get_customer_satisfaction(request: Request):
-    body = await request.json()
-    transcript = body.get("transcript", "")
-
-    # Model
-    model = ChatOpenAI(model="gpt-4o-mini-2024-07-18",
-                       temperature=0.6,
-                       max_tokens=None,
-                       timeout=None,
-                       max_retries=2)
-
-    # Building the compliance checker prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """You are an evaluator tasked with rating customer satisfaction based on service call transcripts.
-          Assign a customer satisfaction score from 1 to 5, where:
-  
-          5 = Extremely satisfied
-  
-          4 = Satisfied
-  
-          3 = Neutral
-  
-          2 = Dissatisfied
-  
-          1 = Extremely dissatisfied
-  
-          Base your score on tone, professionalism, helpfulness, and whether the customer’s needs were fully understood and resolved. 
-          Look for signs of frustration or delight from the customer, and how effectively the agent handled the interaction overall.
-          Return your result as a JSON object with the key: "score" (integer). Do not include any explanations or comments—just the score.
-          """),
-        ("user", "{input}")
-    ])
-
-    chain = prompt | model
-    response = chain.invoke({"input": transcript})
-
-    try:
-        score = json.loads(response.content)['score']
-        if isinstance(score, (int, float)):
-            return score
-        else:
-            return 3
-    except Exception:
-        return 3
+    return await _score_rubric(request, "customer_satisfaction")
 
 
 @app.post("/api/script_adherence")
 async def get_script_adherence(request: Request):
-    body = await request.json()
-    transcript = body.get("transcript", "")
-
-    # Model
-    model = ChatOpenAI(model="gpt-4o-mini-2024-07-18",
-                       temperature=0.6,
-                       max_tokens=None,
-                       timeout=None,
-                       max_retries=2)
-
-    # Building the compliance checker prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """You are a script adherence evaluator for customer service transcripts.
-          Return a score from 1 to 100 based on how closely the agent followed the expected call flow and maintained topic relevance. Evaluate the following:
-  
-          Greeting – The agent greeted the customer politely and naturally.
-          Customer Info – The agent collected customer information and responded politely to provided details.
-          Mandatory Questions – The agent asked required questions and responded politely to answers.
-          Coupons & Discounts – The agent acknowledged any discounts or coupons appreciatively.
-          SOE Value Statement / Credit – The agent acknowledged this in a way tailored to the customer’s setting.
-          Pitch – The agent acknowledged the context and pitched the offering while creating relevant hesitation, politely.
-          Close / Overcoming Hesitation – The agent appreciated the customer’s engagement, addressed any hesitations sincerely, and closed the call naturally.
-          Topic Relevance – The agent stayed focused on the reason the customer reached out (e.g., discussing energy plans if the customer inquired about that), and did not diverge into unrelated topics (e.g., selling unrelated products like burgers).
-  
-          If any step is missed or done poorly, deduct points proportionally.
-          Return the result as a JSON object with the key: "score" (integer, 1–100). Do not include explanations—just the score.
-          """),
-        ("user", "{input}")
-    ])
-
-    chain = prompt | model
-    response = chain.invoke({"input": transcript})
-
-    try:
-        score = json.loads(response.content)['score']
-        if isinstance(score, (int, float)):
-            return score
-        else:
-            return 70
-    except Exception:
-        return 70
+    return await _score_rubric(request, "script_adherence")
 
 
 @app.post("/api/hesitation")
 async def get_hesitation_score(request: Request):
+    return await _score_rubric(request, "hesitation")
+
+
+@app.post("/api/feedback")
+async def get_feedback(request: Request):
     body = await request.json()
-    transcript = body.get("transcript", "")
-
-    # Model
-    model = ChatOpenAI(model="gpt-4o-mini-2024-07-18",
-                       temperature=0.8,
-                       max_tokens=None,
-                       timeout=None,
-                       max_retries=2)
-
-    # Building the compliance checker prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """You are an evaluator assessing an agent’s ability to handle hesitation in a customer service transcript.
-     Return a score from 1 to 100 based on the agent’s effectiveness in managing hesitation moments during the conversation.
- 
-     Handling Hesitation includes:
- 
-     Responding confidently and fluidly, without long pauses or awkward transitions.
- 
-     Proactively addressing customer doubts, uncertainty, or objections with reassurance.
- 
-     Maintaining a steady, calm, and composed tone even when the customer is unsure.
- 
-     Minimizing signs of confusion, delay, or indecision from the agent.
- 
-     Helping reduce customer uncertainty and guiding them toward a decision.
- 
-     Deduct points if the agent hesitates, shows signs of uncertainty, fails to resolve customer doubts, or causes more confusion.
-     Reward high scores for smooth, confident handling, even in difficult parts of the call.
- 
-     Return your answer as a JSON object with the key: "score" (integer, 1–100). No other explanation is needed.
-     """),
-        ("user", "{input}")
-    ])
-
-    chain = prompt | model
-    response = chain.invoke({"input": transcript})
+    scores = await _call_scores(body)
+    if "feedback" in scores:
+        return scores["feedback"]
+    return await get_engine().feedback(await _transcript(body))
 
-    try:
-        score = json.loads(response.content)['score']
-        if isinstance(score, (int, float)):
-            return score
-        else:
-            return 70
-    except Exception:
-        return 70
 
+class AnalysisRequest(BaseModel):
+    transcript: str = ""
+    # Score a call captured by the server instead of the transcript above
+    session_id: Optional[str] = None
+    # Subset of ANALYSIS_RUBRICS (plus "feedback") to evaluate. Defaults to everything.
+    rubrics: Optional[List[str]] = None
 
-@app.post("/api/feedback")
-async def get_feedback(transcript: str = Body(..., embed=True)):
-    # Model
-    model = ChatOpenAI(model="gpt-4o-mini-2024-07-18",
-                       temperature=0.8,
-                       max_tokens=None,
-                       timeout=None,
-                       max_retries=2)
-
-    # Building the compliance checker prompt
-    prompt = ChatPromptTemplate.from_messages([
-    (
-        "system",
-        """
-You are a customer-service call evaluator.
-
-Task
-1. Read the transcript provided by the user.
-2. Assess the agent in four categories:
-   • compliance: Did the agent ask required questions like name, address, city/state, electricity status, etc.?
-   • call_quality: Did the agent greet, collect info, answer politely, pitch, and close professionally?
-   • customer_satisfaction: Was the customer’s tone positive, and were their needs understood and resolved effectively?
-   • handling_hesitation: Did the agent respond confidently and reduce customer uncertainty without sounding unsure or pausing?
-
-Output
-Return a JSON array that contains EXACTLY five (5) objects.
-Each object must include:
-  "category" – one of the four category names above (snake_case)
-  "feedback" – ONE actionable sentence (≤ 20 words) that ends with a newline character
-
-Rules
-• Output only the JSON array – no extra text before or after it.  
-• Do NOT include scores, numbers, or long explanations.  
-• Do not repeat the same words or ideas across sentences.  
-• The JSON must be valid.
-
-Example (double braces are used only to escape literal braces):
-[
-{{  
-  "category": "compliance",
-  "feedback": "Always verify the customer's service address to meet regulatory requirements."
-}},
-...
-]
-"""
-    ),
-    ("user", "{input}")
-])
-    chain = prompt | model
-    response = chain.invoke({"input": transcript})
-
-    default_feedback = """
-    Please ensure all required questions are asked to stay compliant with the call script.\n
-    Maintain a natural flow from greeting to closing for better overall call quality.\n
-    Make sure the customer feels heard and their concerns are fully addressed.\n
-    Speak confidently and avoid pauses to reduce customer hesitation and build trust.\n
-    Keep the conversation relevant and focused on the customer’s original reason for calling.\n
-    """
 
+@app.post("/api/analyze")
+async def analyze(request: AnalysisRequest):
+    """Score every requested rubric, plus feedback, with a single model call."""
+    try:
+        select_rubrics(request.rubrics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    body = request.model_dump()
+    scores = await _call_scores(body)
+    selected = request.rubrics or ALL_SELECTIONS
+    if scores and all(name in scores for name in selected):
+        # Usually already scored in the background when the call ended
+        result = {name: scores[name] for name in selected}
+        if "compliance" in selected and "compliance_items" in scores:
+            result["compliance_items"] = scores["compliance_items"]
+        return result
+    return await analyze_transcript(await _transcript(body), request.rubrics)
+
+
+async def _sse(events, selected: List[str]):
+    """Server-sent event lines for the ``selected`` part of an analysis stream."""
+    keep = [*selected, "compliance_items"] if "compliance" in selected else selected
+    async for kind, data in events:
+        if kind == "summary":
+            data = {name: data[name] for name in keep if name in data}
+        elif kind in ("score", "error") and data["rubric"] not in selected:
+            continue
+        elif kind == "feedback" and "feedback" not in selected:
+            continue
+        yield f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/analyze/stream")
+async def analyze_stream(session_id: Optional[str] = None, transcript: str = "",
+                         rubrics: Optional[List[str]] = Query(None)):
+    """``/api/analyze`` as server-sent events, so results can be shown as they come in.
+
+    Sends a ``score`` event per rubric and a ``feedback`` event per feedback item as
+    soon as each is ready, or an ``error`` event for one that failed, then a
+    ``summary`` event with the whole result. Transcripts are better sent to
+    ``/api/analyze``, since a long one won't fit in a query string.
+    """
+    try:
+        select_rubrics(rubrics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if session_id:
+        if get_transcript_store().call(session_id) is None:
+            raise HTTPException(status_code=404, detail="No transcript for this session")
+        try:
+            # Answered here, before the stream has started
+            await get_call_scorer().ended_call(session_id)
+        except CallInProgress:
+            raise HTTPException(status_code=409, detail="Call still in progress")
+        events = get_call_scorer().events(session_id)
+    else:
+        events = stream_analysis(transcript, rubrics)
+    return StreamingResponse(_sse(events, rubrics or ALL_SELECTIONS), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/calls")
+async def list_calls(agent_id: Optional[str] = None, persona: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None, limit: int = 50):
+    return get_transcript_store().calls(agent_id, persona, since, until, min(max(limit, 1), 500))
+
+
+@app.get("/api/calls/{session_id}")
+async def get_call(session_id: str):
+    store = get_transcript_store()
+    call = store.call(session_id)
+    if call is None:
+        raise HTTPException(status_code=404, detail="No such call")
+    return {**call, "transcript": store.lines(session_id), "scores": store.scores(session_id)}
+
+
+@app.get("/api/agents")
+async def list_agents(limit: int = 500):
+    """Latest EWMA per rubric for every agent, read from the rollups."""
+    return get_score_rollups().agents(min(max(limit, 1), 5000))
+
+
+@app.get("/api/agents/{agent_id}/stats")
+async def get_agent_stats(agent_id: str):
+    summary = get_score_rollups().summary("agent", agent_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No scored calls for this agent")
+    return summary
+
+
+@app.get("/api/agents/{agent_id}/profile")
+async def get_agent_profile(agent_id: str):
+    """The agent's weakest rubrics and compliance items, and the persona to practise with next."""
+    profile = get_score_rollups().weakness_profile(agent_id, get_persona_registry().personas())
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No scored calls for this agent")
+    return profile
+
+
+@app.get("/api/personas/{persona_id}/stats")
+async def get_persona_stats(persona_id: str):
+    summary = get_score_rollups().summary("persona", persona_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No scored calls with this persona")
+    return summary
+
+
+async def _batch_items(request: Request) -> tuple:
+    """(items, rubrics) from a JSONL upload, raw or as a multipart ``file``, or a JSON list of transcript ids."""
+    content_type = request.headers.get("content-type", "")
+    rubrics = request.query_params.getlist("rubrics") or None
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise ValueError("Upload the transcripts as a JSONL 'file' field")
+        return parse_jsonl(await upload.read()), form.getlist("rubrics") or rubrics
+    if content_type.startswith("application/json"):
+        body = await request.json()
+        ids = body.get("transcript_ids") if isinstance(body, dict) else None
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("Expected a non-empty transcript_ids list")
+        # Ids of captured calls, or of transcripts uploaded in an earlier batch
+        calls, uploads = get_transcript_store(), get_batch_runner().store
+        items = [{"id": str(i), "transcript": calls.transcript(str(i)) or uploads.transcript(str(i))}
+                 for i in dict.fromkeys(ids)]
+        missing = [item["id"] for item in items if item["transcript"] is None]
+        if missing:
+            raise ValueError(f"Unknown transcript ids: {', '.join(missing[:20])}")
+        return items, body.get("rubrics") or rubrics
+    return parse_jsonl(await request.body()), rubrics
+
+
+async def _ndjson(lines):
+    async for line in lines:
+        yield json.dumps(line) + "\n"
+
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: Request):
+    """Re-score many transcripts, streaming one NDJSON line per transcript as it finishes.
+
+    The first line names the job; if the client goes away the job carries on and its
+    results can be picked up from ``/api/analyze/batch/{job_id}/results``.
+    """
     try:
-        raw_feedback = response.content.strip()
+        items, rubrics = await _batch_items(request)
+        select_rubrics(rubrics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not items:
+        raise HTTPException(status_code=400, detail="No transcripts to score")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} transcripts per batch")
+    if len({item["id"] for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Transcript ids must be unique within a batch")
 
-        # 1️⃣ normal case – valid JSON already
-        feedback = json.loads(raw_feedback)
-        return feedback
+    runner = get_batch_runner()
+    job_id = await runner.submit(items, rubrics)
+
+    async def lines():
+        yield {"type": "job", "job_id": job_id, "total": len(items)}
+        async for line in runner.stream(job_id):
+            yield line
+
+    return StreamingResponse(_ndjson(lines()), media_type="application/x-ndjson")
+
+
+@app.get("/api/analyze/batch/{job_id}")
+async def get_batch_job(job_id: str):
+    job = get_batch_runner().store.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No such batch job")
+    return job
+
+
+@app.get("/api/analyze/batch/{job_id}/results")
+async def get_batch_results(job_id: str):
+    """Every result so far, then the rest as they finish."""
+    runner = get_batch_runner()
+    if runner.store.job(job_id) is None:
+        raise HTTPException(status_code=404, detail="No such batch job")
+    return StreamingResponse(_ndjson(runner.stream(job_id)), media_type="application/x-ndjson")
+
+
+@app.delete("/api/analyze/batch/{job_id}")
+async def cancel_batch_job(job_id: str):
+    runner = get_batch_runner()
+    if runner.store.job(job_id) is None:
+        raise HTTPException(status_code=404, detail="No such batch job")
+    await runner.cancel(job_id)
+    return runner.store.job(job_id)
+
+
+@app.get("/api/sessions")
+async def get_session_stats():
+    return get_sessions().stats()
+
+
+@app.get("/api/sessions/{pc_id}/latency")
+async def get_session_latency(pc_id: str):
+    report = session_report(pc_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No latency report for this session")
+    return report
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return get_engine().cache_stats()
 
-    except (json.JSONDecodeError, TypeError, ValueError):
-        # 2️⃣ the model might use single-quotes → quick fix then retry
-        try:
-            feedback = json.loads(raw_feedback.replace("'", '"'))
-            return feedback
-        except Exception:
-            # 3️⃣ still not valid → fall back to default text
-            return default_feedback.strip()
 
-    except Exception:
-        return default_feedback.strip()
+@app.get("/api/llm-scheduler/stats")
+async def get_llm_scheduler_stats():
+    return get_llm_scheduler().stats()
+
+
+@app.get("/api/single-flight/stats")
+async def get_single_flight_stats():
+    return get_single_flight().stats()
+
+
+@app.get("/api/tts-cache/stats")
+async def get_tts_cache_stats():
+    return get_tts_cache().stats()
+
+
+@app.get("/api/services/stats")
+async def get_service_pool_stats():
+    return get_service_pool().stats()
+
+
+@app.get("/api/vad/stats")
+async def get_vad_stats():
+    return get_vad_pool().stats()
+
+
+@app.get("/api/batch/stats")
+async def get_batch_stats():
+    return get_batch_runner().stats()
 
 
 @app.get("/")
@@ -471,14 +472,6 @@ async def serve_index():
     return FileResponse("index.html")
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    yield  # Run app
-    coros = [pc.disconnect() for pc in pcs_map.values()]
-    await asyncio.gather(*coros)
-    pcs_map.clear()
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="WebRTC demo")
     parser.add_argument(
@@ -487,6 +480,10 @@ if __name__ == "__main__":
     parser.add_argument(
         "--port", type=int, default=7860, help="Port for HTTP server (default: 7860)"
     )
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WORKERS", "1")),
+        help="Worker processes; above 1, a dispatcher on --port routes to workers on the next ports (default: 1)"
+    )
     parser.add_argument("--verbose", "-v", action="count")
     args = parser.parse_args()
 
@@ -496,4 +493,9 @@ if __name__ == "__main__":
     else:
         logger.add(sys.stderr, level="DEBUG")
 
-    uvicorn.run(app, host=args.host, port=args.port)
+    if args.workers > 1:
+        from dispatcher import create_app
+
+        uvicorn.run(create_app(args.workers, args.host, args.port + 1, args.verbose), host=args.host, port=args.port)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
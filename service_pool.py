@@ -0,0 +1,127 @@
+"""Warm pool of pre-built per-call service bundles.
+
+Building the STT/LLM/TTS services and opening their HTTP connections happens on
+the call-setup path today. The pool keeps a few bundles per key (the persona's
+voice id) ready so a new call can claim one, and refills in the background.
+A claimed bundle belongs to its call; it has been linked into that call's
+pipeline, so ``release`` disposes of it instead of pooling it again.
+The factory is injected, so the pool works the same with local stand-in services.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional
+
+from loguru import logger
+
+SERVICE_POOL_SIZE = int(os.getenv("SERVICE_POOL_SIZE", "1"))
+SERVICE_POOL_IDLE_SECS = float(os.getenv("SERVICE_POOL_IDLE_SECS", "300"))
+
+
+class ServicePool:
+    """Keeps up to ``size`` ready bundles per key.
+
+    ``factory(key)`` builds (and warms) a bundle. Entries unclaimed for longer than
+    ``idle_secs`` are dropped, and passed to ``dispose`` if given, so connections
+    don't go stale; the key is refilled on its next claim.
+    """
+
+    def __init__(self,
+                 factory: Callable[[str], Awaitable[Any]],
+                 size: int = SERVICE_POOL_SIZE,
+                 idle_secs: float = SERVICE_POOL_IDLE_SECS,
+                 dispose: Optional[Callable[[Any], Awaitable[None]]] = None):
+        self._factory = factory
+        self._size = size
+        self._idle_secs = idle_secs
+        self._dispose = dispose
+        # key -> deque of (bundle, ready_at, build_secs)
+        self._ready: Dict[str, Deque[tuple]] = {}
+        self._refilling: Dict[str, asyncio.Task] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._stats = {"hits": 0, "misses": 0, "built": 0, "build_errors": 0, "expired": 0, "released": 0,
+                       "setup_secs_saved": 0.0, "miss_setup_secs": 0.0}
+
+    async def _build(self, key: str) -> tuple:
+        start = time.perf_counter()
+        bundle = await self._factory(key)
+        build_secs = time.perf_counter() - start
+        self._stats["built"] += 1
+        return bundle, time.monotonic(), build_secs
+
+    async def _fill(self, key: str):
+        ready = self._ready.setdefault(key, deque())
+        while len(ready) < self._size:
+            try:
+                ready.append(await self._build(key))
+            except Exception as e:
+                self._stats["build_errors"] += 1
+                logger.warning(f"Service pool failed to build bundle for {key}: {e}")
+                return
+
+    def _schedule_fill(self, key: str):
+        task = self._refilling.get(key)
+        if task is None or task.done():
+            self._refilling[key] = asyncio.create_task(self._fill(key))
+
+    async def start(self, keys: Iterable[str]):
+        """Prefill every key and start expiring idle entries."""
+        await asyncio.gather(*(self._fill(key) for key in set(keys)))
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def claim(self, key: str) -> Any:
+        """Take a ready bundle for ``key``, building one inline if none is ready."""
+        ready = self._ready.get(key)
+        if ready:
+            bundle, _, build_secs = ready.popleft()
+            self._stats["hits"] += 1
+            self._stats["setup_secs_saved"] += build_secs
+        else:
+            bundle, _, build_secs = await self._build(key)
+            self._stats["misses"] += 1
+            self._stats["miss_setup_secs"] += build_secs
+        self._schedule_fill(key)
+        return bundle
+
+    async def release(self, bundle: Any):
+        """Dispose of a bundle once the call that claimed it has ended."""
+        self._stats["released"] += 1
+        if self._dispose:
+            try:
+                await self._dispose(bundle)
+            except Exception as e:
+                logger.warning(f"Service pool failed to dispose of a bundle: {e}")
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(min(30.0, self._idle_secs))
+            cutoff = time.monotonic() - self._idle_secs
+            for ready in self._ready.values():
+                while ready and ready[0][1] < cutoff:
+                    bundle, _, _ = ready.popleft()
+                    self._stats["expired"] += 1
+                    if self._dispose:
+                        await self._dispose(bundle)
+
+    async def stop(self):
+        tasks = [t for t in [self._reaper, *self._refilling.values()] if t and not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._reaper = None
+        if self._dispose:
+            for ready in self._ready.values():
+                for bundle, _, _ in ready:
+                    await self._dispose(bundle)
+        self._ready.clear()
+
+    def stats(self) -> dict:
+        claims = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": self._stats["hits"] / claims if claims else 0.0,
+            "ready": {key: len(ready) for key, ready in self._ready.items()},
+        }
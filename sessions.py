@@ -0,0 +1,237 @@
+"""Registry of live call sessions with admission control and reaping.
+
+Every accepted offer becomes a ``Session`` holding its WebRTC connection, the
+bot task running its pipeline, and a few counters. New calls are refused once
+``MAX_SESSIONS`` are live, and a background reaper closes sessions whose peer
+went away without a "closed" event, whose pipeline already ended, or that have
+run past ``SESSION_MAX_SECS``.
+
+When the server runs as one of several workers behind ``dispatcher.py``, the
+registry also records each session in a ``SessionDirectory`` shared by every
+worker on the host, so the dispatcher can route renegotiations to the owner.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Dict, Optional
+
+from loguru import logger
+
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "20"))
+# A session whose peer has not been connected for this long is reaped.
+SESSION_IDLE_SECS = float(os.getenv("SESSION_IDLE_SECS", "30"))
+# Hard cap on call length; anything older is treated as a zombie.
+SESSION_MAX_SECS = float(os.getenv("SESSION_MAX_SECS", "3600"))
+SESSION_RETRY_AFTER_SECS = int(os.getenv("SESSION_RETRY_AFTER_SECS", "5"))
+SESSION_REAP_INTERVAL_SECS = 10.0
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+SESSION_DIRECTORY_PATH = os.getenv("SESSION_DIRECTORY_PATH", os.path.join(DATA_DIR, "sessions.sqlite3"))
+# Set by the dispatcher for each worker process it starts.
+WORKER_ID = os.getenv("ASCEND_WORKER_ID")
+
+
+class SessionDirectory:
+    """pc_id -> worker mapping shared by the worker processes on one host.
+
+    Rows are single-key writes on a WAL database, cheap enough to run inline.
+    """
+
+    def __init__(self, path: str = SESSION_DIRECTORY_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(pc_id TEXT PRIMARY KEY, worker TEXT NOT NULL, persona TEXT, created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def register(self, pc_id: str, worker: str, persona: str = ""):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (pc_id, worker, persona, created_at) VALUES (?, ?, ?, ?)",
+                (pc_id, worker, persona, time.time()),
+            )
+            self._db.commit()
+
+    def remove(self, pc_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE pc_id = ?", (pc_id,))
+            self._db.commit()
+
+    def lookup(self, pc_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT worker FROM sessions WHERE pc_id = ?", (pc_id,)).fetchone()
+        return row[0] if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT worker, COUNT(*) FROM sessions GROUP BY worker").fetchall()
+        return dict(rows)
+
+    def clear_worker(self, worker: str):
+        """Forget every session of a worker, e.g. left over from before it restarted."""
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE worker = ?", (worker,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Session:
+    def __init__(self, pc_id: str, connection, persona: str):
+        self.pc_id = pc_id
+        self.connection = connection
+        self.persona = persona
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self._last_connected = self._started
+        self.task: Optional[asyncio.Task] = None
+        # Filled in by the bot as the call runs (turns, VAD session, voice...)
+        self.counters: Dict[str, object] = {"renegotiations": 0}
+
+    @property
+    def age_secs(self) -> float:
+        return time.monotonic() - self._started
+
+    def idle_secs(self) -> float:
+        now = time.monotonic()
+        if self.connection.is_connected():
+            self._last_connected = now
+        return now - self._last_connected
+
+    def info(self) -> dict:
+        return {
+            "pc_id": self.pc_id,
+            "persona": self.persona,
+            "started_at": self.started_at,
+            "duration_secs": round(self.age_secs, 1),
+            "connected": self.connection.is_connected(),
+            "running": self.task is not None and not self.task.done(),
+            **self.counters,
+        }
+
+
+class SessionRegistry:
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_secs: float = SESSION_IDLE_SECS,
+                 max_secs: float = SESSION_MAX_SECS, directory: Optional[SessionDirectory] = None,
+                 worker_id: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self._directory = directory
+        self._worker_id = worker_id
+        self._idle_secs = idle_secs
+        self._max_secs = max_secs
+        self._sessions: Dict[str, Session] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._stats = {"admitted": 0, "rejected": 0, "closed": 0, "reaped_idle": 0, "reaped_zombie": 0,
+                       "peak_active": 0}
+
+    def get(self, pc_id: Optional[str]) -> Optional[Session]:
+        return self._sessions.get(pc_id) if pc_id else None
+
+    def has_capacity(self) -> bool:
+        if len(self._sessions) < self.max_sessions:
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def add(self, connection, persona: str) -> Session:
+        session = Session(connection.pc_id, connection, persona)
+        self._sessions[session.pc_id] = session
+        self._stats["admitted"] += 1
+        self._stats["peak_active"] = max(self._stats["peak_active"], len(self._sessions))
+        if self._directory:
+            self._directory.register(session.pc_id, self._worker_id, persona)
+
+        @connection.event_handler("closed")
+        async def handle_closed(webrtc_connection):
+            logger.info(f"Discarding peer connection for pc_id: {webrtc_connection.pc_id}")
+            if self._discard(webrtc_connection.pc_id):
+                self._stats["closed"] += 1
+
+        return session
+
+    def _discard(self, pc_id: str) -> Optional[Session]:
+        session = self._sessions.pop(pc_id, None)
+        if session and self._directory:
+            self._directory.remove(pc_id)
+        return session
+
+    def run(self, session: Session, bot: Awaitable):
+        """Run the session's bot pipeline as a task the registry can cancel."""
+        session.task = asyncio.create_task(bot)
+
+    async def _close(self, session: Session, reason: str):
+        logger.info(f"Reaping session {session.pc_id} ({reason}, {session.age_secs:.0f}s old)")
+        self._discard(session.pc_id)
+        self._stats[f"reaped_{reason}"] += 1
+        if session.task and not session.task.done():
+            session.task.cancel()
+        try:
+            await session.connection.disconnect()
+        except Exception as e:
+            logger.debug(f"Error disconnecting {session.pc_id}: {e}")
+
+    async def reap(self):
+        for session in list(self._sessions.values()):
+            if session.age_secs > self._max_secs or (session.task is not None and session.task.done()):
+                await self._close(session, "zombie")
+            elif session.idle_secs() > self._idle_secs:
+                await self._close(session, "idle")
+
+    async def _reap_forever(self):
+        while True:
+            await asyncio.sleep(SESSION_REAP_INTERVAL_SECS)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Session reaper error: {e}")
+
+    def start(self):
+        if self._directory:
+            self._directory.clear_worker(self._worker_id)
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_forever())
+
+    async def stop(self):
+        if self._reaper:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        if self._directory:
+            self._directory.clear_worker(self._worker_id)
+        await asyncio.gather(*(s.connection.disconnect() for s in sessions), return_exceptions=True)
+        tasks = [session.task for session in sessions if session.task and not session.task.done()]
+        for task in tasks:
+            task.cancel()
+        # Lets each call's cleanup (ending it, scheduling its scoring) run before shutdown goes on
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "worker": self._worker_id,
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "sessions": [session.info() for session in self._sessions.values()],
+        }
+
+
+_registry: Optional[SessionRegistry] = None
+
+
+def get_sessions() -> SessionRegistry:
+    global _registry
+    if _registry is None:
+        directory = SessionDirectory() if WORKER_ID is not None else None
+        _registry = SessionRegistry(directory=directory, worker_id=WORKER_ID)
+    return _registry
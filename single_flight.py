@@ -0,0 +1,77 @@
+"""Coalescing of identical scoring requests that are in flight at the same time.
+
+A double-clicked "End call" or a re-rendering screen can ask for the same
+rubric on the same transcript several times within milliseconds, before the
+score cache has anything to return. ``SingleFlight.run`` makes the first
+caller start the work and every identical caller that arrives while it runs
+await that same task. The result, or the exception, goes to all of them.
+
+Each waiter is shielded from the others: one leaving (a client disconnecting)
+doesn't cancel the work, but once the last waiter has left it is cancelled,
+since no one is left to use the result. Nothing is kept after the task ends;
+repeat requests after that are the score cache's job.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from latency import COALESCED_REQUESTS
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """In-flight work by key, shared between every caller asking for the same key."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {"started": 0, "coalesced": 0, "cancelled": 0}
+        self._coalesced: Dict[str, int] = {}
+
+    async def run(self, key: str, label: str, work: Callable[[], Awaitable]):
+        """Await ``work()``, or the identical call already running under ``key``.
+
+        ``label`` names the rubric in the coalescing counters.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(work()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._finished(key, flight))
+            self._stats["started"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            self._coalesced[label] = self._coalesced.get(label, 0) + 1
+            COALESCED_REQUESTS.inc(label)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller has gone, so the answer would go nowhere
+                self._stats["cancelled"] += 1
+                flight.task.cancel()
+                self._finished(key, flight)
+
+    def _finished(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {**self._stats, "in_flight": len(self._flights), "coalesced_by_rubric": dict(self._coalesced)}
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,279 @@
+"""Speculative customer replies started before the agent's turn officially ends.
+
+VAD only ends the agent's turn after ``stop_secs`` of silence, but Deepgram has
+usually settled on the words well before then. ``SpeculativeReplyProcessor``
+sits before the user context aggregator and watches the turn's final and
+interim transcripts. Once Deepgram has finalised what the agent said (it only
+does at a pause) and nothing new has come in for ``SPECULATION_STABLE_SECS``, it
+starts the LLM request the turn would make: the same windowed context plus that
+text as the agent's message. The streamed answer is buffered. Interim text
+alone never starts a request, since it changes with every word.
+
+When the real turn reaches ``SpeculativeLLMService`` and its messages match the
+speculated ones (the agent's text compared without case or punctuation), the
+buffered stream is replayed instead of making a new request. The answer is the
+one the turn would have got, only earlier. Otherwise the speculation is
+cancelled and the turn goes to the LLM as usual. A speculation is also
+cancelled as soon as the agent keeps talking and the text changes.
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import Frame, InterimTranscriptionFrame, TranscriptionFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from pipecat.services.openai.llm import OpenAILLMService
+
+from context_window import estimate_tokens
+from latency import SPECULATION_SAVED_SECONDS, SPECULATIONS
+from llm_scheduler import LIVE, get_llm_scheduler
+
+SPECULATIVE_REPLIES = os.getenv("SPECULATIVE_REPLIES", "1") != "0"
+# How long the agent's words must stay unchanged before a reply is started.
+SPECULATION_STABLE_SECS = float(os.getenv("SPECULATION_STABLE_SECS", "0.25"))
+# Speculations shorter than this are not worth an LLM request.
+SPECULATION_MIN_WORDS = 2
+# Tokens a customer reply is charged for on top of its context
+LIVE_REPLY_TOKENS = 150
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+class _Speculation:
+    """One in-flight speculative completion and the chunks it has streamed so far."""
+
+    def __init__(self, text: str, messages: List[dict]):
+        self.text = text
+        self.messages = messages
+        self.started_at = time.monotonic()
+        self.first_chunk_at: Optional[float] = None
+        self.chunks = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def add(self, chunk):
+        if self.first_chunk_at is None and chunk.choices:
+            self.first_chunk_at = time.monotonic()
+        self.chunks.append(chunk)
+        self._changed.set()
+
+    def finish(self, error: Optional[Exception] = None):
+        self.done = True
+        self.error = error
+        self._changed.set()
+
+    async def replay(self):
+        """Every chunk, buffered ones first, then the rest as they stream in."""
+        sent = 0
+        while True:
+            while sent < len(self.chunks):
+                yield self.chunks[sent]
+                sent += 1
+            if self.done:
+                if self.error:
+                    raise self.error
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class _SettledStream:
+    """A completion stream that settles its rate-limit slot with the tokens it used."""
+
+    def __init__(self, stream, slot):
+        self._stream = stream
+        self._slot = slot
+        self._chunks = self._read()
+
+    async def _read(self):
+        used = None
+        try:
+            async for chunk in self._stream:
+                # pipecat asks for include_usage, so the last chunk reports the usage
+                if getattr(chunk, "usage", None):
+                    used = chunk.usage.total_tokens
+                yield chunk
+        finally:
+            self._slot.settle(used)
+
+    def __aiter__(self):
+        return self._chunks
+
+    async def close(self):
+        await self._chunks.aclose()
+        await self._stream.close()
+
+
+class SpeculativeLLMService(OpenAILLMService):
+    """OpenAI LLM service that can answer a turn from a matching speculative request.
+
+    Services are pooled across calls, so the call's ``SpeculativeReplyProcessor``
+    attaches itself as ``speculator`` for the length of the call.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.speculator: Optional["SpeculativeReplyProcessor"] = None
+
+    async def get_chat_completions(self, context, messages):
+        # Every reply, speculative or not, goes ahead of scoring on the rate limit
+        slot = await get_llm_scheduler().acquire(self.model_name, estimate_tokens(messages) + LIVE_REPLY_TOKENS, LIVE)
+        stream = await super().get_chat_completions(context, messages)
+        return _SettledStream(stream, slot)
+
+    async def _stream_chat_completions(self, context):
+        if self.speculator is not None:
+            stream = self.speculator.commit(context.get_messages())
+            if stream is not None:
+                return stream
+        return await super()._stream_chat_completions(context)
+
+
+class SpeculativeReplyProcessor(FrameProcessor):
+    """Place between the STT transcript processor and the user context aggregator."""
+
+    def __init__(self, llm: SpeculativeLLMService, context, window: Callable[[List[dict]], List[dict]],
+                 stable_secs: float = SPECULATION_STABLE_SECS, **kwargs):
+        super().__init__(**kwargs)
+        self._llm = llm
+        self._context = context
+        self._window = window
+        self._stable_secs = stable_secs
+        # Final transcripts of the current turn, then whatever Deepgram is still revising
+        self._finals: List[str] = []
+        self._interim = ""
+        self._changed = asyncio.Event()
+        self._watcher: Optional[asyncio.Task] = None
+        self._current: Optional[_Speculation] = None
+        # The last speculation handed to the LLM service, still streaming into its replay
+        self._committed: Optional[_Speculation] = None
+        self.stats = {"started": 0, "hit": 0, "miss": 0, "none": 0, "cancelled": 0, "saved_secs": 0.0}
+        llm.speculator = self
+
+    def _candidate(self) -> str:
+        return " ".join(self._finals + ([self._interim] if self._interim else []))
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, TranscriptionFrame):
+            if frame.text.strip():
+                self._finals.append(frame.text)
+            self._interim = ""
+            self._on_change()
+        elif isinstance(frame, InterimTranscriptionFrame):
+            self._interim = frame.text.strip()
+            self._on_change()
+
+        await self.push_frame(frame, direction)
+
+    def _on_change(self):
+        current = self._current
+        if current is not None and normalize(current.text) != normalize(self._candidate()):
+            # The agent kept talking, so this answer would be to the wrong question
+            self._discard("cancelled")
+        self._changed.set()
+        if self._watcher is None:
+            self._watcher = self.create_task(self._watch())
+
+    async def _watch(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            # Wait until the text stops changing
+            while True:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), self._stable_secs)
+                    self._changed.clear()
+                except asyncio.TimeoutError:
+                    break
+            text = self._candidate()
+            # Still mid-sentence while an interim is pending
+            if self._current is None and not self._interim and len(text.split()) >= SPECULATION_MIN_WORDS:
+                self._start(text)
+
+    def _start(self, text: str):
+        history = self._context.get_messages()
+        spec = _Speculation(text, self._window([*history, {"role": "user", "content": text}]))
+        spec.task = self.create_task(self._run(spec))
+        self._current = spec
+        self.stats["started"] += 1
+
+    async def _run(self, spec: _Speculation):
+        stream = None
+        try:
+            stream = await self._llm.get_chat_completions(self._context, spec.messages)
+            async for chunk in stream:
+                spec.add(chunk)
+        except asyncio.CancelledError:
+            if stream is not None:
+                await stream.close()
+            raise
+        except Exception as e:
+            logger.debug(f"Speculative reply failed: {e}")
+            spec.finish(e)
+            return
+        spec.finish()
+
+    def _discard(self, outcome: str):
+        spec, self._current = self._current, None
+        if spec is None:
+            return
+        self.stats[outcome] += 1
+        SPECULATIONS.inc(outcome)
+        if spec.task is not None and not spec.task.done():
+            spec.task.cancel()
+
+    def _matches(self, spec: _Speculation, messages: List[dict]) -> bool:
+        if spec.error is not None or len(messages) != len(spec.messages) or not messages:
+            return False
+        *history, turn = messages
+        *spec_history, spec_turn = spec.messages
+        return (history == spec_history and turn.get("role") == "user"
+                and normalize(str(turn.get("content") or "")) == normalize(spec.text))
+
+    def commit(self, messages: List[dict]):
+        """The buffered reply for a turn with these messages, or None to make a normal request."""
+        # The turn's transcripts have been consumed; the next ones belong to the next turn
+        self._finals = []
+        self._interim = ""
+        spec = self._current
+        if spec is None:
+            self.stats["none"] += 1
+            SPECULATIONS.inc("none")
+            return None
+        if not self._matches(spec, messages):
+            self._discard("miss")
+            return None
+
+        self._current = None
+        self._committed = spec
+        now = time.monotonic()
+        # The LLM wait already behind us: up to the first token, or up to now if it hasn't come yet
+        saved = min(now, spec.first_chunk_at or now) - spec.started_at
+        self.stats["hit"] += 1
+        self.stats["saved_secs"] = round(self.stats["saved_secs"] + saved, 3)
+        SPECULATIONS.inc("hit")
+        SPECULATION_SAVED_SECONDS.observe("llm", saved)
+        return spec.replay()
+
+    async def cleanup(self):
+        await super().cleanup()
+        self._discard("cancelled")
+        if self._committed and self._committed.task and not self._committed.task.done():
+            self._committed.task.cancel()
+        if self._watcher:
+            await self.cancel_task(self._watcher)
+        if self._llm.speculator is self:
+            self._llm.speculator = None
@@ -1,30 +1,39 @@
 import { useEffect, useState } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
+import { analyzeCall, type CallAnalysis } from './lib/analyze-call.ts';
 
 function CallAnalysisScreen() {
   const navigate = useNavigate();
   const location = useLocation();
-  const callAnalysis = location.state?.callAnalysis;
-
-  const [complianceScore, setComplianceScore] = useState(0);
-  const [overallScore, setOverallScore] = useState(0);
-  const [scriptAdherenceScore, setScriptAdherenceScore] = useState(0);
-  const [hesitationScore, setHesitationScore] = useState(0);
-  const [customerSatisfactionScore, setCustomerSatisfactionScore] = useState(0);
-  const [feedback, setFeedback] = useState([]);
-  const [duration, setDuration] = useState(0);
+  const analysisRequest = location.state?.analysisRequest;
+  const [callAnalysis, setCallAnalysis] = useState<CallAnalysis | null>(location.state?.callAnalysis ?? null);
 
+  // Scores and feedback are painted as the stream delivers them
   useEffect(() => {
-    if (callAnalysis) {
-      setComplianceScore(Number(callAnalysis.compliance));
-      setOverallScore(Number(callAnalysis.overall_score));
-      setScriptAdherenceScore(Number(callAnalysis.script_adherence));
-      setHesitationScore(Number(callAnalysis.hesitation));
-      setCustomerSatisfactionScore(Number(callAnalysis.customer_satisfaction));
-      setFeedback(callAnalysis.feedback);
-      setDuration(Number(callAnalysis.duration));
-    }
-  }, [callAnalysis]);
+    if (!analysisRequest) return;
+    let cancelled = false;
+    const {transcript, duration, sessionId} = analysisRequest;
+    void analyzeCall(transcript, duration, sessionId, (analysis) => {
+      if (!cancelled) setCallAnalysis(analysis);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [analysisRequest]);
+
+  // Undefined until the rubric's score has arrived
+  const scoreOf = (name: string): number | undefined =>
+    callAnalysis?.[name] === undefined ? undefined : Number(callAnalysis?.[name]);
+  const complianceScore = scoreOf('compliance');
+  const overallScore = scoreOf('overall_score');
+  const scriptAdherenceScore = scoreOf('script_adherence');
+  const hesitationScore = scoreOf('hesitation');
+  const customerSatisfactionScore = scoreOf('customer_satisfaction');
+  const feedback = callAnalysis?.feedback ?? [];
+  const duration = Number(callAnalysis?.duration ?? analysisRequest?.duration ?? 0);
+  const scoring = Boolean(analysisRequest) && !callAnalysis?.complete;
+
+  const shown = (score: number | undefined, suffix: string) => score === undefined ? '…' : `${score}${suffix}`;
 
   const formatDuration = (seconds: any) => {
     const mins = Math.floor(seconds / 60);
@@ -38,6 +47,7 @@ function CallAnalysisScreen() {
 
         <div className="flex justify-between items-center">
           <h1 className="text-2xl font-bold">📊 Call Performance Summary</h1>
+          {scoring && <span className="text-sm text-gray-500 animate-pulse">Scoring your call…</span>}
           <button onClick={() => navigate('/')} className="button_primary">
             Start New Call
           </button>
@@ -60,12 +70,12 @@ function CallAnalysisScreen() {
           <div className="card">
             <h2 className="typography_h2 mb-2">Overall Score</h2>
             <div className="flex justify-between items-center mb-2">
-              <p className="text-lg font-semibold text-indigo-600">{overallScore}%</p>
+              <p className="text-lg font-semibold text-indigo-600">{shown(overallScore, '%')}</p>
               <span className="text-sm text-gray-500">Industry Avg: 74%</span>
             </div>
             <div className="relative h-4 w-full rounded-full bg-gradient-to-r from-red-500 via-yellow-400 to-green-500">
               <div className="absolute top-1/2 -translate-y-1/2 w-3 h-3 rounded-full bg-white border-2 border-gray-800"
-                   style={{ left: `${overallScore}%` }}/>
+                   style={{ left: `${overallScore}%` }} hidden={overallScore === undefined}/>
             </div>
             <p className="typography_body mt-2">Well above average for your industry peers based on total performance
               metrics.</p>
@@ -75,26 +85,37 @@ function CallAnalysisScreen() {
           <div className="card">
             <h2 className="typography_h2 mb-2">Compliance</h2>
             <div className="flex justify-between items-center mb-2">
-              <p className="text-lg font-semibold text-green-600">{complianceScore}%</p>
+              <p className="text-lg font-semibold text-green-600">{shown(complianceScore, '%')}</p>
               <span className="text-sm text-gray-500">Target: 95%</span>
             </div>
             <div className="relative h-4 w-full rounded-full bg-gradient-to-r from-red-500 via-yellow-400 to-green-500">
               <div className="absolute top-1/2 -translate-y-1/2 w-3 h-3 rounded-full bg-white border-2 border-gray-800"
-                   style={{ left: `${complianceScore}%` }}/>
+                   style={{ left: `${complianceScore}%` }} hidden={complianceScore === undefined}/>
             </div>
             <p className="typography_body mt-2">You followed all required steps and disclosures during the call.</p>
+            {callAnalysis?.compliance_items && (
+              <ul className="text-xs text-gray-600 mt-2 space-y-1">
+                {Object.entries(callAnalysis.compliance_items).map(([item, result]: [string, any]) => (
+                  <li key={item} title={result.evidence ?? ''}>
+                    {result.status === 'hit' ? '✅' : result.status === 'ambiguous' ? '❔' : '❌'}{' '}
+                    {item.split('_').join(' ')}{result.status === 'ambiguous' && ' (unverified)'}
+                  </li>
+                ))}
+              </ul>
+            )}
           </div>
 
           {/* Customer Satisfaction */}
           <div className="card">
             <h2 className="typography_h2 mb-2">Customer Satisfaction</h2>
             <div className="flex justify-between items-center mb-2">
-              <p className="text-lg font-semibold text-blue-600">{customerSatisfactionScore} / 5</p>
+              <p className="text-lg font-semibold text-blue-600">{shown(customerSatisfactionScore, ' / 5')}</p>
               <span className="text-sm text-gray-500">Industry Avg: 4.1</span>
             </div>
             <div className="relative h-4 w-full rounded-full bg-gradient-to-r from-red-500 via-yellow-400 to-green-500">
               <div className="absolute top-1/2 -translate-y-1/2 w-3 h-3 rounded-full bg-white border-2 border-gray-800"
-                   style={{ left: `${(customerSatisfactionScore / 5) * 100}%` }}/>
+                   style={{ left: `${((customerSatisfactionScore ?? 0) / 5) * 100}%` }}
+                   hidden={customerSatisfactionScore === undefined}/>
             </div>
             <p className="typography_body mt-2">Based on sentiment and tone detection.</p>
           </div>
@@ -104,12 +125,12 @@ function CallAnalysisScreen() {
           <div className="card">
             <h2 className="typography_h2 mb-2">Hesitation Handling</h2>
             <div className="flex justify-between items-center mb-2">
-              <p className="text-lg font-semibold text-indigo-600">{hesitationScore}%</p>
+              <p className="text-lg font-semibold text-indigo-600">{shown(hesitationScore, '%')}</p>
               <span className="text-sm text-gray-500">Industry Avg: 72%</span>
             </div>
             <div className="relative h-4 w-full rounded-full bg-gradient-to-r from-red-500 via-yellow-400 to-green-500">
               <div className="absolute top-1/2 -translate-y-1/2 w-3 h-3 rounded-full bg-white border-2 border-gray-800"
-                   style={{ left: `${hesitationScore}%` }}/>
+                   style={{ left: `${hesitationScore}%` }} hidden={hesitationScore === undefined}/>
             </div>
             <p className="typography_body mt-2">Measures how effectively the agent responded to hesitation, objections,
               or uncertainty.</p>
@@ -119,12 +140,12 @@ function CallAnalysisScreen() {
           <div className="card">
             <h2 className="typography_h2 mb-2">Script Adherence</h2>
             <div className="flex justify-between items-center mb-2">
-              <p className="text-lg font-semibold text-purple-600">{scriptAdherenceScore}%</p>
+              <p className="text-lg font-semibold text-purple-600">{shown(scriptAdherenceScore, '%')}</p>
               <span className="text-sm text-gray-500">Target: 90%</span>
             </div>
             <div className="relative h-4 w-full rounded-full bg-gradient-to-r from-red-500 via-yellow-400 to-green-500">
               <div className="absolute top-1/2 -translate-y-1/2 w-3 h-3 rounded-full bg-white border-2 border-gray-800"
-                   style={{ left: `${scriptAdherenceScore}%` }}/>
+                   style={{ left: `${scriptAdherenceScore}%` }} hidden={scriptAdherenceScore === undefined}/>
             </div>
             <p className="typography_body mt-2">Indicates how closely the agent followed the call script, including
               required phrases and compliance steps.</p>
@@ -135,7 +156,7 @@ function CallAnalysisScreen() {
         <div className="card">
           <h2 className="typography_h2 mb-2">Observations</h2>
           <ul className="text-sm text-gray-700 list-disc list-inside space-y-2">
-            {feedback?.map(({ category, feedback: comment }: any, index) => {
+            {feedback.map(({ category, feedback: comment }: any, index) => {
               const formatCategory = (raw: string) => {
                 if (raw.includes("_")) {
                   return raw
@@ -1,21 +1,19 @@
 import {useState, useRef, useEffect} from "react";
 import {useLocation, useNavigate} from "react-router-dom";
-import {createClient} from "./lib/pipecat-client.ts";
-import {analyzeCall} from "./lib/analyze-call.ts";
+import {createClient, RubricProgress} from "./lib/pipecat-client.ts";
 
 function CallScreen() {
   const transcriptRef = useRef<HTMLDivElement | null>(null);
   const [transcript, setTranscript] = useState<string[]>([]);
   const [client, setClient] = useState<any>(null);
-  const [callAnalysis, setCallAnalysis] = useState<any>(null);
   const [botReady, setBotReady] = useState<any>(null);
   const [callStartTime, setCallStartTime] = useState<number | null>(null);
   const [elapsedSeconds, setElapsedSeconds] = useState(0);
   const [timerInterval, setTimerInterval] = useState<NodeJS.Timeout | null>(null);  const [connected, setConnected] = useState(false);
   const [connecting, setConnecting] = useState(false);
-  const [showModal, setShowModal] = useState(false);
-  const [analysisDone, setAnalysisDone] = useState(false);
   const [sentimentScore, setSentimentScore] = useState(50);
+  const [rubricProgress, setRubricProgress] = useState<RubricProgress | null>(null);
+  const [sessionId, setSessionId] = useState<string | undefined>(undefined);
 
   const location = useLocation();
   const navigate = useNavigate();
@@ -51,10 +49,24 @@ function CallScreen() {
       },
       (score: number) => {
         setSentimentScore(score);
+      },
+      (progress: RubricProgress) => {
+        setRubricProgress(progress);
+      },
+      (id: string) => {
+        setSessionId(id);
       }
     );
 
-    await c.connect();
+    try {
+      await c.connect();
+    } catch (e) {
+      // The server refuses new calls with a 503 while it is at capacity
+      console.error(e);
+      setConnecting(false);
+      alert("All lines are busy right now. Please try again in a few seconds.");
+      return;
+    }
     setClient(c);
     setConnected(true);
 
@@ -68,7 +80,6 @@ function CallScreen() {
   const stop = async () => {
     client?.disconnect();
     setConnected(false);
-    setShowModal(true);
 
     if (timerInterval) {
       clearInterval(timerInterval);
@@ -77,11 +88,8 @@ function CallScreen() {
 
     const duration = Math.floor((Date.now() - (callStartTime || 0)) / 1000);
 
-    const analysisResult = await analyzeCall(transcript, duration);
-    console.log("Analysis result:", analysisResult); // optional debug
-
-    setAnalysisDone(true);
-    setCallAnalysis(analysisResult);
+    // The results screen streams the analysis in and fills it in as it arrives
+    navigate('/call-analysis', {state: {analysisRequest: {transcript, duration, sessionId}}});
   };
 
   // void start();
@@ -223,6 +231,24 @@ function CallScreen() {
         </div>
 
 
+        <h2 className="text-md font-semibold mt-6 mb-2">Live Progress</h2>
+        <div className="text-sm text-gray-600 space-y-2">
+          {[
+            {label: "Compliance", score: rubricProgress?.compliance ?? 0},
+            {label: "Script Adherence", score: rubricProgress?.script_adherence ?? 0},
+          ].map(({label, score}) => (
+            <div key={label}>
+              <div className="flex justify-between">
+                <span>{label}</span>
+                <span>{score}%</span>
+              </div>
+              <div className="h-2 w-full rounded-full bg-gray-200">
+                <div className="h-2 rounded-full bg-blue-600" style={{ width: `${score}%` }}/>
+              </div>
+            </div>
+          ))}
+        </div>
+
         <div className="mt-6">
           <h3 className="text-md font-semibold mb-1">Notes</h3>
           <textarea
@@ -232,41 +258,6 @@ function CallScreen() {
         </div>
       </aside>
       <audio id="bot-audio" autoPlay/>
-
-      {/** Analysis model **/}
-      {showModal && (
-        <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50">
-          <div className="bg-white rounded-lg shadow-xl p-8 text-center max-w-sm w-full">
-            <h2 className="text-xl font-semibold mb-4">
-              {analysisDone ? "Analysis Complete" : "Analyzing your call..."}
-            </h2>
-
-            <p className="text-gray-600 mb-6">
-              {analysisDone
-                ? "Your call review is ready. Click below to see your results."
-                : "We’re reviewing your performance. This should only take a moment."}
-            </p>
-
-            {analysisDone ? (
-              <button
-                onClick={() => navigate('/call-analysis', { state: { callAnalysis } })}
-                className="button_primary w-full"
-              >
-                View Results
-              </button>
-            ) : (
-              <div className="flex justify-center">
-                <svg className="animate-spin h-6 w-6 text-blue-600" xmlns="http://www.w3.org/2000/svg" fill="none"
-                     viewBox="0 0 24 24">
-                  <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"/>
-                  <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4z"/>
-                </svg>
-              </div>
-            )}
-          </div>
-        </div>
-      )}
-
     </div>
   );
 }
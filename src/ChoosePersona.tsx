@@ -39,6 +39,28 @@ function ChoosePersona() {
     };
   }, []);
 
+  const startCall = async (persona: any) => {
+    if (!persona.custom) {
+      navigate('/call', { state: { persona } });
+      return;
+    }
+
+    // "Create Your Own": the server validates and compiles the scenario into a persona
+    const scenario = window.prompt("Describe your customer's scenario and behavior:");
+    if (!scenario) return;
+    try {
+      const res = await fetch('http://localhost:7860/api/personas/custom', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ title: 'Custom Customer', scenario }),
+      });
+      if (!res.ok) throw new Error(`Error: ${res.statusText}`);
+      navigate('/call', { state: { persona: await res.json() } });
+    } catch (err: any) {
+      alert(`Could not create that customer. Please add a little more detail. (${err.message})`);
+    }
+  };
+
   return (
           <div className="w-full text-center pt-8">
             <div className="mb-12">
@@ -71,7 +93,7 @@ function ChoosePersona() {
                       <h2 className="typography_h2 mb-2">{persona.title}</h2>
                       <p className="typography_body flex-grow">{persona.desc}</p>
                       <button
-                        onClick={() => navigate('/call', { state: { persona } })}
+                        onClick={() => void startCall(persona)}
                         className="button_primary mt-6 w-full flex items-center justify-center gap-2">
                         <PhoneIcon className="h-5 w-5 text-white" />
                         <span>Start Call</span>
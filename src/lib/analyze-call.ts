@@ -1,68 +1,116 @@
-async function runAnalysis(endpoint: string, transcript: string) {
+const RUBRICS = [
+  'compliance',
+  'overall_score',
+  'customer_satisfaction',
+  'script_adherence',
+  'hesitation',
+];
+
+const API_URL = 'http://localhost:7860/api';
+
+export type CallAnalysis = Record<string, any> & {
+  feedback: {category: string, feedback: string}[];
+  duration: number;
+  // False until the server's summary event has arrived
+  complete: boolean;
+};
+
+// Scores every rubric and the feedback in one request to /api/analyze. With a
+// session id the server uses its own copy of the call, usually already scored.
+async function runAnalysis(transcript: string, rubrics: string[], sessionId?: string) {
   try {
-    const response = await fetch(`http://localhost:7860/api/${endpoint}`, {
+    const response = await fetch(`${API_URL}/analyze`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json'
       },
-      body: JSON.stringify({
-        transcript,
-      })
+      body: JSON.stringify(sessionId ? {session_id: sessionId, rubrics} : {transcript, rubrics})
     });
 
     if (!response.ok) throw new Error('Failed to analyze call');
 
-    const score =  await response.text();
-
-    return { name: endpoint, score };
+    return await response.json();
   } catch (error) {
     console.error('Analysis error:', error);
     return null;
   }
 }
 
-async function getComplianceAnalysis(transcript: string[]) {
-  return runAnalysis('compliance', transcript.join("\n"));
-}
-
-async function getOverallScore(transcript: string[]) {
-  return runAnalysis('overall_score', transcript.join("\n"));
-}
+// The same analysis of a captured call from /api/analyze/stream: a "score" or
+// "feedback" event arrives for each result as soon as the server has it (an
+// "error" for one that failed), then a "summary". Returns the summary, or null
+// if the stream couldn't be read.
+async function streamAnalysis(
+  sessionId: string,
+  rubrics: string[],
+  onEvent: (event: string, data: any) => void
+) {
+  const params = new URLSearchParams({session_id: sessionId});
+  rubrics.forEach((name) => params.append('rubrics', name));
 
-async function getCustomerSatisfaction(transcript: string[]) {
-  return runAnalysis('customer_satisfaction', transcript.join("\n"));
-}
+  try {
+    const response = await fetch(`${API_URL}/analyze/stream?${params}`);
+    if (!response.ok || !response.body) throw new Error('Failed to stream analysis');
 
-async function getScriptAdherence(transcript: string[]) {
-  return runAnalysis('script_adherence', transcript.join("\n"));
-}
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const {value, done} = await reader.read();
+      if (done) return null;
+      buffer += value;
 
-async function getHesitation(transcript: string[]) {
-  return runAnalysis('hesitation', transcript.join("\n"));
-}
+      let end;
+      while ((end = buffer.indexOf('\n\n')) >= 0) {
+        const block = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const data = block.match(/^data: (.*)$/m)?.[1];
+        if (!event || data === undefined) continue;
 
-async function getFeedback(transcript: string[]) {
-  return runAnalysis('feedback', transcript.join("\n"));
+        const parsed = JSON.parse(data);
+        if (event === 'summary') return parsed;
+        onEvent(event, parsed);
+      }
+    }
+  } catch (error) {
+    console.error('Analysis stream error:', error);
+    return null;
+  }
 }
 
-export async function analyzeCall(transcript: string[], duration: number) {
-  const results = await Promise.all([
-    getComplianceAnalysis(transcript),
-    getCustomerSatisfaction(transcript),
-    getOverallScore(transcript),
-    getScriptAdherence(transcript),
-    getHesitation(transcript),
-  ]);
-
-  const feedback = await getFeedback(transcript)
+// Every score comes from the server. With a session id the analysis is
+// streamed, and the rubrics tracked live during the call (see rubric-progress
+// messages) have already been settled there at hang-up, so they arrive first.
+// onUpdate gets the analysis so far each time another score or feedback item
+// comes in. A bare transcript is too long for a query string, so it's posted.
+export async function analyzeCall(
+  transcript: string[],
+  duration: number,
+  sessionId?: string,
+  onUpdate?: (analysis: CallAnalysis) => void
+): Promise<CallAnalysis> {
+  const rubrics = [...RUBRICS, 'feedback'];
+  let partial: CallAnalysis = {feedback: [], duration, complete: false};
+  onUpdate?.(partial);
 
-  const scores = Object.fromEntries(
-    results.map(r => [r!.name, r!.score])
-  );
+  const streamed = sessionId ? await streamAnalysis(sessionId, rubrics, (event, data) => {
+    if (event === 'score') {
+      partial = {...partial, [data.rubric]: data.score};
+      if (data.items) partial.compliance_items = data.items;
+    } else if (event === 'feedback') {
+      partial = {...partial, feedback: [...partial.feedback, data]};
+    }
+    onUpdate?.(partial);
+  }) : null;
+  const result = streamed ?? await runAnalysis(transcript.join("\n"), rubrics, sessionId);
 
-  return {
-    ...scores,
-    feedback: JSON.parse(feedback!.score),
-    duration
+  const analysis = {
+    ...partial,
+    ...result,
+    feedback: result?.feedback ?? partial.feedback,
+    duration,
+    complete: true
   };
+  onUpdate?.(analysis);
+  return analysis;
 }
@@ -1,15 +1,33 @@
 import {PipecatClient} from "@pipecat-ai/client-js";
 import {SmallWebRTCTransport} from "@pipecat-ai/small-webrtc-transport";
 
+export type RubricProgress = {
+  compliance: number;
+  script_adherence: number;
+  covered: Record<string, string[]>;
+};
+
+// Stable per-browser id so the server can keep each agent's call history
+function agentId() {
+  let id = localStorage.getItem('ascend-agent-id');
+  if (!id) {
+    id = crypto.randomUUID();
+    localStorage.setItem('ascend-agent-id', id);
+  }
+  return id;
+}
+
 export function createClient(
   persona: { id: string } ,
   onTranscript: (text: string) => void,
   onAudio: (track: MediaStreamTrack) => void,
   onBotReady: () => void,
-  onSentimentAnalysis: (score: number) => void
+  onSentimentAnalysis: (score: number) => void,
+  onRubricProgress: (progress: RubricProgress) => void,
+  onSession: (sessionId: string) => void = () => {}
 ) {
   const transport = new SmallWebRTCTransport({
-    connectionUrl: `http://localhost:7860/api/offer?persona=${persona.id}`,
+    connectionUrl: `http://localhost:7860/api/offer?persona=${persona.id}&agent=${agentId()}`,
     audioCodec: 'default'
   });
 
@@ -42,6 +60,14 @@ export function createClient(
         if (data.type === 'sentiment-analysis') {
           onSentimentAnalysis(data.sentiment);
         }
+
+        if (data.type === 'rubric-progress') {
+          onRubricProgress(data);
+        }
+
+        if (data.type === 'session') {
+          onSession(data.session_id);
+        }
       },
       onError: (err) => console.error("Client error:", err),
     },
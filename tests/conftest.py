@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Run against the top-level modules, with anything they persist kept out of data/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ASCEND_DATA_DIR", tempfile.mkdtemp(prefix="ascend-tests-"))
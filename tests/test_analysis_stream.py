@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import analysis
+import server
+
+
+class FakeEngine:
+    """Answers the first rubric, then the stream breaks."""
+
+    async def analyze_stream(self, transcript, rubrics, with_feedback):
+        yield "score", {"rubric": rubrics[0], "score": 80}
+        raise RuntimeError("connection reset")
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+def test_one_failure_keeps_the_other_results_and_the_summary(monkeypatch):
+    async def score_compliance(transcript):
+        return {"score": 90, "items": {}}
+
+    monkeypatch.setattr(analysis, "get_engine", lambda: FakeEngine())
+    monkeypatch.setattr(analysis, "score_compliance", score_compliance)
+    selected = ["compliance", "overall_score", "hesitation"]
+    events = asyncio.run(_collect(analysis.stream_analysis("Agent: Hi", selected)))
+
+    kind, summary = events[-1]
+    assert kind == "summary"
+    assert summary == {"compliance": 90, "compliance_items": {}, "overall_score": 80}
+    assert ("error", {"rubric": "hesitation", "error": "RuntimeError: connection reset"}) in events
+
+
+def test_a_failed_compliance_check_is_reported(monkeypatch):
+    async def score_compliance(transcript):
+        raise ValueError("bad pattern")
+
+    monkeypatch.setattr(analysis, "score_compliance", score_compliance)
+    events = asyncio.run(_collect(analysis.stream_analysis("Agent: Hi", ["compliance"])))
+    assert events == [("error", {"rubric": "compliance", "error": "ValueError: bad pattern"}), ("summary", {})]
+
+
+def test_sse_sends_only_the_selected_results():
+    async def events():
+        yield "score", {"rubric": "compliance", "score": 90, "items": {}}
+        yield "score", {"rubric": "hesitation", "score": 70}
+        yield "error", {"rubric": "overall_score", "error": "RuntimeError"}
+        yield "feedback", {"category": "call_quality", "feedback": "Slow down."}
+        yield "summary", {"compliance": 90, "compliance_items": {}, "hesitation": 70,
+                          "feedback": [{"category": "call_quality", "feedback": "Slow down."}]}
+
+    lines = asyncio.run(_collect(server._sse(events(), ["hesitation", "feedback"])))
+    sent = [(line.split("\n")[0], json.loads(line.split("\n")[1][len("data: "):])) for line in lines]
+    assert [kind for kind, _ in sent] == ["event: score", "event: feedback", "event: summary"]
+    assert sent[0][1]["rubric"] == "hesitation"
+    assert set(sent[-1][1]) == {"hesitation", "feedback"}
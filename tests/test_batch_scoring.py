@@ -0,0 +1,63 @@
+import asyncio
+
+import batch_scoring
+from batch_scoring import BatchRunner, BatchStore
+from evaluators import EvaluationError
+
+
+def _run_job(tmp_path, monkeypatch, analyze):
+    monkeypatch.setattr(batch_scoring, "analyze_transcript", analyze)
+    monkeypatch.setattr(batch_scoring, "BATCH_BACKOFF_SECS", 0)
+
+    async def scenario():
+        runner = BatchRunner(BatchStore(str(tmp_path / "batch.sqlite3")), workers=2)
+        runner.start()
+        job_id = await runner.submit([{"id": "a", "transcript": "Agent: hi"}, {"id": "b", "transcript": "Agent: bye"}],
+                                     None)
+        try:
+            return await asyncio.wait_for(_collect(runner.stream(job_id)), 5)
+        finally:
+            await runner.stop()
+
+    return asyncio.run(scenario())
+
+
+async def _collect(stream):
+    return [line async for line in stream]
+
+
+def test_items_are_scored(tmp_path, monkeypatch):
+    async def analyze(transcript, rubrics, strict):
+        return {"overall_score": 80}
+
+    lines = _run_job(tmp_path, monkeypatch, analyze)
+    assert sorted(line["status"] for line in lines[:-1]) == ["done", "done"]
+    assert lines[-1]["type"] == "summary"
+
+
+def test_unusable_answers_are_retried(tmp_path, monkeypatch):
+    calls = []
+
+    async def analyze(transcript, rubrics, strict):
+        calls.append(transcript)
+        if len(calls) <= 2:
+            raise EvaluationError("unusable")
+        return {"overall_score": 80}
+
+    lines = _run_job(tmp_path, monkeypatch, analyze)
+    assert all(line["status"] == "done" for line in lines[:-1])
+    assert len(calls) == 4
+
+
+def test_crashing_items_fail_instead_of_hanging_the_stream(tmp_path, monkeypatch):
+    async def analyze(transcript, rubrics, strict):
+        if transcript == "Agent: hi":
+            raise KeyError("overall_score")
+        return {"overall_score": 80}
+
+    lines = _run_job(tmp_path, monkeypatch, analyze)
+    results = {line["id"]: line for line in lines[:-1]}
+    assert results["a"]["status"] == "failed"
+    assert "KeyError" in results["a"]["error"]
+    assert results["b"]["status"] == "done"
+    assert lines[-1]["type"] == "summary"
@@ -0,0 +1,70 @@
+from compliance import agent_turns, match_compliance
+
+PITCH = (
+    "Agent: Hi, my name is Alex and I help people compare electricity plans in Texas. "
+    "Our plans come with a lights-out guarantee. Your rate sits between the city average "
+    "and the state average, whether you rent or own.\n"
+    "Customer: Okay."
+)
+
+INTERVIEW = """Agent: Thank you for calling SaveOnEnergy, who do I have the pleasure of speaking with?
+Customer: This is Maria.
+Agent: Can I get your first and last name, please?
+Customer: Maria Lopez.
+Agent: What is the street address and zip code where you need service?
+Customer: 12 Oak Street, 77002.
+Agent: And just to confirm, that's the city and state listed there?
+Customer: Yes.
+Agent: Do you rent or own the home?
+Customer: I rent.
+Agent: Is the electricity currently in your name at this address?
+Customer: Yes.
+Agent: Are the lights on at the property right now?
+Customer: They are."""
+
+
+def statuses(transcript):
+    return {item: v["status"] for item, v in match_compliance(agent_turns(transcript))["items"].items()}
+
+
+def test_keywords_in_a_pitch_are_not_hits():
+    result = match_compliance(agent_turns(PITCH))
+    assert not [item for item, v in result["items"].items() if v["status"] == "hit"]
+    assert result["score"] == 1
+
+
+def test_keywords_in_a_pitch_are_left_to_the_llm():
+    found = statuses(PITCH)
+    for item in ("full_name", "city_state", "rent_or_own", "electricity_in_name", "lights_on"):
+        assert found[item] == "ambiguous"
+    assert found["address_zip"] == "miss"
+
+
+def test_electricity_in_your_name_is_not_asking_for_the_name():
+    found = statuses("Agent: Is the electricity in your name?\nCustomer: Yes.")
+    assert found["full_name"] != "hit"
+    assert found["electricity_in_name"] == "hit"
+
+
+def test_agent_introducing_themselves_is_not_asking_for_the_name():
+    assert statuses("Agent: My name is Jordan and I'll be helping you today.\nCustomer: Hi.")["full_name"] != "hit"
+
+
+def test_asked_questions_are_hits():
+    result = match_compliance(agent_turns(INTERVIEW))
+    assert all(v["status"] == "hit" for v in result["items"].values())
+    assert result["score"] == 100
+
+
+def test_requests_without_a_question_mark_are_hits():
+    found = statuses("Agent: Okay, let me get your full name. Please confirm your zip code and street address.")
+    assert found["full_name"] == "hit"
+    assert found["address_zip"] == "hit"
+
+
+def test_transcription_slips_are_ambiguous():
+    assert statuses("Agent: What's the adress and zipcode there?")["address_zip"] == "ambiguous"
+
+
+def test_unlabelled_transcripts_use_every_line():
+    assert agent_turns("What's your name?\nIt's Sam.") == ["What's your name?", "It's Sam."]
@@ -0,0 +1,70 @@
+import asyncio
+
+import compliance
+from score_cache import ScoreCache, cache_key
+
+PITCH = "Agent: Our plans come with a lights-out guarantee.\nCustomer: Okay."
+
+
+class FakeEngine:
+    """Just enough of ``EvaluatorEngine`` for ``score_compliance``."""
+
+    def __init__(self, covered):
+        self.cache = ScoreCache(path=None)
+        self.covered = covered
+        self.checks = 0
+
+    async def cached(self, transcript, name, prompt):
+        key = cache_key(transcript, name, prompt, "test-model")
+        return key, await self.cache.get(key)
+
+    async def store(self, key, value):
+        await self.cache.set(key, value)
+
+    async def check_items(self, items, turns, previous=""):
+        self.checks += 1
+        await asyncio.sleep(0.01)
+        return None if self.covered is None else [k for k in items if k in self.covered]
+
+
+def test_repeat_requests_are_served_from_the_cache(monkeypatch):
+    engine = FakeEngine(covered=["lights_on"])
+    monkeypatch.setattr(compliance, "get_engine", lambda: engine)
+
+    async def scenario():
+        first = await compliance.score_compliance(PITCH)
+        second = await compliance.score_compliance(PITCH)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second
+    assert first["items"]["lights_on"]["status"] == "hit"
+    assert engine.checks == 1
+
+
+def test_concurrent_requests_share_one_check(monkeypatch):
+    engine = FakeEngine(covered=[])
+    monkeypatch.setattr(compliance, "get_engine", lambda: engine)
+
+    async def scenario():
+        return await asyncio.gather(*(compliance.score_compliance(PITCH) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert all(result == results[0] for result in results)
+    assert engine.checks == 1
+
+
+def test_fallback_scores_are_not_cached(monkeypatch):
+    engine = FakeEngine(covered=None)
+    monkeypatch.setattr(compliance, "get_engine", lambda: engine)
+
+    async def scenario():
+        await compliance.score_compliance(PITCH)
+        return await compliance.score_compliance(PITCH)
+
+    result = asyncio.run(scenario())
+    assert engine.checks == 2
+    # Scored on the items the matcher decided, all misses here
+    assert result["items"]["lights_on"]["status"] == "ambiguous"
+    assert result["score"] == 1
+    assert result["fallback"] is True
@@ -0,0 +1,93 @@
+import asyncio
+
+import context_window
+from context_window import ContextWindowProcessor
+
+SYSTEM = {"role": "system", "content": "You are a customer."}
+
+
+class FakeContext:
+    def __init__(self, messages):
+        self.messages = messages
+
+    def get_messages(self):
+        return self.messages
+
+    def set_messages(self, messages):
+        self.messages = messages
+
+
+class FakeEngine:
+    def __init__(self, summary="They talked about rates."):
+        self.summary = summary
+        self.folded = []
+
+    async def summarize(self, previous, lines):
+        self.folded.append(lines)
+        return self.summary
+
+
+def _conversation(turns):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"} for i in range(turns)]
+
+
+def _processor(monkeypatch, engine, **kwargs):
+    monkeypatch.setattr(context_window, "get_engine", lambda: engine)
+    processor = ContextWindowProcessor(**kwargs)
+    processor.create_task = asyncio.create_task
+    return processor
+
+
+def test_old_messages_are_folded_into_a_summary(monkeypatch):
+    engine = FakeEngine()
+    conversation = _conversation(10)
+    context = FakeContext([SYSTEM, *conversation])
+
+    async def scenario():
+        processor = _processor(monkeypatch, engine, keep_messages=4, fold_batch=4, token_budget=10_000)
+        processor._trim(context)
+        # Still verbatim until the summary is ready
+        assert context.messages == [SYSTEM, *conversation]
+        await processor._folding
+        processor._trim(context)
+        return processor.stats
+
+    stats = asyncio.run(scenario())
+    assert engine.folded == [["Agent: message 0", "Customer: message 1", "Agent: message 2",
+                              "Customer: message 3", "Agent: message 4", "Customer: message 5"]]
+    assert context.messages[0] is SYSTEM
+    assert "They talked about rates." in context.messages[1]["content"]
+    assert context.messages[2:] == conversation[6:]
+    assert stats["folded"] == 6
+
+
+def test_a_failed_summary_keeps_every_message(monkeypatch):
+    context = FakeContext([SYSTEM, *_conversation(10)])
+
+    async def scenario():
+        processor = _processor(monkeypatch, FakeEngine(summary=None), keep_messages=4, fold_batch=4,
+                               token_budget=10_000)
+        processor._trim(context)
+        await processor._folding
+        # Tried again on the next turn
+        processor._trim(context)
+        await processor._folding
+        return processor.stats
+
+    stats = asyncio.run(scenario())
+    assert len(context.messages) == 11
+    assert stats["summary_failures"] == 2
+
+
+def test_the_token_budget_drops_the_oldest_messages(monkeypatch):
+    conversation = [{"role": "user", "content": "x" * 400} for _ in range(5)]
+    context = FakeContext([SYSTEM, *conversation])
+
+    async def scenario():
+        processor = _processor(monkeypatch, FakeEngine(), keep_messages=12, fold_batch=8, token_budget=250)
+        processor._trim(context)
+        return processor.stats
+
+    stats = asyncio.run(scenario())
+    assert context.messages == [SYSTEM, *conversation[3:]]
+    assert stats["dropped_over_budget"] == 3
@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from dispatcher import Dispatcher
+from sessions import SessionDirectory
+from transcripts import TranscriptStore
+
+WORKERS = {"0": "http://worker-0", "1": "http://worker-1"}
+
+
+def _client(tmp_path, down=()):
+    """A dispatcher in front of two fake workers; those in ``down`` refuse connections."""
+    directory = SessionDirectory(str(tmp_path / "sessions.sqlite3"))
+    calls = TranscriptStore(str(tmp_path / "transcripts.sqlite3"))
+    calls.start_call("call-1", "budget_customer", worker="1")
+    dispatcher = Dispatcher(WORKERS, directory, calls)
+    calls = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        worker = request.url.host.rsplit("-", 1)[1]
+        calls.append((worker, request.url.path))
+        if worker in down:
+            raise httpx.ConnectError("Connection refused", request=request)
+        return httpx.Response(200, json={"worker": worker})
+
+    dispatcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+    app = FastAPI()
+
+    @app.post("/api/offer")
+    async def offer(request: Request):
+        return await dispatcher.offer(request)
+
+    @app.get("/api/analyze/stream")
+    async def analyze_stream(request: Request):
+        return await dispatcher.stream(request, "api/analyze/stream")
+
+    @app.get("/api/sessions/{pc_id}/latency")
+    async def session_latency(request: Request, pc_id: str):
+        return await dispatcher.session_route(request, f"api/sessions/{pc_id}/latency", pc_id)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def proxy(request: Request, path: str):
+        return await dispatcher.proxy(request, path)
+
+    return TestClient(app), dispatcher, directory, calls
+
+
+def test_malformed_offer_is_a_bad_request(tmp_path):
+    client, _, _, calls = _client(tmp_path)
+    assert client.post("/api/offer", content=b"{not json").status_code == 400
+    assert client.post("/api/offer", json=["sdp"]).status_code == 400
+    assert calls == []
+
+
+def test_session_of_a_dead_worker_falls_through(tmp_path):
+    client, dispatcher, directory, _ = _client(tmp_path, down={"0"})
+    directory.register("pc-1", "0")
+    response = client.get("/api/sessions/pc-1/latency")
+    assert response.status_code == 200
+    assert response.json() == {"worker": "1"}
+    assert dispatcher._stats["worker_errors"] >= 1
+
+
+def test_renegotiation_with_a_dead_owner_starts_a_new_call(tmp_path):
+    client, dispatcher, directory, _ = _client(tmp_path, down={"0"})
+    directory.register("pc-1", "0")
+    response = client.post("/api/offer", json={"pc_id": "pc-1", "sdp": "", "type": "offer"})
+    assert response.json() == {"worker": "1"}
+    assert dispatcher._stats["renegotiations"] == 0
+    assert dispatcher._stats["offers"] == 1
+
+
+def test_call_requests_go_to_the_worker_that_ran_the_call(tmp_path):
+    client, _, _, calls = _client(tmp_path)
+    for _ in range(3):
+        assert client.get("/api/analyze/stream", params={"session_id": "call-1"}).json() == {"worker": "1"}
+        assert client.post("/api/analyze", json={"session_id": "call-1"}).json() == {"worker": "1"}
+        assert client.post("/api/compliance", json={"session_id": "call-1"}).json() == {"worker": "1"}
+    # Transcripts sent in full, and unknown calls, are spread round-robin
+    assert {client.post("/api/analyze", json={"transcript": "Agent: Hi"}).json()["worker"] for _ in range(2)} \
+        == {"0", "1"}
+    assert {client.post("/api/analyze", json={"session_id": "nope"}).json()["worker"] for _ in range(2)} \
+        == {"0", "1"}
+
+
+def test_call_requests_fall_back_when_the_owner_is_unreachable(tmp_path):
+    client, _, _, _ = _client(tmp_path, down={"1"})
+    assert client.post("/api/analyze", json={"session_id": "call-1"}).json() == {"worker": "0"}
+
+
+def test_exited_workers_are_dropped_and_restarted(tmp_path, monkeypatch):
+    _, dispatcher, directory, calls = _client(tmp_path)
+    directory.register("pc-1", "0")
+    directory.register("pc-2", "0")
+    monkeypatch.setattr("dispatcher.WORKER_CHECK_SECS", 0.01)
+
+    class Process:
+        def __init__(self, returncode=None):
+            self.returncode = returncode
+
+        def poll(self):
+            return self.returncode
+
+    processes = {"0": Process(returncode=1), "1": Process()}
+    spawned = []
+
+    def spawn(worker):
+        spawned.append(worker)
+        # Nothing is routed to a worker while it restarts
+        assert dispatcher._live() == ["1"]
+        assert directory.counts() == {}
+        return Process()
+
+    async def supervise_briefly():
+        supervisor = asyncio.create_task(dispatcher.supervise(processes, spawn))
+        await asyncio.sleep(0.2)
+        supervisor.cancel()
+
+    asyncio.run(supervise_briefly())
+    assert spawned == ["0"]
+    assert dispatcher._stats["restarts"] == 1
+    assert dispatcher._live() == ["0", "1"]
+    assert ("0", "/api/sessions") in calls
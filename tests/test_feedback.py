@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage
+
+import evaluators
+from score_cache import ScoreCache
+
+FULL = [{"category": c, "feedback": f"Work on {c}."} for c in evaluators.FEEDBACK_CATEGORIES]
+
+
+class _Chain:
+    def __init__(self, content):
+        self.content = content
+
+    async def ainvoke(self, _):
+        return AIMessage(content=self.content)
+
+
+def _feedback(monkeypatch, content):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    engine = evaluators.EvaluatorEngine(cache=ScoreCache(path=None))
+    engine._feedback_chain = _Chain(content)
+
+    async def scenario():
+        result = await engine.feedback("Agent: Hello.")
+        return result, engine.cache_stats()["writes"]
+
+    return asyncio.run(scenario())
+
+
+def test_default_feedback_covers_every_category():
+    assert [item["category"] for item in evaluators.DEFAULT_FEEDBACK] == evaluators.FEEDBACK_CATEGORIES
+
+
+def test_complete_feedback_is_cached(monkeypatch):
+    result, writes = _feedback(monkeypatch, json.dumps(FULL))
+    assert result == FULL
+    assert writes == 1
+
+
+def test_wrong_shapes_fall_back_uncached(monkeypatch):
+    for content in ('{"feedback": "Be nicer."}', '"Be nicer."', '[1, 2, 3]', "not json"):
+        result, writes = _feedback(monkeypatch, content)
+        assert result == evaluators.DEFAULT_FEEDBACK_TEXT.strip()
+        assert writes == 0
+
+
+def test_feedback_covering_every_category_is_cached(monkeypatch):
+    # The prompt asks for five items across the four categories
+    answer = FULL + [{"category": "call_quality", "feedback": "Stay on topic."}]
+    result, writes = _feedback(monkeypatch, json.dumps(answer))
+    assert result == answer
+    assert writes == 1
+
+
+def test_short_feedback_is_used_but_not_cached(monkeypatch):
+    result, writes = _feedback(monkeypatch, json.dumps(FULL[:2] + [{"category": "call_quality"}]))
+    assert result == FULL[:2]
+    assert writes == 0
+
+
+def test_single_quoted_answers_keep_their_apostrophes(monkeypatch):
+    content = repr([{**item, "feedback": "Confirm the customer's address."} for item in FULL])
+    result, writes = _feedback(monkeypatch, content)
+    assert [item["feedback"] for item in result] == ["Confirm the customer's address."] * len(FULL)
+    assert writes == 1
@@ -0,0 +1,72 @@
+import asyncio
+
+from pipecat.frames.frames import (
+    BotStartedSpeakingFrame,
+    InputAudioRawFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+    VADUserStartedSpeakingFrame,
+    VADUserStoppedSpeakingFrame,
+)
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+import latency
+from latency import LatencyObserver
+
+CHUNK_NS = 20_000_000
+
+
+class _Pipeline:
+    """Pushes frames to an observer with their push times, 20 ms of audio apart."""
+
+    def __init__(self, observer):
+        self.observer = observer
+        self.now = 0
+
+    def push(self, frame):
+        asyncio.run(self.observer.on_push_frame(FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, self.now)))
+
+    def audio(self, chunks: int):
+        for _ in range(chunks):
+            self.now += CHUNK_NS
+            self.push(InputAudioRawFrame(audio=b"\x00\x00" * 320, sample_rate=16000, num_channels=1))
+
+
+def test_vad_end_runs_from_the_last_speech_frame():
+    pipeline = _Pipeline(LatencyObserver("latency-test", 0.2))
+    pipeline.push(VADUserStartedSpeakingFrame())
+    pipeline.push(UserStartedSpeakingFrame())
+    pipeline.audio(50)
+    speech_at = pipeline.now
+    # VAD stops a frame short of its 0.2 s, then the turn analyzer waits another 0.5 s
+    pipeline.audio(9)
+    pipeline.push(VADUserStoppedSpeakingFrame())
+    pipeline.audio(26)
+    pipeline.push(UserStoppedSpeakingFrame())
+    pipeline.push(BotStartedSpeakingFrame())
+
+    [turn] = pipeline.observer.turns
+    assert turn["vad_end"] == round((pipeline.now - speech_at) / 1e9, 4) == 0.7
+
+
+def test_speech_after_a_vad_stop_starts_the_measurement_again():
+    pipeline = _Pipeline(LatencyObserver("latency-test", 0.2))
+    pipeline.push(UserStartedSpeakingFrame())
+    pipeline.audio(20)
+    pipeline.push(VADUserStoppedSpeakingFrame())
+    pipeline.push(VADUserStartedSpeakingFrame())
+    pipeline.audio(5)
+    pipeline.push(UserStoppedSpeakingFrame())
+    pipeline.push(BotStartedSpeakingFrame())
+    # No VAD stop since the agent carried on, so the stop time is all there is
+    assert pipeline.observer.turns[0]["vad_end"] == 0.2
+
+
+def test_seen_frame_ids_stay_bounded():
+    pipeline = _Pipeline(LatencyObserver("latency-test", 0.2))
+    for _ in range(latency._SEEN_FRAMES * 4):
+        pipeline.push(UserStartedSpeakingFrame())
+    pipeline.audio(latency._AUDIO_FRAMES * 2)
+    assert len(pipeline.observer._seen) == latency._SEEN_FRAMES
+    assert len(pipeline.observer._audio) == latency._AUDIO_FRAMES
@@ -0,0 +1,179 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+from pipecat.services.openai.llm import OpenAILLMService
+
+import evaluators
+import llm_scheduler
+import speculation
+from llm_scheduler import BATCH, IN_CALL, LIVE, POST_CALL, LLMScheduler, llm_priority, parse_limits
+
+
+def test_parse_limits():
+    assert parse_limits("gpt-4o=5000:450000, mini=10:2000,") == {"gpt-4o": (5000.0, 450000.0), "mini": (10.0, 2000.0)}
+
+
+def test_waiting_requests_are_granted_highest_priority_first(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "PRIORITY_HEADROOM", dict.fromkeys(llm_scheduler.PRIORITIES, 0.0))
+    # One request every 10ms once the bucket is empty
+    scheduler = LLMScheduler({"m": (6000, 10_000_000)})
+    scheduler._models["m"].requests.level = 0
+    granted = []
+
+    async def request(priority):
+        await scheduler.acquire("m", 10, priority)
+        granted.append(priority)
+
+    async def scenario():
+        await asyncio.gather(*(request(p) for p in (BATCH, POST_CALL, BATCH, IN_CALL, LIVE)))
+
+    asyncio.run(scenario())
+    assert granted == [LIVE, IN_CALL, POST_CALL, BATCH, BATCH]
+    assert scheduler.stats()["priorities"][BATCH]["queued"] == 2
+
+
+def test_lower_classes_leave_headroom():
+    scheduler = LLMScheduler({"m": (600, 100_000)})
+    budget = scheduler._models["m"]
+    # A fifth of the token budget left: enough for live and in-call work only
+    budget.tokens.level = 20_000
+    assert budget.wait_secs(1000, LIVE) == 0
+    assert budget.wait_secs(1000, IN_CALL) == 0
+    assert budget.wait_secs(1000, POST_CALL) > 0
+    assert budget.wait_secs(1000, BATCH) > budget.wait_secs(1000, POST_CALL)
+
+
+def test_live_requests_skip_the_queue_while_batch_waits():
+    scheduler = LLMScheduler({"m": (600, 100_000)})
+    scheduler._models["m"].tokens.level = 20_000
+
+    async def scenario():
+        batch = asyncio.create_task(scheduler.acquire("m", 1000, BATCH))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(scheduler.acquire("m", 1000, LIVE), 0.5)
+        assert not batch.done()
+        batch.cancel()
+        await asyncio.gather(batch, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert scheduler.stats()["models"]["m"]["waiting"][BATCH] == 0
+
+
+def test_settle_refunds_the_estimate():
+    scheduler = LLMScheduler({"m": (600, 100_000)})
+
+    async def scenario():
+        slot = await scheduler.acquire("m", 5000, LIVE)
+        level = scheduler._models["m"].tokens.level
+        slot.settle(1200)
+        return scheduler._models["m"].tokens.level - level
+
+    assert round(asyncio.run(scenario())) == 3800
+
+
+def test_priority_comes_from_the_context():
+    scheduler = LLMScheduler({})
+
+    async def scenario():
+        with llm_priority(BATCH):
+            await scheduler.acquire("unlimited", 100)
+        await scheduler.acquire("unlimited", 100)
+
+    asyncio.run(scenario())
+    stats = scheduler.stats()["priorities"]
+    assert stats[BATCH]["requests"] == 1
+    assert stats[POST_CALL]["requests"] == 1
+
+
+class _Chain:
+    """Stands in for a prompt | model chain; the answer reports 300 tokens used."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def ainvoke(self, _):
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return AIMessage(content="{}", usage_metadata={"input_tokens": 200, "output_tokens": 100, "total_tokens": 300})
+
+    async def astream(self, _):
+        yield AIMessageChunk(content="{}")
+        yield AIMessageChunk(content="", usage_metadata={"input_tokens": 200, "output_tokens": 100,
+                                                         "total_tokens": 300})
+
+
+def _engine(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    scheduler = LLMScheduler({evaluators.SCORING_MODEL: (600, 100_000)})
+    monkeypatch.setattr(evaluators, "get_llm_scheduler", lambda: scheduler)
+    return evaluators.EvaluatorEngine(), scheduler._models[evaluators.SCORING_MODEL].tokens
+
+
+def test_runs_are_charged_what_they_used(monkeypatch):
+    engine, tokens = _engine(monkeypatch)
+
+    async def scenario():
+        await engine._run(_Chain(), "x" * 4000)
+        return tokens.level
+
+    assert round(asyncio.run(scenario())) == 100_000 - 300
+
+
+def test_streams_are_charged_what_they_used(monkeypatch):
+    engine, tokens = _engine(monkeypatch)
+
+    async def scenario():
+        async for _ in engine._stream(_Chain(), "x" * 4000):
+            pass
+        return tokens.level
+
+    assert round(asyncio.run(scenario())) == 100_000 - 300
+
+
+def test_failed_runs_keep_the_estimate(monkeypatch):
+    engine, tokens = _engine(monkeypatch)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await engine._run(_Chain(fail=True), "x" * 4000)
+        return tokens.level
+
+    assert round(asyncio.run(scenario())) == 100_000 - llm_scheduler.request_tokens("x" * 4000)
+
+
+class _Completions:
+    """Stands in for an OpenAI completion stream whose last chunk reports 300 tokens used."""
+
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        yield SimpleNamespace(choices=[SimpleNamespace()], usage=None)
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=300))
+
+    async def close(self):
+        self.closed = True
+
+
+def test_live_replies_are_charged_what_they_used(monkeypatch):
+    scheduler = LLMScheduler({"m": (600, 100_000)})
+    monkeypatch.setattr(speculation, "get_llm_scheduler", lambda: scheduler)
+    completions = _Completions()
+
+    async def get_chat_completions(self, context, messages):
+        return completions
+
+    monkeypatch.setattr(OpenAILLMService, "get_chat_completions", get_chat_completions)
+    llm = speculation.SpeculativeLLMService(model="m", api_key="test")
+
+    async def scenario():
+        stream = await llm.get_chat_completions(None, [{"role": "user", "content": "x" * 4000}])
+        async for _ in stream:
+            pass
+        await stream.close()
+        return scheduler._models["m"].tokens.level
+
+    assert round(asyncio.run(scenario())) == 100_000 - 300
+    assert completions.closed
@@ -0,0 +1,16 @@
+from personas.registry import PersonaSpec, compile_prompt, get_persona_registry
+
+
+def test_prompt_keeps_the_scenario_layout():
+    spec = PersonaSpec(id="test", title="Test", scenario="You are a test customer.\n\nSetting:\nYou want a plan.")
+    prompt = compile_prompt(spec)
+    intro, details, setting = prompt.strip().split("\n\n")
+    assert intro == "You are a test customer."
+    assert details.startswith("Customer Details:\n- Name: Casey Morgan\n")
+    assert setting == "Setting:\nYou want a plan."
+
+
+def test_bundled_prompts_are_only_the_persona():
+    for persona in get_persona_registry().personas():
+        assert persona.prompt.startswith("You are playing the role of")
+        assert f"- Name: {persona.spec.details.name}\n" in persona.prompt
@@ -0,0 +1,38 @@
+from rollups import ScoreRollups
+
+SCORES = {"compliance": 90, "overall_score": 80, "customer_satisfaction": 4, "script_adherence": 60,
+          "hesitation": 70, "compliance_items": {"disclosure": {"status": "hit"}, "consent": {"status": "miss"}}}
+
+
+def test_a_call_is_recorded_once_in_every_scope(tmp_path):
+    rollups = ScoreRollups(str(tmp_path / "rollups.sqlite3"))
+    assert rollups.record("call-1", "agent-1", "budget_customer", SCORES)
+    assert not rollups.record("call-1", "agent-1", "budget_customer", SCORES)
+
+    agent = rollups.summary("agent", "agent-1")
+    assert agent["calls"] == 1
+    assert agent["rubrics"]["customer_satisfaction"]["mean"] == 80
+    assert agent["compliance_items"] == {"disclosure": 1.0, "consent": 0.0}
+    assert rollups.summary("persona", "budget_customer")["calls"] == 1
+    assert rollups.summary("all", "*")["calls"] == 1
+
+
+def test_fallback_scores_are_left_out(tmp_path):
+    rollups = ScoreRollups(str(tmp_path / "rollups.sqlite3"))
+    assert rollups.record("call-1", "agent-1", "budget_customer", {**SCORES, "fallback": ["compliance", "customer_satisfaction"]})
+
+    rubrics = rollups.summary("agent", "agent-1")["rubrics"]
+    assert set(rubrics) == {"overall_score", "script_adherence", "hesitation"}
+    assert rollups.summary("agent", "agent-1")["compliance_items"] == {}
+
+
+def test_a_call_with_only_fallbacks_can_be_recorded_later(tmp_path):
+    rollups = ScoreRollups(str(tmp_path / "rollups.sqlite3"))
+    fallback = {**SCORES, "fallback": ["compliance", "overall_score", "customer_satisfaction",
+                                   "script_adherence", "hesitation"]}
+    assert not rollups.record("call-1", "agent-1", "budget_customer", fallback)
+    assert rollups.summary("agent", "agent-1") is None
+
+    # Rescoring the call gives real scores, which still count
+    assert rollups.record("call-1", "agent-1", "budget_customer", SCORES)
+    assert rollups.summary("agent", "agent-1")["calls"] == 1
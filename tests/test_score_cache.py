@@ -0,0 +1,73 @@
+import asyncio
+
+from score_cache import ScoreCache, cache_key
+
+
+def test_key_ignores_whitespace_but_not_the_prompt():
+    a = cache_key("Agent: hi\n\nCustomer:  hello ", "overall_score", "prompt", "gpt")
+    assert a == cache_key("Agent: hi\nCustomer: hello", "overall_score", "prompt", "gpt")
+    assert a != cache_key("Agent: hi\nCustomer: hello", "overall_score", "prompt v2", "gpt")
+
+
+def test_memory_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("score_cache.time.monotonic", lambda: now[0])
+    cache = ScoreCache(path=None, ttl=10)
+
+    async def scenario():
+        await cache.set("k", 42)
+        now[0] += 9
+        assert await cache.get("k") == 42
+        now[0] += 2
+        assert await cache.get("k") is None
+
+    asyncio.run(scenario())
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ScoreCache(path=None, max_entries=2)
+
+    async def scenario():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        assert await cache.get("a") == 1
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in "abc"]
+
+    assert asyncio.run(scenario()) == [1, None, 3]
+
+
+def test_disk_entries_outlive_memory(tmp_path):
+    path = str(tmp_path / "scores.sqlite3")
+
+    async def scenario():
+        first = ScoreCache(path=path)
+        await first.set("k", {"score": 70})
+        first.close()
+        second = ScoreCache(path=path)
+        try:
+            return await second.get("k"), second.stats()
+        finally:
+            second.close()
+
+    value, stats = asyncio.run(scenario())
+    assert value == {"score": 70}
+    assert stats["disk_hits"] == 1
+
+
+def test_disk_entries_expire(tmp_path, monkeypatch):
+    path = str(tmp_path / "scores.sqlite3")
+    now = [1_000_000.0]
+    monkeypatch.setattr("score_cache.time.time", lambda: now[0])
+
+    async def scenario():
+        cache = ScoreCache(path=path, ttl=0, disk_ttl=60)
+        await cache.set("k", 1)
+        now[0] += 61
+        try:
+            return await cache.get("k")
+        finally:
+            cache.close()
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,97 @@
+import asyncio
+
+from sentiment import SentimentScheduler, score_conversation, score_text
+
+
+def test_neutral_text_scores_the_middle():
+    assert score_text("I live in Houston.") == 50
+
+
+def test_negation_flips_valence():
+    assert score_text("That is good.") > 50
+    assert score_text("That is not good.") < 50
+    assert score_text("That is not bad.") > 50
+    assert score_text("So there are no hidden fees?") > 50
+
+
+def test_negation_reaches_past_degree_words():
+    assert score_text("That is not very good.") < score_text("That is not good.") < 50
+
+
+def test_negation_stops_at_the_end_of_a_clause():
+    assert score_text("No, that sounds good.") == score_text("That sounds good.")
+    assert score_text("No. That is great, thanks!") > 50
+    assert score_text("It is not cheap, great.") > score_text("It is not cheap great.")
+
+
+def test_but_shifts_the_weight_to_the_second_clause():
+    assert score_text("I appreciate the call, but the price is too high.") < 50
+    assert score_text("The price is high, but that makes sense.") > 50
+
+
+def test_customer_lines_outweigh_the_agent():
+    assert score_conversation(["Agent: That is terrible.", "Customer: Sounds good, thanks!"]) > 50
+
+
+def _scheduler(results, scores=None):
+    async def score(transcript):
+        await asyncio.sleep(0.01)
+        if scores is not None:
+            return scores.pop(0)
+        return len(transcript)
+
+    async def on_result(seq, score, context):
+        results.append((seq, score, context))
+
+    return SentimentScheduler(score, on_result)
+
+
+def test_turns_queued_behind_a_request_replace_each_other():
+    results = []
+
+    async def scenario():
+        scheduler = _scheduler(results)
+        scheduler.submit(0, "x", text="turn 0")
+        await asyncio.sleep(0)
+        for seq in range(1, 4):
+            scheduler.submit(seq, "x" * (seq + 1), text=f"turn {seq}")
+        await scheduler.worker
+        return scheduler.stats
+
+    stats = asyncio.run(scenario())
+    # The first turn was already in flight; of the rest only the newest was scored
+    assert results == [(0, 1, {"text": "turn 0"}), (3, 4, {"text": "turn 3"})]
+    assert stats["replaced"] == 2
+    assert stats["scored"] == 2
+
+
+def test_failed_requests_deliver_nothing():
+    results = []
+
+    async def scenario():
+        scheduler = _scheduler(results, scores=[None, 60])
+        scheduler.submit(0, "Agent: Hi")
+        await asyncio.sleep(0)
+        scheduler.submit(1, "Agent: Hello")
+        await scheduler.worker
+        return scheduler.stats
+
+    stats = asyncio.run(scenario())
+    assert results == [(1, 60, {})]
+    assert stats["failed"] == 1
+
+
+def test_results_never_go_back_to_an_older_turn():
+    results = []
+
+    async def scenario():
+        scheduler = _scheduler(results)
+        scheduler.submit(5, "x")
+        await scheduler.worker
+        scheduler.submit(3, "xx")
+        await scheduler.worker
+        return scheduler.stats
+
+    stats = asyncio.run(scenario())
+    assert [seq for seq, _, _ in results] == [5]
+    assert stats["dropped"] == 1
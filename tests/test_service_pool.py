@@ -0,0 +1,81 @@
+import asyncio
+import itertools
+
+from service_pool import ServicePool
+
+
+def _pool(**kwargs):
+    built = itertools.count()
+    disposed = []
+
+    async def factory(key):
+        await asyncio.sleep(0)
+        return f"{key}-{next(built)}"
+
+    async def dispose(bundle):
+        disposed.append(bundle)
+
+    return ServicePool(factory, dispose=dispose, **kwargs), disposed
+
+
+def test_claims_take_ready_bundles_and_refill_in_the_background():
+    pool, _ = _pool(size=1)
+
+    async def main():
+        await pool.start(["voice"])
+        first = await pool.claim("voice")
+        assert pool.stats()["ready"]["voice"] == 0
+        await asyncio.sleep(0.01)
+        second = await pool.claim("voice")
+        third = await pool.claim("voice")
+        await pool.stop()
+        return first, second, third
+
+    assert asyncio.run(main()) == ("voice-0", "voice-1", "voice-2")
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_an_unknown_key_is_built_inline():
+    pool, _ = _pool(size=1)
+
+    async def main():
+        bundle = await pool.claim("other")
+        await asyncio.sleep(0.01)
+        ready = pool.stats()["ready"]["other"]
+        await pool.stop()
+        return bundle, ready
+
+    assert asyncio.run(main()) == ("other-0", 1)
+    assert pool.stats()["misses"] == 1
+
+
+def test_released_and_idle_bundles_are_disposed():
+    pool, disposed = _pool(size=1, idle_secs=0.01)
+
+    async def main():
+        await pool.start(["voice"])
+        claimed = await pool.claim("voice")
+        await pool.release(claimed)
+        # The refilled bundle goes unclaimed past its idle time
+        await asyncio.sleep(0.05)
+        await pool.stop()
+        return claimed
+
+    claimed = asyncio.run(main())
+    assert disposed[0] == claimed
+    assert "voice-1" in disposed
+    assert pool.stats()["released"] == 1
+    assert pool.stats()["expired"] >= 1
+
+
+def test_a_failing_dispose_does_not_escape_release():
+    async def factory(key):
+        return key
+
+    async def dispose(bundle):
+        raise OSError("already closed")
+
+    pool = ServicePool(factory, dispose=dispose)
+    asyncio.run(pool.release("voice"))
+    assert pool.stats()["released"] == 1
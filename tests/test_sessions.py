@@ -0,0 +1,78 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import server
+from sessions import SessionDirectory, SessionRegistry
+
+
+class FakeConnection:
+    def __init__(self, pc_id, connected=True):
+        self.pc_id = pc_id
+        self.connected = connected
+        self.disconnected = False
+        self.handlers = {}
+
+    def event_handler(self, name):
+        def register(handler):
+            self.handlers[name] = handler
+            return handler
+        return register
+
+    def is_connected(self):
+        return self.connected
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+def test_capacity_is_enforced_and_freed_on_close(tmp_path):
+    directory = SessionDirectory(str(tmp_path / "sessions.sqlite3"))
+    registry = SessionRegistry(max_sessions=2, directory=directory, worker_id="0")
+    connections = [FakeConnection(f"pc-{i}") for i in range(2)]
+    for connection in connections:
+        assert registry.has_capacity()
+        registry.add(connection, "budget_customer")
+    assert not registry.has_capacity()
+    assert directory.counts() == {"0": 2}
+
+    asyncio.run(connections[0].handlers["closed"](connections[0]))
+    assert registry.has_capacity()
+    assert directory.lookup("pc-0") is None
+    assert registry.stats()["rejected"] == 1
+    assert registry.stats()["closed"] == 1
+
+
+def test_a_full_server_refuses_new_calls(monkeypatch):
+    registry = SessionRegistry(max_sessions=1)
+    registry.add(FakeConnection("pc-0"), "budget_customer")
+    monkeypatch.setattr(server, "get_sessions", lambda: registry)
+
+    response = TestClient(server.app).post("/api/offer", params={"persona": "budget_customer"},
+                                           json={"sdp": "", "type": "offer"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(server.SESSION_RETRY_AFTER_SECS)
+
+
+def test_reap_closes_idle_finished_and_overlong_sessions():
+    registry = SessionRegistry(idle_secs=0.01, max_secs=60)
+
+    async def scenario():
+        idle = registry.add(FakeConnection("idle", connected=False), "budget_customer")
+        finished = registry.add(FakeConnection("finished"), "budget_customer")
+        registry.run(finished, asyncio.sleep(0))
+        overlong = registry.add(FakeConnection("overlong"), "budget_customer")
+        overlong._started -= 120
+        live = registry.add(FakeConnection("live"), "budget_customer")
+        registry.run(live, asyncio.sleep(10))
+        await asyncio.sleep(0.02)
+
+        await registry.reap()
+        assert [s.connection.disconnected for s in (idle, finished, overlong, live)] == [True, True, True, False]
+        live.task.cancel()
+
+    asyncio.run(scenario())
+    stats = registry.stats()
+    assert [s["pc_id"] for s in stats["sessions"]] == ["live"]
+    assert stats["reaped_idle"] == 1
+    assert stats["reaped_zombie"] == 2
@@ -0,0 +1,79 @@
+import asyncio
+
+from single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "score"
+
+    async def main():
+        return await asyncio.gather(*(flight.run("key", "compliance", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["score"] * 5
+    assert len(runs) == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_the_exception_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("no score")
+
+    async def main():
+        return await asyncio.gather(*(flight.run("key", "compliance", work) for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert [type(e) for e in asyncio.run(main())] == [ValueError] * 3
+
+
+def test_one_waiter_leaving_keeps_the_work_running():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "score"
+
+    async def main():
+        leaving = asyncio.create_task(flight.run("key", "compliance", work))
+        staying = asyncio.create_task(flight.run("key", "compliance", work))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(main()) == "score"
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_the_work_is_cancelled_once_every_waiter_has_left():
+    flight = SingleFlight()
+
+    async def main():
+        stopped = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.run("key", "compliance", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.wait_for(stopped.wait(), 1)
+        # A new call after that starts afresh rather than joining the cancelled work
+        return await flight.run("key", "compliance", lambda: asyncio.sleep(0, "again"))
+
+    assert asyncio.run(main()) == "again"
+    assert flight.stats()["cancelled"] == 1
+    assert flight.stats()["started"] == 2
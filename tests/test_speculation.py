@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+from speculation import SpeculativeReplyProcessor, normalize
+
+CHUNKS = [SimpleNamespace(choices=[SimpleNamespace(content=word)]) for word in ("Sounds", " good.")]
+HISTORY = [{"role": "system", "content": "You are a customer."}, {"role": "assistant", "content": "Hello?"}]
+
+
+class FakeContext:
+    def get_messages(self):
+        return list(HISTORY)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeLLM:
+    """Answers every request with the same two chunks."""
+
+    def __init__(self):
+        self.speculator = None
+        self.requests = []
+
+    async def get_chat_completions(self, context, messages):
+        self.requests.append(messages)
+        return FakeStream(CHUNKS)
+
+
+def _processor():
+    llm = FakeLLM()
+    processor = SpeculativeReplyProcessor(llm, FakeContext(), window=lambda messages: messages)
+    processor.create_task = asyncio.create_task
+    return processor, llm
+
+
+def _turn(text):
+    return [*HISTORY, {"role": "user", "content": text}]
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_normalize_ignores_case_and_punctuation():
+    assert normalize("Can I get your ZIP code?") == normalize("can i get your zip code")
+
+
+def test_a_matching_turn_replays_the_speculated_reply():
+    async def scenario():
+        processor, llm = _processor()
+        processor._start("I can offer you a lower rate.")
+        stream = processor.commit(_turn("i can offer you a lower rate"))
+        return await _collect(stream), processor.stats, llm.requests
+
+    chunks, stats, requests = asyncio.run(scenario())
+    assert chunks == CHUNKS
+    assert stats["hit"] == 1
+    assert requests == [_turn("I can offer you a lower rate.")]
+
+
+def test_a_different_turn_cancels_the_speculation():
+    async def scenario():
+        processor, _ = _processor()
+        processor._start("I can offer you a lower rate.")
+        spec = processor._current
+        await asyncio.sleep(0)
+        stream = processor.commit(_turn("I can offer you a lower rate on a two year plan."))
+        await asyncio.gather(spec.task, return_exceptions=True)
+        return stream, spec.task.cancelled(), processor.stats
+
+    stream, cancelled, stats = asyncio.run(scenario())
+    assert stream is None
+    assert cancelled
+    assert stats["miss"] == 1
+
+
+def test_a_turn_without_a_speculation_goes_to_the_llm():
+    async def scenario():
+        processor, _ = _processor()
+        return processor.commit(_turn("Hello, is this Sam?")), processor.stats
+
+    stream, stats = asyncio.run(scenario())
+    assert stream is None
+    assert stats["none"] == 1
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+import transcripts
+from transcripts import CallInProgress, CallScorer, TranscriptStore
+
+
+@pytest.fixture
+def scorer(tmp_path, monkeypatch):
+    selections = []
+
+    async def stream_analysis(transcript, selected):
+        selections.append(selected)
+        yield "score", {"rubric": "overall_score", "score": 70}
+        yield "summary", {"overall_score": 70}
+
+    monkeypatch.setattr(transcripts, "stream_analysis", stream_analysis)
+    monkeypatch.setattr(transcripts, "record_call", lambda call, result: None)
+    monkeypatch.setattr(transcripts, "CALL_END_WAIT_SECS", 0.3)
+    store = TranscriptStore(str(tmp_path / "transcripts.sqlite3"))
+    store.start_call("s1", "budget_customer")
+    store.append("s1", "Agent", "Can I get your name?")
+    scorer = CallScorer(store)
+    scorer.selections = selections
+    yield scorer
+    store.close()
+
+
+def test_live_calls_are_not_scored(scorer):
+    with pytest.raises(CallInProgress):
+        asyncio.run(scorer.result("s1"))
+    assert scorer.selections == []
+    assert scorer._store.scores("s1") is None
+
+
+def test_live_calls_are_not_streamed(scorer):
+    async def scenario():
+        return [event async for event in scorer.events("s1")]
+
+    with pytest.raises(CallInProgress):
+        asyncio.run(scenario())
+    assert scorer.selections == []
+
+
+def test_a_request_at_hang_up_waits_for_the_call_to_end(scorer):
+    async def scenario():
+        request = asyncio.create_task(scorer.result("s1"))
+        await asyncio.sleep(0.1)
+        scorer._store.end_call("s1")
+        return await request
+
+    assert asyncio.run(scenario()) == {"overall_score": 70}
+
+
+def test_reconciled_live_scores_are_not_scored_again(scorer):
+    async def live():
+        return {"compliance": 50, "compliance_items": {}, "script_adherence": 20}
+
+    async def scenario():
+        scorer._store.end_call("s1")
+        result = await scorer.schedule("s1", live=live)
+        return result, [event async for event in scorer.events("s1")]
+
+    result, events = asyncio.run(scenario())
+    assert result == {"compliance": 50, "compliance_items": {}, "script_adherence": 20, "overall_score": 70}
+    assert "compliance" not in scorer.selections[0] and "script_adherence" not in scorer.selections[0]
+    assert events[-1] == ("summary", result)
+
+
+def test_unknown_sessions_have_no_result(scorer):
+    assert asyncio.run(scorer.result("nope")) is None
+
+
+def test_stopping_waits_for_calls_being_scored(scorer, monkeypatch):
+    async def slow_analysis(transcript, selected):
+        await asyncio.sleep(0.1)
+        yield "summary", {"overall_score": 60}
+
+    monkeypatch.setattr(transcripts, "stream_analysis", slow_analysis)
+
+    async def scenario():
+        scorer._store.end_call("s1")
+        scorer.schedule("s1")
+        await scorer.stop()
+
+    asyncio.run(scenario())
+    assert scorer._store.scores("s1") == {"overall_score": 60}
@@ -0,0 +1,49 @@
+import asyncio
+
+from pipecat.frames.frames import LLMFullResponseEndFrame, LLMFullResponseStartFrame, LLMTextFrame
+from pipecat.tests.utils import run_test
+
+from tts_cache import CachedTTS, TTSAudioCache
+
+
+def _cached_tts(tmp_path):
+    return CachedTTS(TTSAudioCache(str(tmp_path)), "voice", "model", 16000,
+                     ["Hello.", "Thank you so much.", "I'm not interested, thanks."])
+
+
+def test_could_match_follows_the_phrase_prefixes(tmp_path):
+    tts = _cached_tts(tmp_path)
+    assert tts.could_match("")
+    assert tts.could_match("Thank you")
+    assert tts.could_match("  thank YOU so much.")
+    assert tts.could_match("I’m not")
+    assert not tts.could_match("Thank you for")
+    assert not tts.could_match("Hello there")
+
+
+def test_other_replies_reach_the_tts_before_they_end(tmp_path):
+    # No end frame: a reply that diverges from every phrase must not wait for one
+    frames = [LLMFullResponseStartFrame(), LLMTextFrame("Well, "), LLMTextFrame("what's the rate?")]
+    down, _ = asyncio.run(run_test(_cached_tts(tmp_path).lookup(), frames_to_send=frames,
+                                   expected_down_frames=[LLMFullResponseStartFrame, LLMTextFrame, LLMTextFrame]))
+    assert "".join(frame.text for frame in down[1:]) == "Well, what's the rate?"
+
+
+def test_stock_phrases_are_held_until_the_reply_ends(tmp_path):
+    tts = _cached_tts(tmp_path)
+    frames = [LLMFullResponseStartFrame(), LLMTextFrame("Thank you "), LLMTextFrame("so much."),
+              LLMFullResponseEndFrame()]
+    asyncio.run(run_test(tts.lookup(), frames_to_send=frames,
+                         expected_down_frames=[LLMFullResponseStartFrame, LLMTextFrame, LLMTextFrame,
+                                               LLMFullResponseEndFrame]))
+    # A miss: the output side records it for next time
+    assert tts.take_expected() == "Thank you so much."
+
+
+def test_cached_phrases_skip_the_tts(tmp_path):
+    tts = _cached_tts(tmp_path)
+    tts.put("Hello.", b"\0\0" * 320)
+    frames = [LLMFullResponseStartFrame(), LLMTextFrame("Hello."), LLMFullResponseEndFrame()]
+    asyncio.run(run_test(tts.lookup(), frames_to_send=frames,
+                         expected_down_frames=[LLMFullResponseStartFrame, LLMFullResponseEndFrame]))
+    assert tts.take_replay() == ("Hello.", b"\0\0" * 320)
@@ -0,0 +1,60 @@
+from pipecat.audio.turn.base_turn_analyzer import EndOfTurnState
+
+from turn_detection import DEFAULT_WAITS, TURN_MAX_SECS, TURN_QUESTION_SECS, AdaptiveTurnAnalyzer, classify
+
+SAMPLE_RATE = 16000
+FRAME = b"\x00\x00" * (SAMPLE_RATE // 50)  # 20 ms
+
+
+def _analyzer():
+    analyzer = AdaptiveTurnAnalyzer()
+    analyzer.set_sample_rate(SAMPLE_RATE)
+    return analyzer
+
+
+def _speak(analyzer, secs):
+    for _ in range(round(secs * 50)):
+        analyzer.append_audio(FRAME, True)
+
+
+def _silence_until_end(analyzer, limit=3.0):
+    """Seconds of silence before the analyzer ended the turn."""
+    for frame in range(1, round(limit * 50) + 1):
+        if analyzer.append_audio(FRAME, False) == EndOfTurnState.COMPLETE:
+            return round(frame / 50, 2)
+    return None
+
+
+def test_classify():
+    assert classify("Can I get your zip code?") == "question"
+    assert classify("I'll send that over now.") == "complete"
+    assert classify("So, um") == "incomplete"
+    assert classify("and the rate is") == "incomplete"
+    assert classify("we have a plan") == "open"
+    assert classify("") == "open"
+
+
+def test_the_wait_follows_the_transcript_cue():
+    for text, wait in (("Can I get your zip code?", TURN_QUESTION_SECS), ("So, um", TURN_MAX_SECS)):
+        analyzer = _analyzer()
+        _speak(analyzer, 1.0)
+        analyzer.append_audio(FRAME, False)
+        # The final arrives just after the agent goes quiet
+        analyzer.on_transcript(text, final=True)
+        # Counting the frame of silence before it, to within a frame
+        assert abs(0.02 + _silence_until_end(analyzer) - wait) <= 0.02
+
+
+def test_a_turn_ended_before_the_agent_carried_on_lengthens_the_next_wait():
+    analyzer = _analyzer()
+    _speak(analyzer, 1.0)
+    analyzer.append_audio(FRAME, False)
+    analyzer.on_transcript("That's our best rate.", final=True)
+    _silence_until_end(analyzer)
+    # The agent carries on half a second later
+    for _ in range(25):
+        analyzer.append_audio(FRAME, False)
+    _speak(analyzer, 0.2)
+
+    assert analyzer.stats["resumed"] == 1
+    assert analyzer.stats["waits"]["complete"] > DEFAULT_WAITS["complete"]
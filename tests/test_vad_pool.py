@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+from vad_pool import VADModelPool
+
+
+def test_leases_spread_over_the_least_used_sessions():
+    pool = VADModelPool(size=2)
+    first, second, third = pool.lease(), pool.lease(), pool.lease()
+    assert sorted([first.slot, second.slot]) == [0, 1]
+    assert pool.stats()["active_per_session"] in ([2, 1], [1, 2])
+
+    pool.release(first)
+    pool.release(third)
+    assert pool.stats()["active"] == 1
+    assert pool.lease().slot != second.slot
+
+
+def test_the_lease_is_returned_when_call_setup_fails(monkeypatch):
+    pool = VADModelPool(size=1)
+    monkeypatch.setattr(bot, "get_vad_pool", lambda: pool)
+
+    def broken_transport(**kwargs):
+        raise RuntimeError("no transport")
+
+    monkeypatch.setattr(bot, "SmallWebRTCTransport", broken_transport)
+    with pytest.raises(RuntimeError):
+        asyncio.run(bot.run_bot(SimpleNamespace(pc_id="pc-setup-fails"), turn_detection="vad"))
+    assert pool.stats()["active"] == 0
+    assert pool.stats()["returns"] == 1
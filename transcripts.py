@@ -0,0 +1,340 @@
+"""Server-side record of every call's transcript and its post-call scores.
+
+The bot appends each final agent and customer line to a WAL-mode SQLite store
+as the call runs, so the transcript survives the browser tab and scoring
+endpoints can take a ``session_id`` instead of the full text. Lines and scores
+are append-only; a call row carries its agent, persona and start/end times and
+is indexed on each of them for history queries.
+
+When a call ends, ``CallScorer`` runs the full analysis in the background and
+stores the result, so it is usually ready before the analysis screen asks, then
+folds it into the agent's and persona's rollups. Compliance and script
+adherence come from the bot's live checklist progress, reconciled at hang-up,
+when it has them. A screen that asks while the call is still being scored
+follows that run's results as they come in. A call that is still live isn't
+scored: its transcript isn't final yet.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from analysis import ALL_SELECTIONS, result_events, stream_analysis
+from rollups import record_call
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+TRANSCRIPT_DB_PATH = os.getenv("TRANSCRIPT_DB_PATH", os.path.join(DATA_DIR, "transcripts.sqlite3"))
+# Score every call as soon as it ends; off means scoring waits for the first request.
+AUTO_SCORE_CALLS = os.getenv("AUTO_SCORE_CALLS", "1") != "0"
+# How long a request for a call's scores waits for a hang-up to be recorded before answering "in progress"
+CALL_END_WAIT_SECS = float(os.getenv("CALL_END_WAIT_SECS", "5"))
+# How long shutdown waits for calls still being scored before cancelling them
+CALL_SCORE_DRAIN_SECS = float(os.getenv("CALL_SCORE_DRAIN_SECS", "30"))
+TRANSCRIPT_PAGE_SIZE = 50
+
+
+class TranscriptStore:
+    """Calls, their transcript lines and their scores.
+
+    Every write is a single small insert on a WAL database, cheap enough to run
+    inline on the event loop like the ``SessionDirectory``.
+    """
+
+    def __init__(self, path: str = TRANSCRIPT_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the store consistent without an fsync on every line
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS calls (
+                session_id TEXT PRIMARY KEY, agent_id TEXT, persona TEXT NOT NULL, worker TEXT,
+                started_at REAL NOT NULL, ended_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS calls_agent ON calls (agent_id, started_at);
+            CREATE INDEX IF NOT EXISTS calls_persona ON calls (persona, started_at);
+            CREATE INDEX IF NOT EXISTS calls_started ON calls (started_at);
+            CREATE TABLE IF NOT EXISTS lines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, speaker TEXT NOT NULL,
+                text TEXT NOT NULL, at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lines_session ON lines (session_id, id);
+            CREATE TABLE IF NOT EXISTS scores (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, result TEXT NOT NULL,
+                scored_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scores_session ON scores (session_id, id);
+            """
+        )
+        self._db.commit()
+
+    def start_call(self, session_id: str, persona: str, agent_id: Optional[str] = None,
+                   worker: Optional[str] = None):
+        with self._lock:
+            # A renegotiated or restarted pipeline keeps the lines it already has
+            self._db.execute(
+                "INSERT OR IGNORE INTO calls (session_id, agent_id, persona, worker, started_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session_id, agent_id, persona, worker, time.time()),
+            )
+            self._db.commit()
+
+    def append(self, session_id: str, speaker: str, text: str):
+        with self._lock:
+            self._db.execute("INSERT INTO lines (session_id, speaker, text, at) VALUES (?, ?, ?, ?)",
+                             (session_id, speaker, text, time.time()))
+            self._db.commit()
+
+    def end_call(self, session_id: str):
+        with self._lock:
+            self._db.execute("UPDATE calls SET ended_at = ? WHERE session_id = ? AND ended_at IS NULL",
+                             (time.time(), session_id))
+            self._db.commit()
+
+    def lines(self, session_id: str) -> List[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT speaker, text FROM lines WHERE session_id = ? ORDER BY id",
+                                    (session_id,)).fetchall()
+        return [f"{speaker}: {text}" for speaker, text in rows]
+
+    def transcript(self, session_id: str) -> Optional[str]:
+        """The call's "Agent: ..." / "Customer: ..." transcript, or None for an unknown session."""
+        if self.call(session_id) is None:
+            return None
+        return "\n".join(self.lines(session_id))
+
+    def call(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT session_id, agent_id, persona, worker, started_at, ended_at FROM calls WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return self._call(row) if row else None
+
+    @staticmethod
+    def _call(row: tuple) -> dict:
+        session_id, agent_id, persona, worker, started_at, ended_at = row
+        return {"session_id": session_id, "agent_id": agent_id, "persona": persona, "worker": worker,
+                "started_at": started_at, "ended_at": ended_at}
+
+    def calls(self, agent_id: Optional[str] = None, persona: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: int = TRANSCRIPT_PAGE_SIZE) -> List[dict]:
+        """Most recent calls first, filtered on the indexed columns."""
+        clauses, params = [], []
+        for column, op, value in (("agent_id", "=", agent_id), ("persona", "=", persona),
+                                  ("started_at", ">=", since), ("started_at", "<", until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT session_id, agent_id, persona, worker, started_at, ended_at FROM calls "
+                f"{where} ORDER BY started_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [self._call(row) for row in rows]
+
+    def save_scores(self, session_id: str, result: dict):
+        with self._lock:
+            self._db.execute("INSERT INTO scores (session_id, result, scored_at) VALUES (?, ?, ?)",
+                             (session_id, json.dumps(result), time.time()))
+            self._db.commit()
+
+    def scores(self, session_id: str) -> Optional[dict]:
+        """The latest stored analysis of a call."""
+        with self._lock:
+            row = self._db.execute("SELECT result FROM scores WHERE session_id = ? ORDER BY id DESC LIMIT 1",
+                                   (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CallInProgress(Exception):
+    """The call is still live, so there is no final transcript to score yet."""
+
+
+class _ScoringRun:
+    """The events of one in-progress scoring, kept so late followers see them all."""
+
+    def __init__(self):
+        self.events: List[tuple] = []
+        self.done = False
+        self._changed = asyncio.Event()
+
+    def add(self, event: tuple):
+        self.events.append(event)
+        self._changed.set()
+
+    def finish(self):
+        self.done = True
+        self._changed.set()
+
+    async def replay(self):
+        sent = 0
+        while True:
+            while sent < len(self.events):
+                yield self.events[sent]
+                sent += 1
+            if self.done:
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class CallScorer:
+    """Full post-call analysis of stored calls, computed once and kept in the store.
+
+    Requests for a call that is still being scored wait for that run instead of
+    starting another.
+    """
+
+    def __init__(self, store: TranscriptStore):
+        self._store = store
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._runs: Dict[str, _ScoringRun] = {}
+        self._stats = {"scored": 0, "failed": 0, "skipped": 0}
+
+    def schedule(self, session_id: str, live: Optional[Callable[[], Awaitable[Optional[dict]]]] = None
+                 ) -> asyncio.Task:
+        """Score the call in the background, or return the run already doing it.
+
+        ``live`` settles the call's live checklist scores; the rubrics it returns
+        aren't scored again.
+        """
+        task = self._pending.get(session_id)
+        if task is None:
+            run = self._runs[session_id] = _ScoringRun()
+            task = asyncio.create_task(self._score(session_id, run, live))
+            self._pending[session_id] = task
+            task.add_done_callback(lambda _: self._done(session_id))
+        return task
+
+    def _done(self, session_id: str):
+        self._pending.pop(session_id, None)
+        self._runs.pop(session_id).finish()
+
+    async def _score(self, session_id: str, run: _ScoringRun,
+                     live: Optional[Callable[[], Awaitable[Optional[dict]]]] = None) -> Optional[dict]:
+        lines = self._store.lines(session_id)
+        if not any(line.startswith("Agent: ") for line in lines):
+            # The agent never spoke, so there's nothing to evaluate
+            self._stats["skipped"] += 1
+            return None
+        result = {}
+        try:
+            reconciled = await live() if live is not None else None
+            if reconciled:
+                result.update(reconciled)
+                for event in result_events(reconciled):
+                    run.add(event)
+            selected = [name for name in ALL_SELECTIONS if name not in result]
+            async for kind, data in stream_analysis("\n".join(lines), selected):
+                if kind == "summary":
+                    result.update(data)
+                else:
+                    run.add((kind, data))
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"Scoring call {session_id} failed: {e}")
+            return None
+        self._store.save_scores(session_id, result)
+        self._stats["scored"] += 1
+        call = self._store.call(session_id)
+        if call and call["ended_at"] is not None:
+            # Only finished calls count towards the agent's history
+            record_call(call, result)
+        return result
+
+    async def ended_call(self, session_id: str) -> Optional[dict]:
+        """The call once it has ended, or None for an unknown session.
+
+        A request made at hang-up usually arrives just before the call is marked
+        ended, so this waits up to ``CALL_END_WAIT_SECS`` for that before raising
+        ``CallInProgress``.
+        """
+        deadline = time.monotonic() + CALL_END_WAIT_SECS
+        while True:
+            call = self._store.call(session_id)
+            if call is None or call["ended_at"] is not None:
+                return call
+            if time.monotonic() >= deadline:
+                raise CallInProgress(session_id)
+            await asyncio.sleep(0.1)
+
+    async def result(self, session_id: str) -> Optional[dict]:
+        """The ended call's stored analysis, scoring it now if that hasn't happened yet.
+
+        Raises ``CallInProgress`` for a call that is still live.
+        """
+        if await self.ended_call(session_id) is None:
+            return None
+        stored = self._store.scores(session_id)
+        if stored is not None:
+            return stored
+        # Joins the run scheduled on disconnect if there is one. Shielded so a
+        # client giving up doesn't cancel a run others may share.
+        return await asyncio.shield(self.schedule(session_id))
+
+    async def events(self, session_id: str):
+        """The ended call's analysis as ``stream_analysis`` events, ending with its summary.
+
+        A call still being scored is followed as its results arrive; leaving early
+        doesn't stop the scoring. Raises ``CallInProgress`` for a call that is
+        still live.
+        """
+        call = await self.ended_call(session_id)
+        stored = self._store.scores(session_id) if call is not None else None
+        run = None
+        if stored is None and call is not None:
+            task = self.schedule(session_id)
+            run = self._runs.get(session_id)
+            if run is not None:
+                async for event in run.replay():
+                    yield event
+            stored = await asyncio.shield(task)
+        if run is None:
+            for event in result_events(stored or {}):
+                yield event
+        yield "summary", stored or {}
+
+    async def stop(self, drain_secs: float = CALL_SCORE_DRAIN_SECS):
+        """Let pending runs finish for up to ``drain_secs``, then cancel the rest."""
+        tasks = list(self._pending.values())
+        if tasks:
+            await asyncio.wait(tasks, timeout=drain_secs)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {**self._stats, "pending": len(self._pending)}
+
+
+_store: Optional[TranscriptStore] = None
+_scorer: Optional[CallScorer] = None
+
+
+def get_transcript_store() -> TranscriptStore:
+    global _store
+    if _store is None:
+        _store = TranscriptStore()
+    return _store
+
+
+def get_call_scorer() -> CallScorer:
+    global _scorer
+    if _scorer is None:
+        _scorer = CallScorer(get_transcript_store())
+    return _scorer
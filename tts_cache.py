@@ -0,0 +1,338 @@
+"""Persistent cache of synthesized persona utterances.
+
+Personas repeat the same short lines ("Hello.", the scripted refusals, thank-you
+and closing lines). ``CachedTTS`` wraps the TTS service in the pipeline with two
+processors: ``lookup()`` before the TTS holds a reply back only while its text
+so far could still be one of the persona's stock lines, and keeps cache hits
+away from the TTS; any other reply streams to the TTS as soon as it diverges.
+``output()`` after the TTS replays the cached audio and stores the audio of
+held replies that missed. Audio is kept as raw 16-bit PCM files on disk behind
+an in-memory LRU.
+
+Run ``python tts_cache.py`` to pre-synthesize every persona's known phrases.
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import (
+    Frame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    LLMTextFrame,
+    StartInterruptionFrame,
+    SystemFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+    TTSTextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+DATA_DIR = os.getenv("ASCEND_DATA_DIR", "data")
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(DATA_DIR, "tts_cache"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Longest scenario line treated as a stock phrase
+TTS_CACHE_MAX_CHARS = int(os.getenv("TTS_CACHE_MAX_CHARS", "120"))
+
+# Lines every persona is likely to say regardless of scenario.
+COMMON_PHRASES = [
+    "Hello.", "Hi.", "Hi there.", "Yes.", "Yes, that's right.", "No.", "Okay.", "Sure.",
+    "Thank you.", "Thank you so much.", "Thanks.", "Goodbye.", "Bye.", "Have a great day.",
+]
+
+# Chunk replayed audio in 20 ms frames, like a streaming TTS would.
+_CHUNK_MS = 20
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.replace("’", "'").split()).strip().lower()
+
+
+def cache_key(voice_id: str, text: str, model: str, sample_rate: int) -> str:
+    raw = "\0".join([voice_id, model, str(sample_rate), normalize_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.pcm")
+
+    def _remember(self, key: str, audio: bytes):
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self._max_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key: str) -> Optional[bytes]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return audio
+
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+        except FileNotFoundError:
+            self._stats["misses"] += 1
+            return None
+
+        self._remember(key, audio)
+        self._stats["disk_hits"] += 1
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio:
+            return
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp = f"{self._path(key)}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, self._path(key))
+        self._remember(key, audio)
+        self._stats["writes"] += 1
+
+    def stats(self) -> dict:
+        return {**self._stats, "memory_entries": len(self._memory), "memory_bytes": self._memory_bytes}
+
+
+class _TTSCacheLookup(FrameProcessor):
+    """Holds LLM replies that may be stock phrases back from the TTS until it knows whether they are cached."""
+
+    def __init__(self, owner: "CachedTTS", **kwargs):
+        super().__init__(**kwargs)
+        self._owner = owner
+        self._buffer: List[Frame] = []
+        self._text = ""
+        self._buffering = False
+
+    async def _flush(self):
+        buffer, self._buffer, self._buffering = self._buffer, [], False
+        for frame in buffer:
+            await self.push_frame(frame)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, StartInterruptionFrame):
+            self._buffer, self._buffering = [], False
+            self._owner.reset()
+            await self.push_frame(frame, direction)
+
+        elif direction != FrameDirection.DOWNSTREAM or isinstance(frame, SystemFrame):
+            await self.push_frame(frame, direction)
+
+        elif isinstance(frame, LLMFullResponseStartFrame):
+            self._buffer, self._text, self._buffering = [frame], "", True
+
+        elif isinstance(frame, LLMTextFrame) and self._buffering:
+            self._buffer.append(frame)
+            self._text += frame.text
+            # Can't be a stock phrase any more: let the TTS start on it
+            if not self._owner.could_match(self._text):
+                await self._flush()
+
+        elif isinstance(frame, LLMFullResponseEndFrame) and self._buffering:
+            audio = self._owner.get(self._text)
+            if audio is None:
+                self._owner.expect(self._text)
+                await self._flush()
+            else:
+                # Skip the TTS entirely; the output side replays the audio
+                self._owner.replay(self._text, audio)
+                await self.push_frame(self._buffer[0])
+                self._buffer, self._buffering = [], False
+            await self.push_frame(frame, direction)
+
+        elif self._buffering:
+            self._buffer.append(frame)
+
+        else:
+            await self.push_frame(frame, direction)
+
+
+class _TTSCacheOutput(FrameProcessor):
+    """Replays cache hits and records the audio of held replies that missed."""
+
+    def __init__(self, owner: "CachedTTS", **kwargs):
+        super().__init__(**kwargs)
+        self._owner = owner
+        self._recording: Optional[str] = None
+        self._audio = bytearray()
+
+    async def _replay(self, text: str, audio: bytes):
+        logger.debug(f"TTS cache hit: [{text}]")
+        sample_rate = self._owner.sample_rate
+        chunk = int(sample_rate * _CHUNK_MS / 1000) * 2
+        await self.push_frame(TTSStartedFrame())
+        for i in range(0, len(audio), chunk):
+            await self.push_frame(TTSAudioRawFrame(audio[i:i + chunk], sample_rate, 1))
+        await self.push_frame(TTSTextFrame(text.strip()))
+        await self.push_frame(TTSStoppedFrame())
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, StartInterruptionFrame):
+            self._recording = None
+            self._audio = bytearray()
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            pending = self._owner.take_replay()
+            if pending:
+                await self._replay(*pending)
+        elif isinstance(frame, TTSStartedFrame) and self._recording is None:
+            self._recording = self._owner.take_expected()
+            self._audio = bytearray()
+        elif isinstance(frame, TTSAudioRawFrame) and self._recording is not None:
+            if frame.sample_rate == self._owner.sample_rate and frame.num_channels == 1:
+                self._audio.extend(frame.audio)
+        elif isinstance(frame, TTSStoppedFrame) and self._recording is not None:
+            self._owner.put(self._recording, bytes(self._audio))
+            self._recording = None
+            self._audio = bytearray()
+
+        await self.push_frame(frame, direction)
+
+
+class CachedTTS:
+    """Per-call cache front end for one TTS voice.
+
+    ``phrases`` are the lines worth holding a reply back for. Place ``lookup()``
+    right before the TTS service and ``output()`` right after it.
+    """
+
+    def __init__(self, cache: TTSAudioCache, voice_id: str, model: str, sample_rate: int,
+                 phrases: Iterable[str] = COMMON_PHRASES):
+        self._cache = cache
+        self._voice_id = voice_id
+        self._model = model
+        self.sample_rate = sample_rate
+        self._phrases = sorted({normalize_text(phrase) for phrase in phrases})
+        self._expected: Optional[str] = None
+        self._replay: Optional[tuple] = None
+
+    def could_match(self, text: str) -> bool:
+        """Whether ``text`` is the start of one of the phrases."""
+        text = normalize_text(text)
+        # Sorted, so the first phrase not below ``text`` is the only one that can start with it
+        index = bisect.bisect_left(self._phrases, text)
+        return index < len(self._phrases) and self._phrases[index].startswith(text)
+
+    def _key(self, text: str) -> str:
+        return cache_key(self._voice_id, text, self._model, self.sample_rate)
+
+    def get(self, text: str) -> Optional[bytes]:
+        return self._cache.get(self._key(text))
+
+    def put(self, text: str, audio: bytes):
+        self._cache.put(self._key(text), audio)
+
+    def expect(self, text: str):
+        self._expected = text
+
+    def take_expected(self) -> Optional[str]:
+        text, self._expected = self._expected, None
+        return text
+
+    def replay(self, text: str, audio: bytes):
+        self._replay = (text, audio)
+
+    def take_replay(self) -> Optional[tuple]:
+        pending, self._replay = self._replay, None
+        return pending
+
+    def reset(self):
+        self._expected = None
+        self._replay = None
+
+    def lookup(self, **kwargs) -> FrameProcessor:
+        return _TTSCacheLookup(self, **kwargs)
+
+    def output(self, **kwargs) -> FrameProcessor:
+        return _TTSCacheOutput(self, **kwargs)
+
+
+_cache: Optional[TTSAudioCache] = None
+
+
+def get_tts_cache() -> TTSAudioCache:
+    global _cache
+    if _cache is None:
+        _cache = TTSAudioCache()
+    return _cache
+
+
+def known_phrases(scenario: str) -> List[str]:
+    """Short quoted lines from a persona scenario, plus the common phrases."""
+    quoted = re.findall(r"[“\"]([^”\"]+)[”\"]", scenario)
+    phrases = [q.strip() for q in quoted if 0 < len(q.strip()) <= TTS_CACHE_MAX_CHARS]
+    return list(dict.fromkeys(COMMON_PHRASES + phrases))
+
+
+async def presynthesize(cache: TTSAudioCache, voice_id: str, phrases: Iterable[str],
+                        model: str, sample_rate: int, api_key: str):
+    """Synthesize ``phrases`` through the ElevenLabs HTTP API and store any that are missing."""
+    import aiohttp
+
+    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+    async with aiohttp.ClientSession() as session:
+        for text in phrases:
+            key = cache_key(voice_id, text, model, sample_rate)
+            if cache.get(key) is not None:
+                continue
+            async with session.post(
+                url,
+                params={"output_format": f"pcm_{sample_rate}"},
+                headers={"xi-api-key": api_key},
+                json={"text": text, "model_id": model},
+            ) as response:
+                if response.status != 200:
+                    logger.warning(f"Pre-synthesis failed for [{text}]: {response.status}")
+                    continue
+                cache.put(key, await response.read())
+                logger.info(f"Pre-synthesized [{text}] for voice {voice_id}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    from bot import TTS_MODEL, TTS_SAMPLE_RATE
+    from personas.registry import get_persona_registry
+
+    load_dotenv(override=True)
+
+    parser = argparse.ArgumentParser(description="Pre-synthesize persona phrases into the TTS cache")
+    parser.add_argument("--persona", action="append", help="Persona name (default: all)")
+    args = parser.parse_args()
+
+    async def main():
+        cache = get_tts_cache()
+        registry = get_persona_registry()
+        personas = [registry.get(name) for name in args.persona] if args.persona else registry.personas()
+        for persona in personas:
+            await presynthesize(cache, persona.voice_id, known_phrases(persona.spec.scenario),
+                                TTS_MODEL, TTS_SAMPLE_RATE, os.getenv("ELEVENLABS_API_KEY"))
+        logger.info(f"TTS cache: {cache.stats()}")
+
+    asyncio.run(main())
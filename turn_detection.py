@@ -0,0 +1,266 @@
+"""Deciding when the agent's turn is over, from VAD silence and what they said.
+
+With ``TURN_DETECTION=vad`` the turn ends after VAD's fixed ``stop_secs`` of
+silence. In ``adaptive`` mode VAD runs with a short stop time and only marks
+where silence starts. ``AdaptiveTurnAnalyzer`` then picks how long to wait from
+the latest Deepgram transcript (``smart_format`` punctuates it):
+
+- a final ending in a question mark waits ``TURN_QUESTION_SECS``
+- one ending a sentence waits ``TURN_COMPLETE_SECS``
+- a trailing filler, conjunction or comma ("so, um", "and") waits ``TURN_MAX_SECS``
+- nothing final since the agent last spoke waits ``TURN_OPEN_SECS``
+
+Each wait adapts to the agent. Pauses they carried on talking after are kept
+per cue, and once there are enough, the wait becomes their 90th percentile plus
+``TURN_PAUSE_MARGIN_SECS``. A turn that was ended just before the agent carried
+on counts as one of those pauses, so a cutoff lengthens the next wait. For
+quiet microphones, the VAD's ``min_volume`` is lowered to midway between the
+agent's measured speech level and the background noise.
+
+``TurnCueProcessor`` sits after the STT service and hands transcripts to the
+analyzer. ``python -m benchmarks.turn_eval`` compares the modes offline.
+"""
+
+import os
+import re
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from pipecat.audio.turn.base_turn_analyzer import BaseTurnAnalyzer, EndOfTurnState
+from pipecat.audio.turn.smart_turn.base_smart_turn import SmartTurnParams
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams, VADState
+from pipecat.frames.frames import Frame, InterimTranscriptionFrame, TranscriptionFrame
+from pipecat.metrics.metrics import MetricsData
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from latency import TURN_ENDS, TURN_WAIT_SECONDS
+
+TURN_MODES = ("vad", "adaptive")
+TURN_DETECTION = os.getenv("TURN_DETECTION", "adaptive")
+# VAD stop time in adaptive mode, just long enough to ride over dips inside words
+TURN_VAD_STOP_SECS = 0.2
+TURN_QUESTION_SECS = float(os.getenv("TURN_QUESTION_SECS", "0.35"))
+TURN_COMPLETE_SECS = float(os.getenv("TURN_COMPLETE_SECS", "1.0"))
+TURN_OPEN_SECS = float(os.getenv("TURN_OPEN_SECS", "1.2"))
+TURN_MAX_SECS = float(os.getenv("TURN_MAX_SECS", "1.8"))
+TURN_MIN_SECS = 0.25
+TURN_PAUSE_MARGIN_SECS = float(os.getenv("TURN_PAUSE_MARGIN_SECS", "0.15"))
+# Pauses of a cue needed before its wait may drop below the default
+TURN_MIN_PAUSES = 4
+TURN_PAUSE_HISTORY = 50
+# Speech this soon after a turn ended means the agent wasn't finished
+TURN_RESUME_SECS = 1.0
+# Lowest the VAD volume gate goes for a quiet microphone
+TURN_MIN_VOLUME_FLOOR = 0.3
+# Audio needed before the volume gate adapts, and how often it is revisited
+_VOLUME_WARMUP_SECS = 3.0
+_VOLUME_UPDATE_SECS = 1.0
+_VOLUME_HISTORY_SECS = 60.0
+# Dips shorter than this are within a word, not a pause
+_MIN_PAUSE_SECS = 0.08
+
+DEFAULT_WAITS = {
+    "question": TURN_QUESTION_SECS,
+    "complete": TURN_COMPLETE_SECS,
+    "open": TURN_OPEN_SECS,
+    "incomplete": TURN_MAX_SECS,
+}
+
+FILLERS = frozenset("um uh er erm hmm mm".split())
+# Words a finished sentence rarely ends on; only trusted when STT didn't punctuate the end
+TRAILING_WORDS = frozenset(
+    "so and but or because cause like the a an to of with for if that my your our than then just is are was".split()
+)
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+
+
+def classify(text: str) -> str:
+    """The cue a final transcript gives about the turn: question, complete, incomplete or open."""
+    text = text.rstrip()
+    words = _NON_WORD.sub(" ", text.lower()).split()
+    if not words:
+        return "open"
+    if text.endswith("?"):
+        return "question"
+    if words[-1] in FILLERS or text.endswith((",", "...", "-", "—")):
+        return "incomplete"
+    if text.endswith((".", "!")):
+        return "complete"
+    return "incomplete" if words[-1] in TRAILING_WORDS else "open"
+
+
+def vad_params(params: VADParams, mode: str) -> VADParams:
+    """A per-call copy of the VAD params, with the short stop time adaptive mode needs."""
+    return params.model_copy(update={"stop_secs": TURN_VAD_STOP_SECS} if mode == "adaptive" else {})
+
+
+def _quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdaptiveTurnAnalyzer(BaseTurnAnalyzer):
+    """Ends the turn after a silence whose length depends on the transcript cue.
+
+    Time is counted in audio, so the analyzer behaves the same live and when the
+    offline evaluation feeds it faster than real time. ``vad`` is the call's own
+    analyzer: its state tells where silence really started, and its volume gate
+    is adapted in place, so it must not share params with other calls.
+    """
+
+    def __init__(self, vad: Optional[VADAnalyzer] = None, *, sample_rate: Optional[int] = None):
+        super().__init__(sample_rate=sample_rate)
+        self._vad = vad
+        self._base_min_volume = vad.params.min_volume if vad else None
+        self._speech_triggered = False
+        self._silence_secs = 0.0
+        self._clock = 0.0
+        # Latest transcripts of the turn; a final is fresh if it came in after the agent went quiet
+        self._final = ""
+        self._interim = ""
+        self._fresh = False
+        self._pauses: Dict[str, Deque[float]] = {cue: deque(maxlen=TURN_PAUSE_HISTORY) for cue in DEFAULT_WAITS}
+        self._waits = dict(DEFAULT_WAITS)
+        self._ended: Optional[Tuple[float, str, float]] = None
+        self._volumes = [0.0] * 101
+        self._volume_secs = 0.0
+        self._volume_checked_at = 0.0
+        self.stats = {"mode": "adaptive", "ended": {cue: 0 for cue in DEFAULT_WAITS}, "resumed": 0,
+                      "waits": self._waits, "min_volume": self._base_min_volume}
+
+    @property
+    def speech_triggered(self) -> bool:
+        return self._speech_triggered
+
+    @property
+    def params(self) -> SmartTurnParams:
+        # Only read by pipecat to know a turn analyzer is in charge
+        return SmartTurnParams(stop_secs=TURN_MAX_SECS)
+
+    def on_transcript(self, text: str, final: bool):
+        if not final:
+            self._interim = text
+            self._fresh = False
+        elif text.strip():
+            self._final = text
+            self._interim = ""
+            # A final that arrives while the agent is still talking may be for words before the latest pause
+            self._fresh = self._speech_triggered and self._silence_secs > 0
+
+    def cue(self) -> str:
+        if self._fresh:
+            return classify(self._final)
+        if self._interim and classify(self._interim) == "incomplete":
+            return "incomplete"
+        return "open"
+
+    def wait_secs(self) -> float:
+        return self._waits[self.cue()]
+
+    def append_audio(self, buffer: bytes, is_speech: bool) -> EndOfTurnState:
+        secs = len(buffer) / (2 * self.sample_rate)
+        self._clock += secs
+        if self._vad is not None:
+            self._track_volume(secs)
+            # The transport still reports speech while VAD rides out its stop time; silence began then
+            if getattr(self._vad, "_vad_state", None) == VADState.STOPPING:
+                is_speech = False
+
+        if is_speech:
+            if self._ended is not None:
+                ended_at, cue, waited = self._ended
+                self._ended = None
+                gap = self._clock - ended_at - (self._vad.params.start_secs if self._vad else 0.0)
+                if self._clock - ended_at <= TURN_RESUME_SECS:
+                    # The turn was cut off; the agent's real pause was longer than the wait
+                    self.stats["resumed"] += 1
+                    TURN_ENDS.inc("resumed")
+                    self._record_pause(cue, waited + max(0.0, gap))
+            elif self._silence_secs >= _MIN_PAUSE_SECS:
+                self._record_pause(self.cue(), self._silence_secs)
+            self._speech_triggered = True
+            self._silence_secs = 0.0
+            self._fresh = False
+            return EndOfTurnState.INCOMPLETE
+
+        if not self._speech_triggered:
+            return EndOfTurnState.INCOMPLETE
+        self._silence_secs += secs
+        if self._silence_secs >= self.wait_secs():
+            self._end()
+            return EndOfTurnState.COMPLETE
+        return EndOfTurnState.INCOMPLETE
+
+    async def analyze_end_of_turn(self) -> Tuple[EndOfTurnState, Optional[MetricsData]]:
+        # Called when VAD goes quiet; the decision is made frame by frame in append_audio
+        return EndOfTurnState.INCOMPLETE, None
+
+    def clear(self):
+        self._speech_triggered = False
+        self._silence_secs = 0.0
+        self._final = ""
+        self._interim = ""
+        self._fresh = False
+
+    def _end(self):
+        cue, waited = self.cue(), self._silence_secs
+        self.stats["ended"][cue] += 1
+        TURN_ENDS.inc(cue)
+        TURN_WAIT_SECONDS.observe(cue, waited)
+        self._ended = (self._clock, cue, waited)
+        self.clear()
+
+    def _record_pause(self, cue: str, secs: float):
+        pauses = self._pauses[cue]
+        pauses.append(secs)
+        wait = min(TURN_MAX_SECS, max(TURN_MIN_SECS, _quantile(pauses, 0.9) + TURN_PAUSE_MARGIN_SECS))
+        # A few pauses may lengthen the wait, but shortening it takes more evidence
+        self._waits[cue] = wait if len(pauses) >= TURN_MIN_PAUSES else max(DEFAULT_WAITS[cue], wait)
+
+    def _track_volume(self, secs: float):
+        volume = getattr(self._vad, "_prev_volume", 0.0)
+        self._volumes[max(0, min(100, round(volume * 100)))] += secs
+        self._volume_secs += secs
+        if self._volume_secs > _VOLUME_HISTORY_SECS:
+            # Halve the history so a change of microphone or room shows through
+            self._volumes = [v / 2 for v in self._volumes]
+            self._volume_secs /= 2
+            self._volume_checked_at /= 2
+        if self._volume_secs < _VOLUME_WARMUP_SECS or self._volume_secs - self._volume_checked_at < _VOLUME_UPDATE_SECS:
+            return
+        self._volume_checked_at = self._volume_secs
+        noise, speech = self._volume_percentile(0.2), self._volume_percentile(0.9)
+        if speech - noise < 0.1:
+            # No speech heard yet, or nothing to tell it from the noise
+            return
+        gate = min(self._base_min_volume, max(TURN_MIN_VOLUME_FLOOR, noise + (speech - noise) / 2))
+        self._vad.params.min_volume = gate
+        self.stats["min_volume"] = round(gate, 2)
+
+    def _volume_percentile(self, q: float) -> float:
+        rank = q * self._volume_secs
+        seen = 0.0
+        for level, secs in enumerate(self._volumes):
+            seen += secs
+            if seen > rank:
+                return level / 100
+        return 1.0
+
+
+class TurnCueProcessor(FrameProcessor):
+    """Place right after the STT service; passes every transcript to the turn analyzer."""
+
+    def __init__(self, analyzer: AdaptiveTurnAnalyzer, **kwargs):
+        super().__init__(**kwargs)
+        self._analyzer = analyzer
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, TranscriptionFrame):
+            self._analyzer.on_transcript(frame.text, final=True)
+        elif isinstance(frame, InterimTranscriptionFrame):
+            self._analyzer.on_transcript(frame.text, final=False)
+
+        await self.push_frame(frame, direction)
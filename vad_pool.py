@@ -0,0 +1,107 @@
+"""Process-wide pool of Silero VAD model sessions.
+
+``SileroVADAnalyzer`` loads and initialises its own ONNX session for every call.
+The ONNX session itself is stateless, only the recurrent state and audio context
+belong to a stream, so the pool loads a few sessions once at startup and hands
+each call an analyzer carrying just that per-stream state.
+"""
+
+import os
+import time
+from importlib import resources
+from typing import List, Optional
+
+import numpy as np
+import onnxruntime
+from loguru import logger
+
+from pipecat.audio.vad.silero import SileroOnnxModel, SileroVADAnalyzer
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+
+VAD_POOL_SIZE = int(os.getenv("VAD_POOL_SIZE", "2"))
+
+
+def _model_path() -> str:
+    return str(resources.files("pipecat.audio.vad.data").joinpath("silero_vad.onnx"))
+
+
+def _load_session() -> onnxruntime.InferenceSession:
+    opts = onnxruntime.SessionOptions()
+    opts.inter_op_num_threads = 1
+    opts.intra_op_num_threads = 1
+    return onnxruntime.InferenceSession(_model_path(), providers=["CPUExecutionProvider"], sess_options=opts)
+
+
+class SharedSileroModel(SileroOnnxModel):
+    """Per-stream Silero state over an ONNX session owned by the pool."""
+
+    def __init__(self, session: onnxruntime.InferenceSession):
+        self.session = session
+        self.reset_states()
+        self.sample_rates = [8000, 16000]
+
+
+class PooledSileroVADAnalyzer(SileroVADAnalyzer):
+    """A ``SileroVADAnalyzer`` that borrows its model session from a ``VADModelPool``."""
+
+    def __init__(self, slot: int, session: onnxruntime.InferenceSession, *,
+                 sample_rate: Optional[int] = None, params: Optional[VADParams] = None):
+        # Skip SileroVADAnalyzer.__init__, which would load a private copy of the model
+        VADAnalyzer.__init__(self, sample_rate=sample_rate, params=params)
+        self._model = SharedSileroModel(session)
+        self._last_reset_time = 0
+        self.slot = slot
+
+
+class VADModelPool:
+    def __init__(self, size: int = VAD_POOL_SIZE):
+        start = time.perf_counter()
+        self._sessions: List[onnxruntime.InferenceSession] = [_load_session() for _ in range(max(1, size))]
+        self._active = [0] * len(self._sessions)
+        for session in self._sessions:
+            # One inference so the first real call doesn't pay for lazy initialisation
+            SharedSileroModel(session)(np.zeros(512, dtype=np.float32), 16000)
+        self.warmup_secs = time.perf_counter() - start
+        self._stats = {"leases": 0, "returns": 0, "peak_active": 0, "lease_secs_total": 0.0}
+        logger.info(f"Loaded {len(self._sessions)} Silero VAD sessions in {self.warmup_secs:.3f}s")
+
+    def lease(self, *, sample_rate: Optional[int] = None, params: Optional[VADParams] = None) -> PooledSileroVADAnalyzer:
+        """Hand out an analyzer on the least-used session. Return it with ``release``."""
+        start = time.perf_counter()
+        slot = min(range(len(self._sessions)), key=self._active.__getitem__)
+        self._active[slot] += 1
+        analyzer = PooledSileroVADAnalyzer(slot, self._sessions[slot], sample_rate=sample_rate, params=params)
+
+        self._stats["leases"] += 1
+        self._stats["lease_secs_total"] += time.perf_counter() - start
+        self._stats["peak_active"] = max(self._stats["peak_active"], sum(self._active))
+        logger.debug(f"Leased VAD session {slot} ({sum(self._active)} active)")
+        return analyzer
+
+    def release(self, analyzer: PooledSileroVADAnalyzer):
+        self._active[analyzer.slot] = max(0, self._active[analyzer.slot] - 1)
+        self._stats["returns"] += 1
+
+    def stats(self) -> dict:
+        leases = self._stats["leases"]
+        return {
+            "size": len(self._sessions),
+            "active": sum(self._active),
+            "active_per_session": list(self._active),
+            "leases": leases,
+            "returns": self._stats["returns"],
+            "peak_active": self._stats["peak_active"],
+            "avg_lease_ms": 1000 * self._stats["lease_secs_total"] / leases if leases else 0.0,
+            "warmup_secs": self.warmup_secs,
+        }
+
+
+_pool: Optional[VADModelPool] = None
+
+
+def get_vad_pool() -> VADModelPool:
+    """Return the process-wide VAD pool, loading it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = VADModelPool()
+    return _pool